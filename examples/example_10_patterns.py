@@ -11,7 +11,7 @@ from whistle import Event, EventDispatcher
 def main():
     """Demonstrate common event dispatcher patterns."""
 
-    # Pattern 1: Conditional Dispatch (check before dispatching)
+    # Pattern 1: Conditional Dispatch (the event is only built if someone listens)
     print("=== Pattern 1: Conditional Dispatch ===")
     dispatcher = EventDispatcher()
 
@@ -19,9 +19,8 @@ def main():
     def optional_handler(event):
         print("Optional handler executed")
 
-    # Only dispatch if listeners are registered
-    if dispatcher.has_listeners("optional.event"):
-        dispatcher.dispatch("optional.event")
+    # The factory is only called (and the event dispatched) if listeners are registered
+    if dispatcher.dispatch("optional.event", factory=Event) is not None:
         print("Event dispatched")
     else:
         print("No listeners, skipping dispatch")
@@ -40,7 +39,7 @@ def main():
         """Plugin that logs events."""
 
         def register(self, dispatcher):
-            dispatcher.add_listener("*", self.log_event, priority=-20)
+            dispatcher.add_listener("#", self.log_event, priority=-20)
 
         def log_event(self, event):
             print(f"[LOG] Event: {event.name}")
@@ -49,7 +48,7 @@ def main():
         """Plugin that tracks metrics."""
 
         def register(self, dispatcher):
-            dispatcher.add_listener("*", self.track_metric, priority=-10)
+            dispatcher.add_listener("#", self.track_metric, priority=-10)
 
         def track_metric(self, event):
             print(f"[METRICS] Tracking: {event.name}")
@@ -61,12 +60,12 @@ def main():
     for plugin in plugins:
         plugin.register(app_dispatcher)
 
-    # All plugins respond to all events
-    @app_dispatcher.listen("*")
+    # Plugins listening to "#" respond to all events, business logic only to its own
+    @app_dispatcher.listen("user.registered")
     def business_logic(event):
         print(f"[BUSINESS] Handling: {event.name}")
 
-    app_dispatcher.dispatch("*")
+    app_dispatcher.dispatch("user.registered")
 
     # Pattern 3: Event-Driven Workflow
     print("\n=== Pattern 3: Event-Driven Workflow ===")
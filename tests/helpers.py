@@ -0,0 +1,49 @@
+import asyncio
+import threading
+import time
+
+from whistle import Event
+
+
+class ValueEvent(Event):
+    """Event carrying a single value, picklable (so that it can be offloaded or sent to other processes)."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+def wait_for(condition, timeout=5):
+    """Waits until the given condition is true (it happens in another thread or process), then asserts it."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def sleeper(calls, name, delay, *, stop=False, fail=False):
+    """Returns a listener recording its name and thread in ``calls``, then sleeping ``delay`` seconds."""
+
+    def listener(event):
+        calls.append((name, threading.current_thread().name))
+        time.sleep(delay)
+        if stop:
+            event.stop_propagation()
+        if fail:
+            raise ValueError(name)
+
+    return listener
+
+
+def async_sleeper(calls, name, delay, *, stop=False, fail=False):
+    """Returns an asynchronous listener recording when it starts and ends in ``calls``, sleeping ``delay`` seconds."""
+
+    async def listener(event):
+        calls.append(f"{name}:start")
+        await asyncio.sleep(delay)
+        calls.append(f"{name}:end")
+        if stop:
+            event.stop_propagation()
+        if fail:
+            raise ValueError(name)
+
+    return listener
@@ -162,3 +162,24 @@ def test_first_event_will_get_reference_to_dispatcher_and_name(event_id):
     assert not e.propagation_stopped
     assert e.dispatcher == dispatcher
     assert e.name == event_id
+
+
+def test_pattern_listeners():
+    dispatcher = EventDispatcher()
+    everything, orders, created = mock.MagicMock(), mock.MagicMock(), mock.MagicMock()
+
+    dispatcher.add_listener("#", everything, priority=-20)
+    dispatcher.add_listener("order.#", orders)
+    dispatcher.dispatch("order.created")
+    dispatcher.dispatch("user.created")
+
+    assert everything.call_count == 2
+    assert orders.call_count == 1
+
+    # adding a pattern invalidates the dispatch plans of the matching event ids
+    dispatcher.add_listener("*.created", created)
+    e = dispatcher.dispatch("user.created")
+
+    assert everything.call_count == 3
+    assert created.call_count == 1
+    assert e.name == "user.created"
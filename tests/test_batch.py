@@ -0,0 +1,107 @@
+from unittest.mock import AsyncMock, Mock, call
+
+import pytest
+
+from tests.helpers import ValueEvent
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
+from whistle.batch import AsyncBatchListener, BatchListener
+
+
+def test_dispatch_many():
+    dispatcher = EventDispatcher()
+    parent = Mock()
+    dispatcher.add_listener("row.imported", parent.single)
+    dispatcher.add_listener("row.imported", parent.bulk, batch=True, priority=1)
+
+    events = [ValueEvent(i) for i in range(3)]
+    assert dispatcher.dispatch_many("row.imported", iter(events)) == events
+
+    assert parent.mock_calls == [
+        call.single(events[0]),
+        call.single(events[1]),
+        call.single(events[2]),
+        call.bulk(events),
+    ]
+    assert all(event.name == "row.imported" and event.dispatcher is dispatcher for event in events)
+
+
+def test_dispatch_many_propagation_is_per_event():
+    dispatcher = EventDispatcher()
+    after, bulk = Mock(), Mock()
+
+    def stop_odd_rows(event):
+        if event.value % 2:
+            event.stop_propagation()
+
+    dispatcher.add_listener("row.imported", stop_odd_rows)
+    dispatcher.add_listener("row.imported", after)
+    dispatcher.add_listener("row.imported", bulk, batch=True)
+
+    events = dispatcher.dispatch_many("row.imported", [ValueEvent(i) for i in range(4)])
+
+    assert [c.args[0].value for c in after.call_args_list] == [0, 2]
+    assert [event.value for event in bulk.call_args.args[0]] == [0, 2]
+    assert [event.propagation_stopped for event in events] == [False, True, False, True]
+
+
+def test_batch_listener_on_single_dispatch():
+    dispatcher = EventDispatcher()
+    bulk = Mock()
+    dispatcher.add_listener("test", bulk, batch=True)
+
+    event = dispatcher.dispatch("test")
+    bulk.assert_called_once_with([event])
+
+    dispatcher.remove_listener("test", bulk)
+    assert not dispatcher.has_listeners("test")
+
+
+def test_batch_listener_validation():
+    with pytest.raises(TypeError):
+        EventDispatcher().add_listener("test", AsyncMock(), batch=True)
+    with pytest.raises(ValueError):
+        EventDispatcher().add_listener("test", Mock(), batch=True, process=True)
+
+
+async def test_adispatch_many():
+    dispatcher = AsyncEventDispatcher()
+    single, bulk = AsyncMock(), AsyncMock()
+
+    async def stop_first(event):
+        if event.value == 0:
+            event.stop_propagation()
+
+    dispatcher.add_listener("row.imported", stop_first)
+    dispatcher.add_listener("row.imported", single)
+    dispatcher.add_listener("row.imported", bulk, batch=True)
+    (_, _, listener) = dispatcher.get_listeners("row.imported")
+    assert isinstance(listener, AsyncBatchListener)
+
+    events = await dispatcher.adispatch_many("row.imported", [ValueEvent(i) for i in range(3)])
+
+    assert single.await_count == 2
+    bulk.assert_awaited_once_with(events[1:])
+
+    event = await dispatcher.adispatch("row.imported", ValueEvent(5))
+    bulk.assert_awaited_with([event])
+
+
+async def test_adispatch_many_regular_batch_listener():
+    dispatcher = AsyncEventDispatcher()
+    bulk = Mock()
+    dispatcher.add_listener("row.imported", bulk, batch=True)
+
+    events = await dispatcher.adispatch_many("row.imported", [ValueEvent(i) for i in range(3)])
+    bulk.assert_called_once_with(events)
+
+    event = await dispatcher.adispatch("row.imported", ValueEvent(5))
+    bulk.assert_called_with([event])
+
+
+async def test_sync_dispatcher_adispatch_many():
+    dispatcher = EventDispatcher()
+    bulk = Mock()
+    dispatcher.add_listener("test", BatchListener(bulk))
+
+    events = await dispatcher.adispatch_many("test", [Event(), Event()])
+    bulk.assert_called_once_with(events)
@@ -0,0 +1,221 @@
+"""
+Performance benchmarks (run them with ``make benchmarks``, save a baseline with ``make benchmarks-save`` and compare
+against the latest saved baseline with ``make benchmarks-compare``).
+
+"""
+
+import asyncio
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
+from whistle.journal import EventJournal
+from whistle.listeners import ListenersCollection
+from whistle.policies import Debounce
+from whistle.shared_memory import SharedMemoryBus
+
+LISTENER_COUNTS = [0, 1, 10, 1000]
+
+#: Number of dispatches per benchmark round for async benchmarks, to amortize the cost of running the event loop.
+ASYNC_DISPATCHES = 100
+
+
+def listener(event):
+    pass
+
+
+async def async_listener(event):
+    pass
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("count", LISTENER_COUNTS)
+def test_dispatch_benchmark(benchmark, count):
+    dispatcher = EventDispatcher()
+    for _ in range(count):
+        dispatcher.add_listener("test", listener)
+
+    benchmark(dispatcher.dispatch, "test")
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("count", LISTENER_COUNTS)
+def test_adispatch_benchmark(benchmark, count):
+    dispatcher = AsyncEventDispatcher()
+    for _ in range(count):
+        dispatcher.add_listener("test", async_listener)
+
+    async def dispatch():
+        for _ in range(ASYNC_DISPATCHES):
+            await dispatcher.adispatch("test")
+
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark.extra_info["dispatches_per_round"] = ASYNC_DISPATCHES
+        benchmark(lambda: loop.run_until_complete(dispatch()))
+    finally:
+        loop.close()
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("priorities", [1, 10, 40])
+def test_dispatch_priority_spread_benchmark(benchmark, priorities):
+    dispatcher = EventDispatcher()
+    for i in range(40):
+        dispatcher.add_listener("test", lambda event: None, priority=i % priorities - 20)
+
+    benchmark(dispatcher.dispatch, "test")
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("timeout", [None, 1.0])
+def test_adispatch_timeout_benchmark(benchmark, timeout):
+    dispatcher = AsyncEventDispatcher()
+    dispatcher.add_listener("test", async_listener, timeout=timeout)
+
+    async def dispatch():
+        for _ in range(ASYNC_DISPATCHES):
+            await dispatcher.adispatch("test")
+
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark.extra_info["dispatches_per_round"] = ASYNC_DISPATCHES
+        benchmark(lambda: loop.run_until_complete(dispatch()))
+    finally:
+        loop.close()
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_dispatch_with_patterns_benchmark(benchmark):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("order.created", listener)
+    dispatcher.add_listener("order.*", listener)
+    dispatcher.add_listener("#", listener)
+
+    benchmark(dispatcher.dispatch, "order.created")
+
+
+@pytest.mark.benchmark(group="dispatch")
+@pytest.mark.parametrize("filtered", [False, True])
+def test_dispatch_tenant_listeners_benchmark(benchmark, filtered):
+    # 2000 tenants with one listener each, filtering in the listener or with ``where``
+    dispatcher = EventDispatcher()
+    for i in range(2000):
+        tenant = f"tenant{i}"
+        if filtered:
+            dispatcher.add_listener("order.created", listener, where={"tenant": tenant})
+        else:
+            dispatcher.add_listener(
+                "order.created", lambda event, tenant=tenant: None if event.tenant != tenant else listener(event)
+            )
+
+    event = Event()
+    event.tenant = "tenant42"
+    benchmark(dispatcher.dispatch, "order.created", event)
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_dispatch_debounced_benchmark(benchmark):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("config.changed", listener)
+    dispatcher.set_policy("config.changed", Debounce(60))
+
+    benchmark(dispatcher.dispatch, "config.changed")
+    dispatcher.flush_policies()
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_shared_memory_round_trip_benchmark(benchmark):
+    sender, receiver = EventDispatcher(), EventDispatcher()
+    receiver.add_listener("cache.invalidated", listener)
+    with SharedMemoryBus() as bus:
+        bus.connect(sender, "cache.*", background=False)
+        bridge = bus.connect(receiver, background=False)
+
+        def round_trip():
+            sender.dispatch("cache.invalidated")
+            bridge.poll()
+
+        benchmark(round_trip)
+
+
+@pytest.mark.benchmark(group="dispatch")
+def test_dispatch_with_journal_benchmark(benchmark, tmp_path):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("payment.received", listener)
+    with EventJournal(tmp_path) as journal:
+        journal.attach(dispatcher, "payment.*")
+        benchmark(dispatcher.dispatch, "payment.received")
+
+
+@pytest.mark.benchmark(group="registration")
+@pytest.mark.parametrize("count", [10, 1000])
+def test_add_remove_benchmark(benchmark, count):
+    dispatcher = EventDispatcher()
+    for i in range(count):
+        dispatcher.add_listener("test", lambda event: None, priority=i % 40 - 20)
+
+    def churn():
+        dispatcher.add_listener("test", listener)
+        dispatcher.dispatch("test")
+        dispatcher.remove_listener("test", listener)
+
+    benchmark(churn)
+
+
+@pytest.mark.benchmark(group="registration")
+@pytest.mark.parametrize("event_id", ["test", "unknown"])
+def test_has_listeners_benchmark(benchmark, event_id):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("test", listener)
+    dispatcher.add_listener("other.*", listener)
+
+    benchmark(dispatcher.has_listeners, event_id)
+
+
+@pytest.mark.benchmark(group="registration")
+def test_child_dispatcher_benchmark(benchmark):
+    dispatcher = EventDispatcher()
+    for i in range(50):
+        dispatcher.add_listener(f"event{i % 10}", listener, priority=i % 5)
+
+    def request():
+        child = dispatcher.child()
+        child.add_listener("event0", listener)
+        for i in range(10):
+            child.dispatch(f"event{i}")
+
+    benchmark(request)
+
+
+@pytest.mark.benchmark(group="registration")
+def test_memory_per_listener_benchmark(benchmark):
+    count = 10000
+
+    def register():
+        collection = ListenersCollection()
+        for i in range(count):
+            collection.add(f"event{i % 100}", listener, priority=i % 40 - 20)
+        return collection
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        collection = register()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info["bytes_per_listener"] = (
+        sum(stat.size_diff for stat in after.compare_to(before, "filename")) / count
+    )
+    del collection
+
+    benchmark.pedantic(register, rounds=5)
+
+
+@pytest.mark.benchmark(group="import")
+def test_import_time_benchmark(benchmark):
+    benchmark.pedantic(subprocess.check_call, ([sys.executable, "-c", "import whistle"],), rounds=5)
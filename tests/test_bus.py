@@ -0,0 +1,176 @@
+import asyncio
+import gc
+
+import pytest
+
+from tests.helpers import ValueEvent
+from whistle import AsyncEventBus
+
+
+def recorder(values, *, gate=None, fail=False):
+    async def listener(event):
+        if gate is not None:
+            await gate.wait()
+        if fail:
+            raise ValueError(event.value)
+        values.append(event.value)
+
+    return listener
+
+
+async def test_dispatch_returns_before_listeners_complete():
+    bus = AsyncEventBus()
+    values, gate = [], asyncio.Event()
+    bus.add_listener("test", recorder(values, gate=gate))
+
+    event = await bus.adispatch("test", ValueEvent(1))
+    assert event.value == 1
+    assert values == []
+
+    gate.set()
+    await bus.join()
+    assert values == [1]
+    await bus.aclose()
+
+
+async def test_slow_listener_does_not_delay_others():
+    bus = AsyncEventBus()
+    slow, fast, gate = [], [], asyncio.Event()
+    bus.add_listener("test", recorder(slow, gate=gate))
+    bus.add_listener("test", recorder(fast))
+
+    for i in range(3):
+        await bus.adispatch("test", ValueEvent(i))
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert fast == [0, 1, 2]
+    assert slow == []
+
+    gate.set()
+    await bus.aclose()
+    assert slow == [0, 1, 2]
+
+
+@pytest.mark.parametrize("overflow, expected", [("drop_oldest", [2, 3]), ("drop_newest", [0, 1])])
+async def test_drop_policies(overflow, expected):
+    bus = AsyncEventBus(queue_size=2, overflow=overflow)
+    values, gate = [], asyncio.Event()
+    listener = recorder(values, gate=gate)
+    bus.add_listener("test", listener)
+
+    for i in range(4):
+        await bus.adispatch("test", ValueEvent(i))
+
+    # the worker already took the first event, waiting on the gate
+    stats = bus.queue_stats()[listener]
+    assert stats["depth"] <= 2
+    assert stats["dropped"] >= 1
+
+    gate.set()
+    await bus.aclose()
+    assert values[-2:] == expected
+    assert bus.queue_stats()[listener]["processed"] == len(values)
+
+
+async def test_block_policy_applies_backpressure():
+    bus = AsyncEventBus(queue_size=1)
+    values, gate = [], asyncio.Event()
+    bus.add_listener("test", recorder(values, gate=gate))
+
+    await bus.adispatch("test", ValueEvent(0))
+    await asyncio.sleep(0)  # let the worker take the first event
+    await bus.adispatch("test", ValueEvent(1))
+
+    blocked = asyncio.ensure_future(bus.adispatch("test", ValueEvent(2)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    gate.set()
+    await blocked
+    await bus.aclose()
+    assert values == [0, 1, 2]
+
+
+async def test_workers_and_errors():
+    errors = []
+    bus = AsyncEventBus(workers=4, on_error=errors.append)
+    values = []
+    listener = recorder(values, fail=True)
+    bus.add_listener("test", listener)
+
+    await bus.adispatch_many("test", [ValueEvent(i) for i in range(3)])
+    await bus.aclose()
+
+    assert sorted(str(error) for error in errors) == ["0", "1", "2"]
+    assert bus.queue_stats()[listener]["failed"] == 3
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        AsyncEventBus(overflow="explode")
+    with pytest.raises(ValueError):
+        AsyncEventBus(workers=0)
+
+
+async def test_removed_listener_queues_are_dropped():
+    bus = AsyncEventBus(workers=2)
+    initial = len(asyncio.all_tasks())
+    for i in range(100):
+        values = []
+        listener = recorder(values)
+        bus.add_listener("test", listener)
+        bus.add_listener("other", listener)
+        await bus.adispatch("test", ValueEvent(i))
+        await bus.join()
+        assert values == [i]
+
+        # still registered for another event id
+        bus.remove_listener("test", listener)
+        assert listener in bus.queue_stats()
+        bus.remove_listener("other", listener)
+        assert bus.queue_stats() == {}
+    await asyncio.sleep(0)
+    assert len(asyncio.all_tasks()) == initial
+
+    # weak listeners, once collected
+    class Receiver:
+        async def on_event(self, event):
+            pass
+
+    receiver = Receiver()
+    bus.add_listener("test", receiver.on_event, weak=True)
+    await bus.adispatch("test", ValueEvent(0))
+    assert len(bus.queue_stats()) == 1
+    del receiver
+    gc.collect()
+    assert bus.queue_stats() == {}
+    await asyncio.sleep(0)
+    assert len(asyncio.all_tasks()) == initial
+
+
+async def test_child_bus_queues():
+    bus = AsyncEventBus()
+    values, child_values = [], []
+    listener, child_listener = recorder(values), recorder(child_values)
+    bus.add_listener("test", listener)
+    child = bus.child()
+    child.add_listener("test", child_listener)
+    child.add_listener("other", listener)
+
+    await child.adispatch("test", ValueEvent(1))
+    await bus.adispatch("test", ValueEvent(2))
+    await child.join()
+    await bus.join()
+    assert values == [1, 2]
+    assert child_values == [1]
+    # inherited listeners use the queue of the parent
+    assert list(bus.queue_stats()) == [listener]
+    assert bus.queue_stats()[listener]["processed"] == 2
+    assert list(child.queue_stats()) == [child_listener]
+
+    # still registered in the parent, its queue is kept
+    child.remove_listener("other", listener)
+    child.remove_listener("test", child_listener)
+    assert list(bus.queue_stats()) == [listener]
+    assert child.queue_stats() == {}
+    await bus.aclose()
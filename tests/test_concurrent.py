@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from tests.helpers import async_sleeper
+from whistle import AsyncEventDispatcher
+from whistle.errors import DispatchError
+
+
+async def test_concurrent_within_tier():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    calls = []
+    for i in range(5):
+        dispatcher.add_listener("test", async_sleeper(calls, f"a{i}", 0.05))
+
+    start = time.perf_counter()
+    await dispatcher.adispatch("test")
+    assert time.perf_counter() - start < 0.2
+    assert calls[:5] == [f"a{i}:start" for i in range(5)]
+
+
+async def test_tiers_run_in_priority_order():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    calls = []
+    dispatcher.add_listener("test", async_sleeper(calls, "late", 0), priority=10)
+    dispatcher.add_listener("test", async_sleeper(calls, "early1", 0.02), priority=-10)
+    dispatcher.add_listener("test", async_sleeper(calls, "early2", 0.01), priority=-10)
+
+    await dispatcher.adispatch("test")
+    assert calls == ["early1:start", "early2:start", "early2:end", "early1:end", "late:start", "late:end"]
+
+
+async def test_stop_propagation_prevents_later_tiers():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    calls = []
+    dispatcher.add_listener("test", async_sleeper(calls, "stopper", 0, stop=True))
+    dispatcher.add_listener("test", async_sleeper(calls, "sibling", 0.01))
+    dispatcher.add_listener("test", async_sleeper(calls, "late", 0), priority=1)
+
+    event = await dispatcher.adispatch("test")
+    assert event.propagation_stopped
+    assert "sibling:end" in calls
+    assert "late:start" not in calls
+
+
+async def test_failures_raise_dispatch_error():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    calls = []
+    dispatcher.add_listener("test", async_sleeper(calls, "fail", 0, fail=True))
+    dispatcher.add_listener("test", async_sleeper(calls, "ok", 0.01))
+    dispatcher.add_listener("test", async_sleeper(calls, "late", 0), priority=1)
+
+    with pytest.raises(DispatchError) as exc_info:
+        await dispatcher.adispatch("test")
+
+    assert [str(e) for e in exc_info.value.exceptions] == ["fail"]
+    assert "ok:end" in calls
+    assert "late:start" not in calls
+
+    # a listener alone in its tier is not called concurrently, its exception is not grouped
+    dispatcher.add_listener("single", async_sleeper(calls, "single", 0, fail=True))
+    with pytest.raises(ValueError, match="single"):
+        await dispatcher.adispatch("single")
+    with pytest.raises(ValueError, match="single"):
+        await dispatcher.adispatch("single", deadline=asyncio.get_running_loop().time() + 1)
+    dispatcher.add_listener("single", async_sleeper(calls, "other", 0), priority=1)
+    with pytest.raises(ValueError, match="single"):
+        await dispatcher.adispatch("single")
+
+
+async def test_sequential_by_default():
+    dispatcher = AsyncEventDispatcher()
+    calls = []
+    dispatcher.add_listener("test", async_sleeper(calls, "a", 0.01))
+    dispatcher.add_listener("test", async_sleeper(calls, "b", 0))
+
+    await dispatcher.adispatch("test")
+    assert calls == ["a:start", "a:end", "b:start", "b:end"]
@@ -0,0 +1,126 @@
+import sys
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from whistle import AsyncEventDispatcher, Event, EventDispatcher, SlottedEvent
+from whistle.event import EventPool, event_dataclass
+
+
+@event_dataclass
+class OrderPlaced(SlottedEvent):
+    order_id: int
+    total: float = 0.0
+
+
+def test_slotted_event():
+    event = SlottedEvent()
+    assert not hasattr(event, "__dict__")
+    assert event.name is None
+    assert event.dispatcher is None
+    assert not event.propagation_stopped
+
+    event.stop_propagation()
+    assert event.propagation_stopped
+
+    with pytest.raises(AttributeError):
+        event.payload = 42
+
+
+def test_event_dataclass():
+    event = OrderPlaced(42, total=9.99)
+    assert not hasattr(event, "__dict__")
+    assert (event.order_id, event.total) == (42, 9.99)
+    assert not event.propagation_stopped
+
+    dispatcher = EventDispatcher()
+    listener = mock.MagicMock()
+    dispatcher.add_listener("order.placed", listener)
+    assert dispatcher.dispatch("order.placed", event) is event
+    assert event.name == "order.placed"
+    assert event.dispatcher is dispatcher
+    listener.assert_called_once_with(event)
+
+
+def test_event_dataclass_requires_slotted_event():
+    with pytest.raises(TypeError):
+
+        @event_dataclass
+        class NotAnEvent:
+            value: int
+
+
+def test_event_pool():
+    pool = EventPool(maxsize=1)
+    a = pool.acquire()
+    assert isinstance(a, SlottedEvent)
+
+    a.name, a.propagation_stopped = "used", True
+    pool.release(a)
+    assert len(pool) == 1
+
+    b = pool.acquire()
+    assert b is a
+    assert b.name is None and not b.propagation_stopped
+
+    pool.release(b)
+    pool.release(SlottedEvent())
+    assert len(pool) == 1
+
+
+async def test_dispatchers_event_factory():
+    pool = EventPool()
+
+    dispatcher = EventDispatcher()
+    dispatcher.event_factory = pool.acquire
+    event = dispatcher.dispatch("test")
+    assert isinstance(event, SlottedEvent)
+    pool.release(event)
+    assert dispatcher.dispatch("test") is event
+
+    adispatcher = AsyncEventDispatcher()
+    adispatcher.event_factory = pool.acquire
+    assert isinstance(await adispatcher.adispatch("test"), SlottedEvent)
+
+    assert isinstance(EventDispatcher().dispatch("test"), Event)
+
+
+def _allocated(dispatch, count=10000):
+    # memory still allocated once the events returned by the given callable are kept (for released pooled events, the
+    # same instances come back, so only the list grows)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        events = [dispatch() for _ in range(count)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del events
+    return size / count
+
+
+def test_slotted_event_memory():
+    event, slotted = Event(), SlottedEvent()
+    # once dispatched, events get their name, dispatcher and propagation flag set
+    for e in (event, slotted):
+        e.name, e.dispatcher = "test", None
+    assert sys.getsizeof(slotted) < sys.getsizeof(event) + sys.getsizeof(event.__dict__)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("factory", [Event, SlottedEvent, EventPool().acquire], ids=["Event", "SlottedEvent", "pool"])
+def test_dispatch_created_event_benchmark(benchmark, factory):
+    dispatcher = EventDispatcher()
+    dispatcher.event_factory = factory
+    dispatcher.add_listener("test", lambda event: None)
+    release = getattr(getattr(factory, "__self__", None), "release", lambda event: None)
+
+    def dispatch():
+        event = dispatcher.dispatch("test")
+        release(event)
+        return event
+
+    benchmark.extra_info["bytes_per_event"] = _allocated(dispatch)
+    benchmark(dispatch)
@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+import whistle
+
+#: Maximum time (in seconds) ``import whistle`` may take, measured with ``python -X importtime``. It is generous, to
+#: avoid flaky failures on slow machines, but low enough to catch asyncio or importlib.metadata being imported again.
+IMPORT_TIME_BUDGET = 0.1
+
+#: Modules that must not be imported by ``import whistle``, as they are slow to import and only needed by some features.
+DEFERRED_MODULES = ["asyncio", "concurrent.futures", "dataclasses", "importlib.metadata", "inspect", "pickle", "typing"]
+
+
+def _run(code):
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+
+
+def test_import_does_not_load_deferred_modules():
+    result = _run(
+        f"import sys, whistle; print(__import__('json').dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+    assert json.loads(result.stdout) == []
+
+
+def test_import_time_budget():
+    result = _run("import whistle")
+    # last line of -X importtime is the top level package: "import time: self [us] | cumulative | imported package"
+    cumulative = int(result.stderr.strip().splitlines()[-1].split("|")[1])
+    assert cumulative / 1e6 < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "__version__",
+        "AsyncEventBus",
+        "AsyncQueuedEventDispatcher",
+        "QueuedEventDispatcher",
+        "ThreadPoolEventDispatcher",
+        "IEvent",
+        "IListener",
+    ],
+)
+def test_lazy_attributes(name):
+    assert name in dir(whistle)
+    assert getattr(whistle, name) is not None
+
+
+def test_unknown_attribute():
+    with pytest.raises(AttributeError):
+        whistle.Unknown
@@ -0,0 +1,168 @@
+import gc
+import weakref
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from whistle import AsyncEventDispatcher, EventDispatcher, ThreadPoolEventDispatcher
+from whistle.dispatchers.plans import compile_plan
+from whistle.instrumentation import Timings
+
+
+def test_instrumentation_disabled_by_default():
+    dispatcher = EventDispatcher()
+    listener = Mock()
+    dispatcher.add_listener("test", listener)
+    dispatcher.dispatch("test")
+
+    assert dispatcher.stats()["events"] == {}
+    assert dispatcher.stats()["listeners"] == {}
+    # the regular, non instrumented, plan is used
+    assert dispatcher._listeners._plans["test"].__code__ is compile_plan((listener,)).__code__
+
+
+def test_instrumented_dispatch():
+    dispatcher = EventDispatcher()
+    dispatcher.enable_instrumentation()
+
+    def stop(event):
+        event.stop_propagation()
+
+    def fail(event):
+        raise RuntimeError("boom")
+
+    first, never = Mock(), Mock()
+    dispatcher.add_listener("test", first, priority=-1)
+    dispatcher.add_listener("test", stop)
+    dispatcher.add_listener("test", never, priority=1)
+    dispatcher.add_listener("failing", fail)
+
+    for _ in range(3):
+        dispatcher.dispatch("test")
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch("failing")
+
+    stats = dispatcher.stats()
+    assert stats["events"]["test"]["calls"] == 3
+    assert stats["events"]["test"]["propagation_stopped"] == 3
+    assert stats["events"]["failing"]["errors"] == 1
+
+    listeners = {entry["listener"]: entry for entry in stats["listeners"]["test"]}
+    assert listeners[first]["calls"] == 3
+    assert listeners[stop]["propagation_stopped"] == 3
+    assert listeners[never]["calls"] == 0
+    assert stats["listeners"]["failing"][0]["errors"] == 1
+    assert 0 < listeners[first]["p50"] <= listeners[first]["max"]
+
+    # listener identity is preserved
+    dispatcher.remove_listener("test", first)
+    dispatcher.dispatch("test")
+    assert first.call_count == 3
+    # the metrics of removed listeners are forgotten
+    assert [entry["listener"] for entry in dispatcher.stats()["listeners"]["test"]] == [stop, never]
+
+    dispatcher.disable_instrumentation()
+    dispatcher.dispatch("test")
+    assert dispatcher.stats()["events"] == {}
+
+
+def test_instrumented_weak_and_pattern_listeners():
+    dispatcher = EventDispatcher()
+    dispatcher.enable_instrumentation()
+
+    class Receiver:
+        def on_event(self, event):
+            pass
+
+    receiver = Receiver()
+    reference = weakref.ref(receiver)
+    pattern_listener = Mock()
+    dispatcher.add_listener("test", receiver.on_event, weak=True)
+    dispatcher.add_listener("#", pattern_listener)
+    dispatcher.dispatch("test")
+    assert len(dispatcher.stats()["listeners"]["test"]) == 2
+
+    # instrumentation does not keep weak listeners alive, and forgets them once collected
+    del receiver
+    gc.collect()
+    assert reference() is None
+    dispatcher.dispatch("test")
+    assert [entry["listener"] for entry in dispatcher.stats()["listeners"]["test"]] == [pattern_listener]
+
+    dispatcher.remove_listener("#", pattern_listener)
+    assert dispatcher.stats()["listeners"]["test"] == []
+
+
+def test_instrumented_threaded_dispatch():
+    dispatcher = ThreadPoolEventDispatcher()
+    dispatcher.enable_instrumentation()
+    listeners = [Mock(), Mock(), Mock()]
+    for listener in listeners:
+        dispatcher.add_listener("test", listener)
+
+    dispatcher.dispatch("test")
+    assert [entry["calls"] for entry in dispatcher.stats()["listeners"]["test"]] == [1, 1, 1]
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_instrumented_async_dispatch(concurrent):
+    dispatcher = AsyncEventDispatcher(concurrent=concurrent)
+    dispatcher.enable_instrumentation()
+    listeners = [AsyncMock(), AsyncMock()]
+    for listener in listeners:
+        dispatcher.add_listener("test", listener)
+
+    await dispatcher.adispatch("test")
+    await dispatcher.adispatch("test")
+
+    stats = dispatcher.stats()
+    assert stats["events"]["test"]["calls"] == 2
+    assert [entry["calls"] for entry in stats["listeners"]["test"]] == [2, 2]
+    assert all(listener.await_count == 2 for listener in listeners)
+
+
+def test_cache_stats():
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("test", Mock())
+    for _ in range(3):
+        dispatcher.dispatch("test")
+    dispatcher.get_listeners("test")
+
+    assert dispatcher.stats()["cache"] == {"hits": 1, "misses": 1, "compiled": 1, "sorted": 1, "plans": 1}
+
+
+def test_cache_stats_instrumented():
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("test", Mock())
+    dispatcher.enable_instrumentation()
+    for _ in range(1000):
+        dispatcher.dispatch("test")
+
+    assert dispatcher.stats()["cache"] == {"hits": 999, "misses": 1, "compiled": 1, "sorted": 1, "plans": 1}
+    assert dispatcher.stats()["events"]["test"]["calls"] == 1000
+
+
+@pytest.mark.asyncio
+async def test_async_cache_stats_instrumented():
+    dispatcher = AsyncEventDispatcher()
+    dispatcher.add_listener("test", AsyncMock())
+    await dispatcher.adispatch("test")
+    dispatcher.enable_instrumentation()
+    for _ in range(10):
+        await dispatcher.adispatch("test")
+
+    # the plan compiled again once instrumented uses the cached sorted listeners
+    assert dispatcher.stats()["cache"] == {"hits": 10, "misses": 1, "compiled": 2, "sorted": 1, "plans": 1}
+
+
+def test_timings_percentiles():
+    timings = Timings(max_samples=100)
+    for i in range(1, 201):
+        timings.record(float(i))
+
+    snapshot = timings.snapshot()
+    assert snapshot["calls"] == 200
+    assert snapshot["total_time"] == sum(range(1, 201))
+    assert snapshot["p50"] == 151.0
+    assert snapshot["p99"] == 200.0
+    assert snapshot["max"] == 200.0
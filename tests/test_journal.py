@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from tests.helpers import ValueEvent
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
+from whistle.journal import EventJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        yield journal
+
+
+def test_journal_and_replay(journal):
+    dispatcher = EventDispatcher()
+    journal.attach(dispatcher, "payment.*")
+
+    for amount in range(10):
+        dispatcher.dispatch("payment.received", ValueEvent(amount))
+    dispatcher.dispatch("payment.refunded")
+    dispatcher.dispatch("other")
+
+    records = list(journal.read())
+    assert [record[2] for record in records] == ["payment.received"] * 10 + ["payment.refunded"]
+    # events of the default type without state have no payload
+    assert records[-1][3] == b""
+
+    target = EventDispatcher()
+    amounts, refunds = [], Mock()
+    target.add_listener("payment.received", lambda event: amounts.append(event.value))
+    target.add_listener("payment.refunded", refunds)
+    assert journal.replay(target) == 11
+    assert amounts == list(range(10))
+    assert refunds.call_count == 1
+    assert isinstance(refunds.call_args[0][0], Event)
+
+    # replaying through a journaled dispatcher does not journal the events again
+    offset = journal.offset
+    assert journal.replay(dispatcher) == 11
+    assert journal.offset == offset
+
+    journal.detach(dispatcher, "payment.*")
+    dispatcher.dispatch("payment.received", ValueEvent(0))
+    assert journal.offset == offset
+
+
+def test_journal_ranges(journal):
+    offsets = [journal.append("test", bytes([i]) * 100, timestamp=1000.0 + i) for i in range(100)]
+    # records are spread over many segments
+    assert len(journal.segments()) > 1
+
+    def payloads(**kwargs):
+        return [record[3][0] for record in journal.read(**kwargs)]
+
+    assert payloads() == list(range(100))
+    assert payloads(start=offsets[42]) == list(range(42, 100))
+    assert payloads(start=offsets[10], end=offsets[20]) == list(range(10, 20))
+    assert payloads(since=1050.0) == list(range(50, 100))
+    assert payloads(since=1050.0, until=1060.0) == list(range(50, 60))
+    assert payloads(start=offsets[55], since=1050.0, until=1060.0) == list(range(55, 60))
+
+
+def test_journal_reopen(tmp_path):
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        for i in range(50):
+            journal.append("test", bytes([i]) * 100)
+        offset = journal.offset
+
+    # simulate a torn record at the end of the last segment
+    segments = sorted(os.listdir(tmp_path))
+    last = tmp_path / segments[-1]
+    base = int(segments[-1].split(".")[0])
+    with open(last, "r+b") as file:
+        file.seek(offset - base)
+        file.write(b"\xff\x00\x00\x00garbage")
+
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        assert journal.offset == offset
+        journal.append("test", b"\xff")
+        assert [record[3][0] for record in journal.read()] == list(range(50)) + [255]
+
+
+def test_journal_durable(tmp_path):
+    with EventJournal(tmp_path, durable=True, sync_interval=10) as journal:
+        dispatcher = EventDispatcher()
+        journal.attach(dispatcher, "test")
+        # does not wait for the sync interval, a commit is requested
+        dispatcher.dispatch("test")
+        assert journal._synced == journal.offset
+
+    with pytest.raises(RuntimeError):
+        journal.append("test")
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        with pytest.raises(ValueError):
+            journal.append("test", b"x" * 4096)
+
+
+async def test_journal_async(journal):
+    dispatcher = AsyncEventDispatcher()
+    journal.attach(dispatcher, "payment.*")
+    await dispatcher.adispatch("payment.received", ValueEvent(42))
+
+    target = AsyncEventDispatcher()
+    listener = Mock()
+    target.add_listener("payment.received", listener)
+    assert await journal.areplay(target) == 1
+    assert listener.call_args[0][0].value == 42
+
+
+async def test_journal_async_durable(tmp_path):
+    with EventJournal(tmp_path, durable=True, sync_interval=10) as journal:
+        dispatcher = AsyncEventDispatcher()
+        journal.attach(dispatcher, "test")
+        journal.sync = Mock(side_effect=AssertionError("blocks the event loop"))
+        await asyncio.gather(*(dispatcher.adispatch("test") for _ in range(100)))
+        # the listeners awaited the commits of the background thread, without any executor thread
+        assert journal._synced == journal.offset
+        assert journal._waiters == []
+        assert not any(thread.name.startswith("asyncio") for thread in threading.enumerate())
+        del journal.sync
+
+        journal.detach(dispatcher, "test")
+        assert not dispatcher.has_listeners("test")
+    journal.close()
+
+
+def test_journal_close_detaches(tmp_path):
+    dispatcher = EventDispatcher()
+    journal = EventJournal(tmp_path)
+    journal.attach(dispatcher, "test", "other")
+    dispatcher.remove_listener("other", journal)
+    journal.close()
+    journal.close()
+
+    assert not dispatcher.has_listeners()
+    dispatcher.dispatch("test")
+
+
+def test_journal_segments_directory_synced(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("whistle.journal._fsync_directory", synced.append)
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        assert synced == [str(tmp_path)]
+        for _ in range(100):
+            journal.append("test", b"x" * 100)
+        assert len(synced) == len(journal.segments())
+    # reopening the last segment does not create it
+    with EventJournal(tmp_path, segment_size=4096) as journal:
+        assert len(synced) == len(journal.segments())
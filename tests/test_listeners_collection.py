@@ -1,26 +1,32 @@
 import random
+import threading
 from random import randint
 from unittest.mock import Mock
 
 import pytest
 
-from whistle.listeners import ListenersCollection
+from whistle import EventDispatcher
+from whistle.listeners import FilteredListener, ListenersCollection, ThreadSafeListenersCollection
 
 
-def test_interface():
-    assert set(filter(lambda x: not x.startswith("_"), dir(ListenersCollection))) == {
+@pytest.mark.parametrize("cls", [ListenersCollection, ThreadSafeListenersCollection])
+def test_interface(cls):
+    assert set(filter(lambda x: not x.startswith("_"), dir(cls))) == {
         "add",
+        "child",
         "get",
         "has",
         "remove",
         "keys",
         "items",
+        "stats",
     }
 
 
+@pytest.mark.parametrize("cls", [ListenersCollection, ThreadSafeListenersCollection])
 @pytest.mark.parametrize("event_id", ["event", 42, object()])
-def test_sort_listeners(event_id):
-    coll = ListenersCollection()
+def test_sort_listeners(cls, event_id):
+    coll = cls()
 
     a, b, c, d, unrelated = Mock(), Mock(), Mock(), Mock(), Mock()
 
@@ -81,3 +87,339 @@ def test_e2e_benchmark(benchmark):
         if i % 10 == 0:
             coll.get(event_id)
         i += 1
+
+
+@pytest.mark.parametrize(
+    "pattern, event_id, expected",
+    [
+        ("order.*", "order.created", True),
+        ("order.*", "order", False),
+        ("order.*", "order.item.added", False),
+        ("order.#", "order", True),
+        ("order.#", "order.created", True),
+        ("order.#", "order.item.added", True),
+        ("order.#", "orders.created", False),
+        ("*.created", "order.created", True),
+        ("#.created", "order.item.created", True),
+        ("#", "anything.at.all", True),
+        ("*", "startup", True),
+        ("*", "order.created", False),
+        ("a.#.z", "a.z", True),
+        ("a.#.z", "a.b.c.z", True),
+        ("a.#.z", "a.b.c", False),
+    ],
+)
+def test_patterns_match(pattern, event_id, expected):
+    coll = ListenersCollection()
+    listener = Mock()
+    coll.add(pattern, listener)
+
+    assert coll.get(event_id) == ((listener,) if expected else ())
+    assert coll.has(event_id) is expected
+
+
+@pytest.mark.parametrize("cls", [ListenersCollection, ThreadSafeListenersCollection])
+def test_patterns_merged_in_priority_then_registration_order(cls):
+    coll = cls()
+    a, b, c, d, e = Mock(), Mock(), Mock(), Mock(), Mock()
+
+    coll.add("order.created", a)
+    coll.add("#", b, priority=-20)
+    coll.add("order.*", c)
+    coll.add("order.created", d)
+    coll.add("order.#", e, priority=10)
+
+    assert coll.get("order.created") == (b, a, c, d, e)
+    assert coll.get("order.deleted") == (b, c, e)
+    assert coll.get("user.created") == (b,)
+
+
+def test_patterns_cache_invalidation():
+    coll = ListenersCollection()
+    a, b, c = Mock(), Mock(), Mock()
+
+    coll.add("order.created", a)
+    coll.add("user.created", a)
+    assert coll.get("order.created") == (a,)
+    assert coll.get("user.created") == (a,)
+    assert coll.get("order.deleted") == ()
+
+    coll.add("order.*", b)
+    # resolved event ids not matching the changed pattern are kept in cache
+    assert "user.created" in coll._sorted
+    assert "order.created" not in coll._sorted
+    assert coll.get("order.created") == (a, b)
+    assert coll.get("order.deleted") == (b,)
+
+    coll.add("#", c)
+    assert coll.get("user.created") == (a, c)
+
+    coll.remove("order.*", b)
+    assert coll.get("order.created") == (a, c)
+    assert coll.get("order.deleted") == (c,)
+
+    coll.remove("#", c)
+    assert coll.get("order.deleted") == ()
+    assert not coll._patterns
+
+
+def test_non_string_event_ids_are_never_patterns():
+    coll = ListenersCollection()
+    a, b = Mock(), Mock()
+    coll.add("#", a)
+    coll.add(42, b)
+
+    assert coll.get(42) == (b,)
+    assert coll.get("42") == (a,)
+
+
+def test_overlapping_multi_wildcards_match_once():
+    coll = ListenersCollection()
+    listener = Mock()
+    coll.add("#.#", listener)
+
+    assert coll.get("a.b.c") == (listener,)
+
+
+def test_remove_leaves_no_empty_buckets_or_event_ids():
+    coll = ListenersCollection()
+    a, b, c = Mock(), Mock(), Mock()
+
+    coll.add("event", a, priority=-10)
+    coll.add("event", b)
+    coll.add("event", a, priority=10)
+    coll.add("event", c, priority=10)
+    assert coll.get("event") == (a, b, a, c)
+    assert coll._items["event"].priorities == [-10, 0, 10]
+
+    coll.remove("event", a)
+    assert coll.get("event") == (b, c)
+    assert coll._items["event"].priorities == [0, 10]
+    assert set(coll._items["event"].buckets) == {0, 10}
+
+    coll.remove("event", b)
+    coll.remove("event", c)
+    assert coll.get("event") == ()
+    assert not coll.has("event")
+    assert "event" not in coll.keys()
+
+    with pytest.raises(ValueError):
+        coll.remove("event", a)
+
+
+def test_has_does_not_sort():
+    coll = ListenersCollection()
+    coll.add("event", Mock())
+    coll.add("order.#", Mock())
+
+    assert coll.has("event")
+    assert coll.has("order.created")
+    assert not coll.has("user.created")
+    assert coll._sorted == {}
+
+
+def test_remove_unhashable_listener():
+    class UnhashableListener:
+        __hash__ = None
+
+        def __call__(self, event):
+            pass
+
+    coll = ListenersCollection()
+    a, b = UnhashableListener(), Mock()
+    coll.add("event", a)
+    coll.add("event", b)
+    coll.add("event", a, priority=-1)
+    assert coll.get("event") == (a, a, b)
+
+    coll.remove("event", a)
+    assert coll.get("event") == (b,)
+
+
+def test_random_churn_keeps_order():
+    coll = ListenersCollection()
+    registered = []
+    listeners = [Mock(name=f"listener_{i}") for i in range(50)]
+
+    for i in range(1000):
+        listener = random.choice(listeners)
+        if random.random() < 0.4 and registered:
+            listener = random.choice(registered)[2]
+            coll.remove("event", listener)
+            registered = [entry for entry in registered if entry[2] is not listener]
+        else:
+            priority = randint(-20, 20)
+            coll.add("event", listener, priority=priority)
+            registered.append((priority, i, listener))
+
+        expected = tuple(listener for _, _, listener in sorted(registered, key=lambda entry: entry[:2]))
+        assert coll.get("event") == expected
+        assert coll.has("event") is bool(expected)
+
+
+@pytest.mark.benchmark
+def test_add_remove_churn_benchmark(benchmark):
+    coll = ListenersCollection()
+    for i in range(10000):
+        coll.add("event", Mock(), priority=randint(-20, 20))
+    listener = Mock()
+
+    @benchmark
+    def add_remove():
+        coll.add("event", listener, priority=randint(-20, 20))
+        coll.remove("event", listener)
+
+
+def test_thread_safe_caches_are_copied_on_write():
+    dispatcher = EventDispatcher(thread_safe=True)
+    a, b = Mock(), Mock()
+    dispatcher.add_listener("order.created", a)
+    dispatcher.dispatch("order.created")
+
+    coll = dispatcher._listeners
+    _sorted, plans = coll._sorted, coll._plans
+    dispatcher.add_listener("order.*", b)
+    dispatcher.dispatch("order.created")
+
+    # published caches are replaced, never changed in place
+    assert _sorted == {"order.created": (a,)} and set(plans) == {"order.created"}
+    assert coll._sorted == {"order.created": (a, b)} and coll._plans is not plans
+    assert b.call_count == 1
+
+
+def test_thread_safe_dispatch_while_changing_listeners():
+    dispatcher = EventDispatcher(thread_safe=True)
+    calls = []
+    stable = calls.append  # unlike mocks, list.append is atomic
+    dispatcher.add_listener("test", stable)
+    dispatcher.add_listener("test.*", stable)
+    errors = []
+
+    def dispatch():
+        try:
+            for _ in range(2000):
+                dispatcher.dispatch("test")
+                dispatcher.dispatch("test.sub")
+        except Exception as exc:  # pragma: no cover
+            errors.append(exc)
+
+    def churn():
+        try:
+            for i in range(500):
+                listener = Mock()
+                dispatcher.add_listener("test" if i % 2 else "test.#", listener, priority=i % 7)
+                dispatcher.has_listeners("test.sub")
+                dispatcher.remove_listener("test" if i % 2 else "test.#", listener)
+        except Exception as exc:  # pragma: no cover
+            errors.append(exc)
+
+    threads = [threading.Thread(target=dispatch) for _ in range(4)] + [threading.Thread(target=churn) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(calls) == 4 * 2000 * 2
+    assert dispatcher.get_listeners("test") == (stable,)
+    assert dispatcher.get_listeners("test.sub") == (stable,)
+
+
+@pytest.mark.parametrize("cls", [ListenersCollection, ThreadSafeListenersCollection])
+def test_child_collection(cls):
+    parent = cls()
+    a, b, c, d, e = Mock(), Mock(), Mock(), Mock(), Mock()
+    parent.add("event", a, priority=0)
+    parent.add("event", b, priority=10)
+
+    child = parent.child()
+    assert isinstance(child, cls)
+    assert child.parent is parent
+    # nothing added to the child, the parent's resolved listeners are used
+    assert child.get("event") is parent.get("event")
+
+    child.add("event", c, priority=0)
+    child.add("#", d, priority=-10)
+    assert child.get("event") == (d, a, c, b)
+    assert parent.get("event") == (a, b)
+    assert child.has("event") and child.has("evil") and not parent.has("evil")
+    assert list(child.keys()) == ["event", "#"]
+
+    # changes of the parent are seen by the child (and grandchildren)
+    grandchild = child.child()
+    assert grandchild.get("event") == (d, a, c, b)
+    parent.add("event", e, priority=-20)
+    assert child.get("event") == (e, d, a, c, b)
+    assert grandchild.get("event") == (e, d, a, c, b)
+    parent.remove("event", a)
+    assert child.get("event") == (e, d, c, b)
+    assert grandchild.get("event") == (e, d, c, b)
+
+    # inherited listeners cannot be removed from the child
+    with pytest.raises(ValueError):
+        child.remove("other", a)
+    child.remove("event", c)
+    assert child.get("event") == (e, d, b)
+    assert parent.get("event") == (e, b)
+
+
+@pytest.mark.parametrize("thread_safe", [False, True])
+def test_child_dispatcher_reports_inherited_listeners(thread_safe):
+    dispatcher = EventDispatcher(thread_safe=thread_safe)
+    listener = Mock()
+    dispatcher.add_listener("event", listener)
+
+    child = dispatcher.child()
+    assert child.has_listeners()
+    assert child.get_listeners() == {"event": (listener,)}
+    child.add_listener("other", listener)
+    assert list(child.get_listeners()) == ["event", "other"]
+    assert dispatcher.get_listeners() == {"event": (listener,)}
+
+
+@pytest.mark.parametrize("cls", [ListenersCollection, ThreadSafeListenersCollection])
+def test_filtered_listeners(cls):
+    coll = cls()
+    unfiltered, acme, globex, acme_eu = Mock(), Mock(), Mock(), Mock()
+    coll.add("order", unfiltered, priority=5)
+    coll.add("order", acme, where={"tenant": "acme"})
+    coll.add("order", globex, where={"tenant": "globex"}, priority=10)
+    coll.add("order.*", acme_eu, where={"tenant": "acme", "region": "eu"}, priority=-5)
+
+    # all the listeners are resolved, filtered ones wrapped
+    listeners = coll.get("order")
+    assert listeners == (acme, unfiltered, globex)
+    assert isinstance(listeners[0], FilteredListener) and listeners[0].where == {"tenant": "acme"}
+    assert coll._signatures("order") == {("tenant",)}
+    assert coll._signatures("order.paid") == {("region", "tenant")}
+    assert coll._signatures("other") == set()
+
+    class Order:
+        tenant, region = "acme", "eu"
+
+    # only the matching filtered listeners are selected for an event, unwrapped, with the unfiltered ones
+    assert coll._tiers("order", Order()) == ((acme,), (unfiltered,))
+    Order.tenant = "globex"
+    assert coll._tiers("order", Order()) == ((unfiltered,), (globex,))
+    Order.tenant = "initech"
+    assert coll._tiers("order", Order()) == ((unfiltered,),)
+    assert coll._tiers("order", object()) == ((unfiltered,),)
+    Order.tenant = ["unhashable"]
+    assert coll._tiers("order", Order()) == ((unfiltered,),)
+    Order.tenant = "acme"
+    assert coll._tiers("order.paid", Order()) == ((acme_eu,),)
+
+    coll.remove("order", acme)
+    assert coll._tiers("order", Order()) == ((unfiltered,),)
+    coll.remove("order", globex)
+    assert coll._signatures("order") == set()
+    coll.remove("order", unfiltered)
+    assert coll._filters.keys() == {"order.*"}
+
+    with pytest.raises(ValueError):
+        coll.add("order", acme, where={})
+
+    # unhashable filter values are rejected before the listener is registered
+    with pytest.raises(TypeError):
+        coll.add("order", acme, where={"tags": [1]})
+    assert coll.get("order") == ()
@@ -0,0 +1,107 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import AsyncMock
+
+import pytest
+
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
+from whistle.listeners import InlineListener
+from whistle.offload import AsyncProcessListener, ProcessListener, get_event_state
+
+
+class ThumbnailEvent(Event):
+    def __init__(self, size):
+        self.size = size
+        self.tags = []
+
+
+def compute(event):
+    event.pid = os.getpid()
+    event.area = event.size * event.size
+    event.tags.append("computed")
+
+
+def stop(event):
+    event.stop_propagation()
+
+
+def fail(event):
+    raise ValueError("failed in worker")
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        yield executor
+
+
+def test_get_event_state():
+    event = ThumbnailEvent(3)
+    event.dispatcher = object()
+    assert get_event_state(event) == {"size": 3, "tags": []}
+
+
+def test_process_listener(executor):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("thumbnail", ProcessListener(compute, executor=executor))
+
+    event = dispatcher.dispatch("thumbnail", ThumbnailEvent(12))
+    assert event.area == 144
+    assert event.tags == ["computed"]
+    assert event.pid != os.getpid()
+    assert event.dispatcher is dispatcher
+
+
+def test_process_listener_propagation_and_errors(executor):
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("test", ProcessListener(stop, executor=executor))
+    dispatcher.add_listener("test", ProcessListener(fail, executor=executor))
+
+    assert dispatcher.dispatch("test").propagation_stopped
+
+    dispatcher.remove_listener("test", stop)
+    with pytest.raises(ValueError, match="failed in worker"):
+        dispatcher.dispatch("test")
+
+
+def test_process_flag_and_remove():
+    dispatcher = EventDispatcher()
+    dispatcher.add_listener("thumbnail", compute, process=True)
+    (listener,) = dispatcher.get_listeners("thumbnail")
+    assert isinstance(listener, ProcessListener)
+
+    assert dispatcher.dispatch("thumbnail", ThumbnailEvent(2)).area == 4
+
+    dispatcher.remove_listener("thumbnail", compute)
+    assert not dispatcher.has_listeners("thumbnail")
+
+
+@pytest.mark.parametrize("dispatcher_type", [EventDispatcher, AsyncEventDispatcher])
+def test_process_coroutine_function(dispatcher_type):
+    async def listener(event):
+        pass
+
+    dispatcher = dispatcher_type()
+    with pytest.raises(TypeError):
+        dispatcher.add_listener("test", listener, process=True)
+    with pytest.raises(TypeError):
+        dispatcher.add_listener("test", ProcessListener(AsyncMock()))
+    assert not dispatcher.has_listeners("test")
+
+
+async def test_async_process_listener(executor):
+    dispatcher = AsyncEventDispatcher()
+    dispatcher.add_listener("thumbnail", ProcessListener(compute, executor=executor))
+    (listener,) = dispatcher.get_listeners("thumbnail")
+    assert isinstance(listener, AsyncProcessListener)
+
+    event = await dispatcher.adispatch("thumbnail", ThumbnailEvent(5))
+    assert event.area == 25
+    assert event.pid != os.getpid()
+
+
+def test_async_dispatcher_only_offloads_when_asked():
+    dispatcher = AsyncEventDispatcher()
+    dispatcher.add_listener("test", compute)
+    (listener,) = dispatcher.get_listeners("test")
+    assert isinstance(listener, InlineListener)
@@ -0,0 +1,173 @@
+from unittest.mock import AsyncMock, Mock, call
+
+import pytest
+
+from whistle import AsyncEventDispatcher, EventDispatcher
+from whistle.dispatchers import base
+from whistle.dispatchers.plans import MAX_UNROLLED_LISTENERS, compile_async_plan, compile_plan, noop_plan
+from whistle.event import Event
+from whistle.listeners import InlineListener
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 5, MAX_UNROLLED_LISTENERS, MAX_UNROLLED_LISTENERS + 1])
+def test_compile_plan_calls_listeners_in_order(size):
+    parent = Mock()
+    listeners = tuple(getattr(parent, f"listener_{i}") for i in range(size))
+
+    event = Event()
+    compile_plan(listeners)(event)
+
+    assert parent.mock_calls == [getattr(call, f"listener_{i}")(event) for i in range(size)]
+
+
+@pytest.mark.parametrize("size", [2, 5, MAX_UNROLLED_LISTENERS + 1])
+def test_compile_plan_stops_propagation(size):
+    calls = []
+
+    def make_listener(i):
+        def listener(event):
+            calls.append(i)
+            if i == 1:
+                event.stop_propagation()
+
+        return listener
+
+    compile_plan(tuple(map(make_listener, range(size))))(Event())
+    assert calls == [0, 1]
+
+
+@pytest.mark.parametrize("size", [0, 1, 3, MAX_UNROLLED_LISTENERS + 1])
+async def test_compile_async_plan(size):
+    listeners = tuple(AsyncMock() for _ in range(size))
+    event = Event()
+    await compile_async_plan(listeners)(event)
+    for listener in listeners:
+        listener.assert_awaited_once_with(event)
+
+
+def test_plan_is_cached_and_invalidated():
+    dispatcher = EventDispatcher()
+    a, b = Mock(), Mock()
+
+    dispatcher.add_listener("test", a)
+    dispatcher.dispatch("test")
+    plan = dispatcher._listeners._plans["test"]
+    dispatcher.dispatch("test")
+    assert dispatcher._listeners._plans["test"] is plan
+
+    dispatcher.add_listener("test", b, priority=-1)
+    assert "test" not in dispatcher._listeners._plans
+    dispatcher.dispatch("test")
+    assert a.call_count == 3
+    assert b.call_count == 1
+
+    dispatcher.remove_listener("test", a)
+    assert "test" not in dispatcher._listeners._plans
+    dispatcher.dispatch("test")
+    assert a.call_count == 3
+    assert b.call_count == 2
+
+
+def test_empty_plan_cached_and_invalidated():
+    dispatcher = EventDispatcher()
+    dispatcher.dispatch("nobody.listens")
+    assert dispatcher._listeners._plans == {"nobody.listens": noop_plan}
+
+    handler = Mock()
+    dispatcher.add_listener("nobody.listens", handler)
+    dispatcher.dispatch("nobody.listens")
+    handler.assert_called_once()
+
+
+def test_empty_plans_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(base, "MAX_CACHED_UNREGISTERED_PLANS", 3)
+    monkeypatch.setattr("whistle.listeners.MAX_CACHED_UNREGISTERED_LISTENERS", 3)
+    dispatcher = EventDispatcher()
+    for i in range(10):
+        dispatcher.dispatch(f"nobody.listens.{i}")
+    assert len(dispatcher._listeners._plans) == 3
+
+    # once patterns are registered, unmatched event ids are resolved (and cached) too
+    pattern_listener = Mock()
+    dispatcher.add_listener("order.*", pattern_listener)
+    for i in range(10):
+        dispatcher.dispatch(f"nobody.listens.{i}")
+    assert len(dispatcher._listeners._sorted) == 3
+    dispatcher.dispatch("order.created")
+    pattern_listener.assert_called_once()
+
+    # event ids registered as such are always cached
+    listener = Mock()
+    dispatcher.add_listener("order.paid", listener)
+    dispatcher.dispatch("order.paid")
+    assert "order.paid" in dispatcher._listeners._sorted
+    assert "order.paid" in dispatcher._listeners._plans
+
+
+def test_pattern_plans_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(base, "MAX_CACHED_UNREGISTERED_PLANS", 100)
+    monkeypatch.setattr("whistle.listeners.MAX_CACHED_UNREGISTERED_LISTENERS", 100)
+    dispatcher = EventDispatcher()
+    listener = Mock()
+    dispatcher.add_listener("#", listener)
+    for i in range(1000):
+        dispatcher.dispatch(f"event.{i}")
+
+    assert listener.call_count == 1000
+    assert len(dispatcher._listeners._sorted) == 100
+    assert len(dispatcher._listeners._plans) == 100
+
+
+def test_do_dispatch_override_is_honored():
+    class CustomEventDispatcher(EventDispatcher):
+        def do_dispatch(self, listeners, event, /):
+            for listener in reversed(listeners):
+                listener(event)
+
+    dispatcher = CustomEventDispatcher()
+    parent = Mock()
+    dispatcher.add_listener("test", parent.a)
+    dispatcher.add_listener("test", parent.b)
+    event = dispatcher.dispatch("test")
+
+    assert parent.mock_calls == [call.b(event), call.a(event)]
+
+
+async def test_adispatch_override_is_honored():
+    class CustomAsyncEventDispatcher(AsyncEventDispatcher):
+        async def _adispatch(self, listeners, event):
+            for listener in reversed(listeners):
+                await listener(event)
+
+    dispatcher = CustomAsyncEventDispatcher()
+    a, b = AsyncMock(), AsyncMock()
+    dispatcher.add_listener("test", a)
+    dispatcher.add_listener("test", b)
+    await dispatcher.adispatch("test")
+
+    assert a.await_count == b.await_count == 1
+
+
+class DirectInlineListener(InlineListener):
+    __slots__ = ()
+
+    async def __call__(self, event, /):
+        raise AssertionError("plans call the wrapped function directly")
+
+
+@pytest.mark.parametrize("size", [1, 3, MAX_UNROLLED_LISTENERS + 1])
+async def test_compile_async_plan_calls_inline_listeners_directly(size):
+    sync, coroutine, awaitable = Mock(), AsyncMock(), AsyncMock()
+    listeners = tuple(
+        (DirectInlineListener(sync) if i % 4 == 1 else DirectInlineListener(lambda event: awaitable(event)))
+        if i % 2
+        else coroutine
+        for i in range(size)
+    )
+
+    event = Event()
+    await compile_async_plan(listeners)(event)
+
+    assert sync.call_count == len(range(1, size, 4))
+    assert awaitable.await_count == len(range(3, size, 4))
+    assert coroutine.await_count == size - size // 2
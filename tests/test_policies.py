@@ -0,0 +1,172 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+
+from tests.helpers import wait_for
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
+from whistle.policies import Coalesce, Debounce, Throttle
+
+
+class KeyEvent(Event):
+    def __init__(self, key, value=None):
+        self.key = key
+        self.value = value
+
+
+def test_debounce():
+    dispatcher = EventDispatcher()
+    values = []
+    dispatcher.add_listener("config.changed", lambda event: values.append(event.value))
+    policy = Debounce(0.05)
+    dispatcher.set_policy("config.changed", policy)
+    assert dispatcher.get_policy("config.changed") is policy
+
+    for i in range(100):
+        dispatcher.dispatch("config.changed", KeyEvent("config", i))
+    assert values == []
+    wait_for(lambda: values == [99])
+    assert policy.stats() == {"dispatched": 1, "suppressed": 99, "pending": 0}
+    assert dispatcher.stats()["policies"] == {"config.changed": policy.stats()}
+
+    # other event ids are not affected
+    dispatcher.add_listener("other", lambda event: values.append("other"))
+    dispatcher.dispatch("other")
+    assert values == [99, "other"]
+
+
+def test_debounce_leading():
+    dispatcher = EventDispatcher()
+    values = []
+    dispatcher.add_listener("test", lambda event: values.append(event.value))
+    dispatcher.set_policy("test", Debounce(10, leading=True))
+
+    for i in range(10):
+        dispatcher.dispatch("test", KeyEvent("test", i))
+    assert values == [0]
+    dispatcher.flush_policies()
+    assert values == [0, 9]
+    dispatcher.dispatch("test", KeyEvent("test", 10))
+    assert values == [0, 9, 10]
+
+    dispatcher.set_policy("test", Debounce(10, leading=True, trailing=False))
+    for i in range(10):
+        dispatcher.dispatch("test", KeyEvent("test", i))
+    dispatcher.flush_policies()
+    assert values == [0, 9, 10, 0]
+    assert dispatcher.get_policy("test").suppressed == 9
+
+    with pytest.raises(ValueError):
+        Debounce(1, leading=False, trailing=False)
+
+
+def test_throttle():
+    dispatcher = EventDispatcher()
+    values = []
+    dispatcher.add_listener("progress", lambda event: values.append(event.value))
+    policy = Throttle(1, per=10, burst=2)
+    dispatcher.set_policy("progress", policy)
+
+    for i in range(10):
+        dispatcher.dispatch("progress", KeyEvent("progress", i))
+    assert values == [0, 1]
+    assert policy.suppressed == 8
+
+    # trailing dispatch of the last suppressed event, once the rate allows it
+    dispatcher.set_policy("progress", Throttle(20, trailing=True))
+    for i in range(10):
+        dispatcher.dispatch("progress", KeyEvent("progress", i))
+    assert values == [0, 1, 0]
+    wait_for(lambda: values == [0, 1, 0, 9])
+    assert dispatcher.get_policy("progress").stats() == {"dispatched": 2, "suppressed": 8, "pending": 0}
+
+
+def test_dispatch_many_applies_policies():
+    dispatcher = EventDispatcher()
+    values, batches = [], []
+    dispatcher.add_listener("progress", lambda event: values.append(event.value))
+    dispatcher.add_listener("progress", batches.append, batch=True)
+    dispatcher.set_policy("progress", Throttle(1))
+
+    events = dispatcher.dispatch_many("progress", [KeyEvent("progress", i) for i in range(5)])
+    assert [event.name for event in events] == ["progress"] * 5
+    assert values == [0]
+    assert [[event.value for event in batch] for batch in batches] == [[0]]
+    assert dispatcher.get_policy("progress").suppressed == 4
+
+
+def test_coalesce_and_removal():
+    dispatcher = EventDispatcher()
+    events = []
+    dispatcher.add_listener("cache.dirty", lambda event: events.append((event.key, event.value)))
+    dispatcher.set_policy("cache.dirty", Coalesce(10, key=lambda event: event.key))
+
+    dispatcher.dispatch("cache.dirty", KeyEvent("a", 1))
+    dispatcher.dispatch("cache.dirty", KeyEvent("b", 1))
+    dispatcher.dispatch("cache.dirty", KeyEvent("a", 2))
+    assert events == []
+
+    # removing the policy dispatches the pending events
+    dispatcher.set_policy("cache.dirty", None)
+    assert events == [("a", 2), ("b", 1)]
+    assert dispatcher.get_policy("cache.dirty") is None
+    dispatcher.dispatch("cache.dirty", KeyEvent("c", 1))
+    assert events[-1] == ("c", 1)
+
+    # a policy holds the state of a single dispatcher
+    policy = Coalesce(1)
+    dispatcher.set_policy("other", policy)
+    with pytest.raises(ValueError):
+        EventDispatcher().set_policy("other", policy)
+
+
+def test_policies_inherited_by_children():
+    dispatcher = EventDispatcher()
+    listener = Mock()
+    dispatcher.add_listener("test", listener)
+    dispatcher.set_policy("test", Coalesce(10))
+
+    child = dispatcher.child()
+    child_listener = Mock()
+    child.add_listener("test", child_listener)
+    # the child shares the policy (and its state) of its parent, only the latest event is kept
+    child.dispatch("test")
+    dispatcher.dispatch("test")
+    assert not listener.called
+    dispatcher.flush_policies()
+    assert listener.call_count == 1 and child_listener.call_count == 0
+
+    # set after the child was created, and applied to the child's own policies only
+    child.set_policy("test", Debounce(10, leading=True, trailing=False))
+    child.dispatch("test")
+    assert child_listener.call_count == 1
+    assert dispatcher.get_policy("test") is not child.get_policy("test")
+
+
+async def test_async_policies():
+    dispatcher = AsyncEventDispatcher()
+    values = []
+
+    async def listener(event):
+        values.append(event.value)
+
+    dispatcher.add_listener("test", listener)
+    dispatcher.set_policy("test", Debounce(0.02, leading=True))
+    for i in range(10):
+        await dispatcher.adispatch("test", KeyEvent("test", i))
+    assert values == [0]
+    for _ in range(100):
+        if len(values) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert values == [0, 9]
+
+    dispatcher.set_policy("test", Coalesce(10))
+    await dispatcher.adispatch("test", KeyEvent("test", 10))
+    await dispatcher.adispatch("test", KeyEvent("test", 11))
+    await dispatcher.aflush_policies()
+    assert values == [0, 9, 11]
+
+    dispatcher.set_policy("test", Throttle(1))
+    await dispatcher.adispatch_many("test", [KeyEvent("test", i) for i in range(12, 17)])
+    assert values == [0, 9, 11, 12]
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from tests.helpers import ValueEvent, wait_for
+from whistle import AsyncEventDispatcher, AsyncQueuedEventDispatcher, EventDispatcher, QueuedEventDispatcher
+
+
+def test_enqueue_and_drain():
+    dispatcher = EventDispatcher()
+    seen = []
+    dispatcher.add_listener("a", lambda event: seen.append(("a", event.value, threading.current_thread().name)))
+    dispatcher.add_listener("b", lambda event: seen.append(("b", event.value, threading.current_thread().name)))
+
+    queued = QueuedEventDispatcher(dispatcher, max_delay=10)
+    queued.enqueue("a", ValueEvent(1))
+    queued.enqueue("a", ValueEvent(2))
+    queued.enqueue("b", ValueEvent(3))
+    assert seen == []
+    assert len(queued) == 3
+
+    queued.drain()
+    assert [(event_id, value) for event_id, value, _ in seen] == [("a", 1), ("a", 2), ("b", 3)]
+
+    with pytest.raises(RuntimeError):
+        queued.enqueue("a")
+
+
+def test_background_flush_on_delay_and_size():
+    dispatcher = EventDispatcher()
+    listener = Mock()
+    dispatcher.add_listener("test", listener)
+
+    queued = QueuedEventDispatcher(dispatcher, max_delay=0.01)
+    queued.enqueue("test")
+    wait_for(lambda: listener.called)
+    assert listener.call_count == 1
+
+    queued = QueuedEventDispatcher(dispatcher, max_delay=10, max_batch_size=10)
+    for _ in range(10):
+        queued.enqueue("test")
+    wait_for(lambda: listener.call_count == 11)
+    queued.drain()
+
+
+def test_coalescing():
+    dispatcher = EventDispatcher()
+    values = []
+    dispatcher.add_listener("config.changed", lambda event: values.append(event.value))
+    dispatcher.add_listener("other", lambda event: values.append(event.value))
+
+    queued = QueuedEventDispatcher(dispatcher, max_delay=10)
+    queued.enqueue("config.changed", ValueEvent(1), key="db")
+    queued.enqueue("other", ValueEvent("x"))
+    queued.enqueue("config.changed", ValueEvent(2), key="db")
+    queued.enqueue("config.changed", ValueEvent(3), key="cache")
+    queued.enqueue("config.changed", ValueEvent(4), key="db")
+    queued.flush()
+    assert values == [4, "x", 3]
+
+    queued.enqueue("config.changed", ValueEvent(5), key="db")
+    queued.drain()
+    assert values == [4, "x", 3, 5]
+
+
+def test_errors_are_reported_and_do_not_stop_the_queue():
+    dispatcher = EventDispatcher()
+    ok, errors = Mock(), []
+    dispatcher.add_listener("fail", Mock(side_effect=ValueError("boom")))
+    dispatcher.add_listener("ok", ok)
+
+    queued = QueuedEventDispatcher(dispatcher, max_delay=10, on_error=errors.append)
+    queued.enqueue("fail")
+    queued.enqueue("ok")
+    queued.drain()
+
+    assert [str(error) for error in errors] == ["boom"]
+    assert ok.call_count == 1
+
+
+async def test_async_queued_dispatcher():
+    dispatcher = AsyncEventDispatcher()
+    listener = AsyncMock()
+    dispatcher.add_listener("test", listener)
+
+    queued = AsyncQueuedEventDispatcher(dispatcher, max_delay=0.01)
+    queued.enqueue("test", ValueEvent(1), key="k")
+    queued.enqueue("test", ValueEvent(2), key="k")
+    for _ in range(100):
+        if listener.called:
+            break
+        await asyncio.sleep(0.005)
+    assert listener.await_count == 1
+    assert listener.call_args.args[0].value == 2
+
+    queued.enqueue("test")
+    await queued.drain()
+    assert listener.await_count == 2
@@ -0,0 +1,200 @@
+import socket
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from tests.helpers import ValueEvent, wait_for
+from whistle import Event, EventDispatcher
+from whistle.remote import RemoteEventDispatcher, RemoteEventServer, decode_frame, encode_frame, is_loopback
+
+
+@pytest.fixture
+def server():
+    dispatcher = EventDispatcher()
+    with RemoteEventServer(dispatcher, event_types=[ValueEvent]) as server:
+        yield server
+
+
+def test_frame_encoding():
+    items = [("order.created", b""), ("order.paid", b"payload"), ("é", b"\x00" * 3)]
+    frame = encode_frame(items)
+    assert decode_frame(frame[8:], len(items)) == items
+
+
+def test_remote_listener(server):
+    received = []
+    server.dispatcher.add_listener("order.*", received.append)
+
+    local = EventDispatcher()
+    local_listener = Mock()
+    with RemoteEventDispatcher(server.address) as remote:
+        local.add_listener("order.*", remote)
+        local.add_listener("order.*", local_listener)
+
+        local.dispatch("order.created", ValueEvent(1))
+        local.dispatch("order.cancelled")
+        local.dispatch("other")
+        remote.flush()
+        assert remote.sent == 2
+
+    assert local_listener.call_count == 2
+    wait_for(lambda: len(received) == 2)
+    assert [(event.name, type(event)) for event in received] == [
+        ("order.created", ValueEvent),
+        ("order.cancelled", Event),
+    ]
+    assert received[0].value == 1
+    assert received[0].dispatcher is server.dispatcher
+
+
+def test_remote_dispatch_batches(server):
+    received = []
+    batches = []
+    server.dispatcher.add_listener("tick", lambda event: received.append(event.value))
+    server.dispatcher.add_listener("tick", batches.append, batch=True)
+
+    with RemoteEventDispatcher(server.address, max_batch_size=100) as remote:
+        for i in range(1000):
+            remote.dispatch("tick", ValueEvent(i))
+        remote.dispatch_many("tick", [ValueEvent(1000), ValueEvent(1001)])
+        remote.flush()
+
+    wait_for(lambda: len(received) == 1002)
+    assert received == list(range(1002))
+    # many events per frame
+    assert len(batches) < len(received)
+    assert max(len(batch) for batch in batches) <= 100
+    assert server.received == 1002
+
+
+def test_remote_frame_size(server, monkeypatch):
+    monkeypatch.setattr("whistle.remote.MAX_FRAME_SIZE", 1 << 20)
+    received = []
+    server.dispatcher.add_listener("blob", lambda event: received.append(len(event.value)))
+
+    with RemoteEventDispatcher(server.address) as remote:
+        for _ in range(20):
+            remote.dispatch("blob", ValueEvent(b"x" * 100_000))
+        # cannot fit in a frame on their own
+        with pytest.raises(ValueError):
+            remote.dispatch("blob", ValueEvent(b"x" * (1 << 20)))
+        with pytest.raises(ValueError):
+            remote.dispatch("x" * 70_000)
+        remote.flush()
+
+    wait_for(lambda: len(received) == 20)
+    assert (remote.sent, remote.dropped) == (20, 2)
+
+
+def test_remote_connection_pool(server):
+    received = []
+    lock = threading.Lock()
+
+    def listener(event):
+        with lock:
+            received.append(event.value)
+
+    server.dispatcher.add_listener("tick", listener)
+    with RemoteEventDispatcher(server.address, max_connections=4) as remote:
+        for i in range(1000):
+            remote.dispatch("tick", ValueEvent(i))
+    wait_for(lambda: len(received) == 1000)
+    assert sorted(received) == list(range(1000))
+
+
+def test_remote_unix_socket(tmp_path):
+    if not hasattr(socket, "AF_UNIX"):
+        pytest.skip("Unix sockets are not available")
+
+    dispatcher = EventDispatcher()
+    listener = Mock()
+    dispatcher.add_listener("test", listener)
+    path = str(tmp_path / "whistle.sock")
+    with RemoteEventServer(dispatcher, path) as server:
+        with RemoteEventDispatcher(server.address) as remote:
+            remote.dispatch("test")
+        wait_for(lambda: listener.call_count == 1)
+    assert not (tmp_path / "whistle.sock").exists()
+
+
+def test_remote_errors(server):
+    on_error = Mock()
+    server.on_error = on_error
+    server.dispatcher.add_listener("test", Mock(side_effect=ValueError("failed")))
+
+    with RemoteEventDispatcher(server.address) as remote:
+        remote.dispatch("test")
+    wait_for(lambda: on_error.called)
+    server.close()
+    assert isinstance(on_error.call_args[0][0], ValueError)
+
+    # the server is gone
+    on_error = Mock()
+    remote = RemoteEventDispatcher(server.address, on_error=on_error)
+    remote.dispatch("test")
+    remote.close()
+    assert remote.dropped == 1
+    assert isinstance(on_error.call_args[0][0], OSError)
+    with pytest.raises(RuntimeError):
+        remote.dispatch("test")
+
+
+def test_remote_backpressure():
+    # a peer accepting the connection, but never reading from it
+    with socket.create_server(("127.0.0.1", 0)) as peer:
+        remote = RemoteEventDispatcher(
+            peer.getsockname(), max_batch_size=1, max_pending=1, timeout=0.2, on_error=Mock()
+        )
+        event = ValueEvent(b"x" * (1 << 20))
+        with pytest.raises(TimeoutError):
+            for _ in range(1000):
+                remote.dispatch("test", event)
+        connection, _ = peer.accept()
+        connection.close()
+
+
+class Exploit:
+    def __reduce__(self):
+        return (print, ("pwned",))
+
+
+def test_remote_security(server):
+    received = []
+    server.dispatcher.add_listener("test", received.append)
+    on_error = Mock()
+    server.on_error = on_error
+
+    # only the allowed event types can be received
+    exploit = ValueEvent(Exploit())
+    with RemoteEventDispatcher(server.address) as remote:
+        remote.dispatch("test", exploit)
+        remote.dispatch("test", ValueEvent(1))
+    wait_for(lambda: len(received) == 1)
+    assert received[0].value == 1
+    assert "Forbidden class builtins.print" in str(on_error.call_args[0][0])
+
+    # listening on other interfaces than the loopback one requires a secret
+    assert is_loopback(("127.0.0.1", 0)) and is_loopback(("::1", 0)) and is_loopback(("localhost", 0))
+    assert not is_loopback(("0.0.0.0", 0)) and not is_loopback(("events.internal", 0))
+    with pytest.raises(ValueError):
+        RemoteEventServer(EventDispatcher(), ("0.0.0.0", 0))
+
+
+def test_remote_secret():
+    dispatcher = EventDispatcher()
+    received = []
+    dispatcher.add_listener("test", received.append)
+
+    with RemoteEventServer(dispatcher, secret=b"secret") as server:
+        with RemoteEventDispatcher(server.address, secret=b"secret") as remote:
+            remote.dispatch("test")
+        wait_for(lambda: len(received) == 1)
+
+        # frames with a wrong signature (or none) are dropped, and the connection is closed
+        for secret in (b"wrong", None):
+            with RemoteEventDispatcher(server.address, secret=secret) as remote:
+                remote.dispatch("test")
+        time.sleep(0.05)
+        assert len(received) == 1 and server.received == 1
@@ -0,0 +1,146 @@
+import multiprocessing
+from unittest.mock import Mock
+
+import pytest
+
+from tests.helpers import ValueEvent, wait_for
+from whistle import Event, EventDispatcher
+from whistle.shared_memory import SharedMemoryBus
+
+
+@pytest.fixture
+def bus():
+    with SharedMemoryBus(size=4096) as bus:
+        yield bus
+
+
+def test_bridge(bus):
+    dispatchers = [EventDispatcher(), EventDispatcher(), EventDispatcher()]
+    bridges = [bus.connect(dispatcher, "cache.*", background=False) for dispatcher in dispatchers]
+    received = [[], [], []]
+    for dispatcher, events in zip(dispatchers, received):
+        dispatcher.add_listener("cache.*", events.append)
+
+    dispatchers[0].dispatch("cache.invalidated", ValueEvent("user:1"))
+    dispatchers[0].dispatch("cache.cleared")
+    dispatchers[0].dispatch("other")
+
+    assert [bridge.poll() for bridge in bridges] == [0, 2, 2]
+    for events in received[1:]:
+        assert [event.name for event in events] == ["cache.invalidated", "cache.cleared"]
+        assert isinstance(events[0], ValueEvent) and events[0].value == "user:1"
+        assert type(events[1]) is Event
+
+    # received events are not published again
+    assert [bridge.published for bridge in bridges] == [2, 0, 0]
+    assert [bridge.poll() for bridge in bridges] == [0, 0, 0]
+
+    for bridge in bridges:
+        bridge.close()
+    assert dispatchers[0].get_listeners("cache.invalidated") == (received[0].append,)
+
+
+def test_bridge_wraps_around(bus):
+    sender, receiver = EventDispatcher(), EventDispatcher()
+    bus.connect(sender, "test", background=False)
+    bridge = bus.connect(receiver, background=False)
+    keys = []
+    receiver.add_listener("test", lambda event: keys.append(event.value))
+
+    for i in range(500):
+        sender.dispatch("test", ValueEvent(i))
+        if i % 10 == 9:
+            bridge.poll()
+
+    assert bus.position() > 4 * bus.capacity
+    assert keys == list(range(500))
+    assert bridge.overruns == 0
+
+
+def test_bridge_overrun(bus):
+    sender, receiver = EventDispatcher(), EventDispatcher()
+    bus.connect(sender, "test", background=False)
+    bridge = bus.connect(receiver, background=False)
+    listener = Mock()
+    receiver.add_listener("test", listener)
+
+    for i in range(500):
+        sender.dispatch("test", ValueEvent(i))
+    assert bridge.poll() == 0
+    assert bridge.overruns == 1
+
+    sender.dispatch("test", ValueEvent("last"))
+    assert bridge.poll() == 1
+    assert listener.call_args[0][0].value == "last"
+
+
+def test_bridge_errors(bus):
+    sender, receiver = EventDispatcher(), EventDispatcher()
+    bus.connect(sender, "test", background=False)
+    on_error = Mock()
+    bridge = bus.connect(receiver, background=False, on_error=on_error)
+    receiver.add_listener("test", Mock(side_effect=ValueError("failed")))
+
+    sender.dispatch("test")
+    assert bridge.poll() == 1
+    assert isinstance(on_error.call_args[0][0], ValueError)
+
+    with pytest.raises(ValueError):
+        sender.dispatch("test", ValueEvent("x" * 4096))
+
+
+def test_bus_attach_by_name(bus):
+    with pytest.raises(ValueError):
+        SharedMemoryBus(bus.name)
+
+    other = SharedMemoryBus(bus.name, lock=bus.lock)
+    bridge = other.connect(EventDispatcher(), background=False)
+    bus.publish(0, "test")
+    assert bridge.poll() == 1
+    other.close()
+
+
+def _worker(bus, key):
+    dispatcher = EventDispatcher()
+    bridge = bus.connect(dispatcher, "cache.*", background=False)
+    dispatcher.dispatch("cache.invalidated", ValueEvent(key))
+    bridge.close()
+
+
+def test_bridge_backs_off_when_idle(bus):
+    dispatcher = EventDispatcher(thread_safe=True)
+    bridge = bus.connect(dispatcher, background=False, poll_interval=0.004)
+    delays = []
+
+    def wait(delay):
+        delays.append(delay)
+        if len(delays) == 2:
+            # activity resets the delay
+            bus.publish(bridge.id + 1, "cache.cleared")
+        elif len(delays) == 7:
+            bridge._closed.set()
+
+    bridge._closed.wait = wait
+    bridge._run()
+    assert delays == [0.0005, 0.001, 0.0005, 0.001, 0.002, 0.004, 0.004]
+    assert bridge.received == 1
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork is not available")
+def test_bridge_between_processes(bus):
+    dispatcher = EventDispatcher(thread_safe=True)
+    keys = []
+    dispatcher.add_listener("cache.invalidated", lambda event: keys.append(event.value))
+    bridge = bus.connect(dispatcher, "cache.*")
+
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker, args=(bus, f"key{i}")) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    wait_for(lambda: len(keys) == 4)
+    bridge.close()
+    assert sorted(keys) == ["key0", "key1", "key2", "key3"]
@@ -1,9 +1,13 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from pytest import fixture
 
-from whistle import AsyncEventDispatcher, EventDispatcher
+from whistle import AsyncEventDispatcher, Event, EventDispatcher
 
 
 class BaseDispatcherTest:
@@ -21,6 +25,9 @@ class BaseDispatcherTest:
         handler = self.create_invalid_handler()
         with pytest.raises(TypeError):
             dispatcher.add_listener("test", handler)
+        # the decorator registers listeners the same way
+        with pytest.raises(TypeError):
+            dispatcher.listen("test")(handler)
 
 
 class TestAsyncDispatcher(BaseDispatcherTest):
@@ -32,7 +39,7 @@ class TestAsyncDispatcher(BaseDispatcherTest):
         return AsyncMock()
 
     def create_invalid_handler(self):
-        return Mock()
+        return object()
 
     def test_dispatch(self, dispatcher):
         handler = self.create_handler()
@@ -46,6 +53,107 @@ class TestAsyncDispatcher(BaseDispatcherTest):
         await dispatcher.adispatch("test")
         assert handler.called
 
+    async def test_adispatch_factory(self, dispatcher):
+        factory = Mock(side_effect=Event)
+        assert await dispatcher.adispatch("test", factory=factory) is None
+        assert not factory.called
+
+        handler = self.create_handler()
+        dispatcher.add_listener("test", handler)
+        event = await dispatcher.adispatch("test", factory=factory)
+        factory.assert_called_once_with()
+        handler.assert_called_once_with(event)
+
+    @pytest.mark.parametrize("concurrent", [False, True])
+    async def test_adispatch_mixed_listeners(self, concurrent):
+        dispatcher = AsyncEventDispatcher(concurrent=concurrent)
+        calls = []
+
+        async def async_listener(event):
+            calls.append("async")
+
+        def sync_listener(event):
+            calls.append("sync")
+
+        def sync_returning_awaitable(event):
+            return async_listener(event)
+
+        dispatcher.add_listener("test", async_listener)
+        dispatcher.add_listener("test", sync_listener, priority=1)
+        dispatcher.add_listener("test", sync_returning_awaitable, priority=2)
+        dispatcher.add_listener("test", lambda event: True, priority=3)
+
+        await dispatcher.adispatch("test")
+        assert calls == ["async", "sync", "async"]
+
+    async def test_listen_decorator(self, dispatcher):
+        calls = []
+
+        @dispatcher.listen("test")
+        def regular(event):
+            calls.append("regular")
+
+        @dispatcher.listen("test", priority=-1)
+        async def coroutine(event):
+            calls.append("coroutine")
+
+        await dispatcher.adispatch("test")
+        assert calls == ["coroutine", "regular"]
+        assert regular.__name__ == "regular"
+
+    async def test_adispatch_sync_listener_stops_propagation(self, dispatcher):
+        after = AsyncMock()
+        dispatcher.add_listener("test", lambda event: event.stop_propagation())
+        dispatcher.add_listener("test", after)
+
+        event = await dispatcher.adispatch("test")
+        assert event.propagation_stopped
+        assert not after.called
+
+    async def test_child(self, dispatcher):
+        parent_listener, child_listener = AsyncMock(), Mock()
+        dispatcher.add_listener("test", parent_listener)
+        child = dispatcher.child()
+        child.add_listener("test", child_listener, priority=-1)
+
+        event = await child.adispatch("test")
+        assert event.dispatcher is child
+        child_listener.assert_called_once_with(event)
+        parent_listener.assert_awaited_once_with(event)
+
+        await dispatcher.adispatch("test")
+        assert child_listener.call_count == 1
+
+    @pytest.mark.parametrize("concurrent", [False, True])
+    async def test_filtered_listeners(self, concurrent):
+        dispatcher = AsyncEventDispatcher(concurrent=concurrent)
+        calls = []
+
+        async def acme(event):
+            calls.append("acme")
+
+        dispatcher.add_listener("order", acme, where={"tenant": "acme"})
+        dispatcher.add_listener("order", lambda event: calls.append("globex"), where={"tenant": "globex"})
+        dispatcher.add_listener("order", lambda event: calls.append("all"), priority=-1)
+
+        await dispatcher.adispatch("order", TenantEvent("acme"))
+        await dispatcher.adispatch("order", TenantEvent("globex"))
+        await dispatcher.adispatch("order")
+        assert calls == ["all", "acme", "all", "globex", "all"]
+
+        calls.clear()
+        await dispatcher.adispatch_many("order", [TenantEvent("acme"), TenantEvent("initech")])
+        assert calls == ["all", "all", "acme"]
+
+        with pytest.raises(ValueError):
+            dispatcher.add_listener("order", acme, batch=True, where={"tenant": "acme"})
+
+
+class TenantEvent(Event):
+    def __init__(self, tenant, region=None):
+        self.tenant = tenant
+        self.region = region
+
 
 class TestSyncDispatcher(BaseDispatcherTest):
     @fixture
@@ -69,3 +177,183 @@ class TestSyncDispatcher(BaseDispatcherTest):
         dispatcher.add_listener("test", handler)
         await dispatcher.adispatch("test")
         assert handler.called
+
+    def test_dispatch_factory(self, dispatcher):
+        factory = Mock(side_effect=Event)
+        assert dispatcher.dispatch("test", factory=factory) is None
+        assert not factory.called
+
+        handler = self.create_handler()
+        dispatcher.add_listener("test", handler)
+        event = dispatcher.dispatch("test", factory=factory)
+        factory.assert_called_once_with()
+        handler.assert_called_once_with(event)
+        assert event.name == "test"
+
+        dispatcher.remove_listener("test", handler)
+        assert dispatcher.dispatch("test", factory=factory) is None
+        factory.assert_called_once_with()
+
+    def test_dispatch_event_wins_over_factory(self, dispatcher):
+        factory, event = Mock(side_effect=Event), Event()
+        assert dispatcher.dispatch("test", event, factory=factory) is event
+        assert not factory.called
+
+    async def test_adispatch_offload(self):
+        loop_thread = threading.get_ident()
+        threads = []
+        dispatcher = EventDispatcher(async_mode="offload")
+        dispatcher.add_listener("test", lambda event: threads.append(threading.get_ident()))
+
+        event = await dispatcher.adispatch("test")
+        assert event.name == "test"
+        events = await dispatcher.adispatch_many("test", [Event(), Event()])
+        assert len(events) == 2
+        assert len(threads) == 3 and loop_thread not in threads
+
+    async def test_adispatch_offload_without_listeners(self):
+        dispatcher = EventDispatcher(async_mode="offload")
+        dispatcher._run_async = Mock(side_effect=AssertionError("offloaded"))
+        # nobody listens (cold and cached event ids), nothing is offloaded
+        for _ in range(2):
+            assert (await dispatcher.adispatch("nobody.listens")).name == "nobody.listens"
+            assert await dispatcher.adispatch("nobody.listens", factory=Event) is None
+
+    async def test_adispatch_offload_does_not_block_the_loop(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            dispatcher = EventDispatcher(async_mode="offload", async_executor=executor)
+            dispatcher.add_listener("test", lambda event: time.sleep(0.1))
+
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.ensure_future(tick())
+            await dispatcher.adispatch("test")
+            task.cancel()
+            assert ticks > 3
+
+    async def test_adispatch_strict(self):
+        dispatcher = EventDispatcher(async_mode="strict")
+        dispatcher.add_listener("test", Mock())
+        with pytest.raises(NotImplementedError):
+            await dispatcher.adispatch("test")
+        with pytest.raises(NotImplementedError):
+            await dispatcher.adispatch_many("test", [Event()])
+        assert dispatcher.dispatch("test").name == "test"
+
+        # whether anybody listens or not
+        with pytest.raises(NotImplementedError):
+            await dispatcher.adispatch("nobody.listens")
+        with pytest.raises(NotImplementedError):
+            await dispatcher.adispatch_many("nobody.listens", [Event()])
+
+    def test_invalid_async_mode(self):
+        with pytest.raises(ValueError):
+            EventDispatcher(async_mode="whatever")
+
+    async def test_adispatch_offload_copies_context(self):
+        from contextvars import ContextVar
+
+        var = ContextVar("var", default=None)
+        seen = []
+        dispatcher = EventDispatcher(async_mode="offload")
+        dispatcher.add_listener("test", lambda event: seen.append(var.get()))
+
+        var.set("value")
+        await dispatcher.adispatch("test")
+        assert seen == ["value"]
+
+    def test_child(self):
+        dispatcher = EventDispatcher(async_mode="strict")
+        calls = []
+        dispatcher.add_listener("request.started", lambda event: calls.append("global"))
+        dispatcher.add_listener("request.finished", lambda event: calls.append("global"))
+
+        child = dispatcher.child()
+        assert type(child) is EventDispatcher and child.parent is dispatcher
+        assert child.async_mode == "strict"
+        child.add_listener("request.started", lambda event: calls.append("local"), priority=-10)
+
+        event = child.dispatch("request.started")
+        assert event.dispatcher is child
+        assert calls == ["local", "global"]
+
+        # event ids without local listeners share the parent's plan
+        calls.clear()
+        child.dispatch("request.finished")
+        assert calls == ["global"]
+        assert child._listeners._plans["request.finished"] is dispatcher._listeners._plans["request.finished"]
+
+        calls.clear()
+        dispatcher.dispatch("request.started")
+        assert calls == ["global"]
+
+        # listeners added to the parent afterwards are inherited
+        calls.clear()
+        dispatcher.add_listener("request.finished", lambda event: calls.append("late"))
+        child.dispatch("request.finished")
+        assert calls == ["global", "late"]
+        assert child.get_listeners("request.finished") == dispatcher.get_listeners("request.finished")
+
+    def test_filtered_listeners(self):
+        dispatcher = EventDispatcher()
+        calls = []
+        for tenant in ("acme", "globex", "initech"):
+            dispatcher.add_listener(
+                "order.*", lambda event, tenant=tenant: calls.append(tenant), where={"tenant": tenant}
+            )
+        dispatcher.add_listener(
+            "order.paid", lambda event: calls.append("eu"), where={"tenant": "acme", "region": "eu"}
+        )
+        dispatcher.add_listener("order.paid", lambda event: calls.append("first"), priority=-1)
+        dispatcher.add_listener("order.paid", lambda event: calls.append("last"), priority=1)
+
+        dispatcher.dispatch("order.paid", TenantEvent("acme", "eu"))
+        assert calls == ["first", "acme", "eu", "last"]
+        calls.clear()
+        dispatcher.dispatch("order.paid", TenantEvent("globex", "eu"))
+        dispatcher.dispatch("order.created", TenantEvent("initech"))
+        dispatcher.dispatch("order.created", TenantEvent(["unhashable"]))
+        assert calls == ["first", "globex", "last", "initech"]
+
+        # one plan per combination of attribute values
+        assert dispatcher._listeners.stats()["compiled"] == 4
+
+        # the other ways of calling listeners check the filters
+        calls.clear()
+        dispatcher.dispatch_many("order.created", [TenantEvent("acme"), TenantEvent("globex")])
+        assert calls == ["acme", "globex"]
+
+        # filters are indexed for children too, and removed with their listener
+        child = dispatcher.child()
+        listener = Mock()
+        child.add_listener("order.paid", listener, where={"tenant": "acme"})
+        calls.clear()
+        event = child.dispatch("order.paid", TenantEvent("acme", "us"))
+        listener.assert_called_once_with(event)
+        assert calls == ["first", "acme", "last"]
+        child.remove_listener("order.paid", listener)
+        child.dispatch("order.paid", TenantEvent("acme", "us"))
+        assert listener.call_count == 1
+
+        with pytest.raises(ValueError):
+            dispatcher.add_listener("order", listener, batch=True, where={"tenant": "acme"})
+
+    def test_filtered_listeners_instrumented(self):
+        dispatcher = EventDispatcher()
+        dispatcher.enable_instrumentation()
+        acme, globex = Mock(), Mock()
+        dispatcher.add_listener("order", acme, where={"tenant": "acme"})
+        dispatcher.add_listener("order", globex, where={"tenant": "globex"})
+
+        for tenant in ("acme", "acme", "globex"):
+            dispatcher.dispatch("order", TenantEvent(tenant))
+        assert (acme.call_count, globex.call_count) == (2, 1)
+        stats = dispatcher.stats()
+        assert stats["events"]["order"]["calls"] == 3
+        assert [entry["calls"] for entry in stats["listeners"]["order"]] == [2, 1]
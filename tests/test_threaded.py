@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+
+from tests.helpers import sleeper
+from whistle import ThreadPoolEventDispatcher
+from whistle.errors import DispatchError
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        yield executor
+
+
+def test_tier_runs_in_parallel(executor):
+    dispatcher = ThreadPoolEventDispatcher(executor=executor)
+    calls = []
+    for i in range(5):
+        dispatcher.add_listener("test", sleeper(calls, i, 0.05))
+
+    start = time.perf_counter()
+    dispatcher.dispatch("test")
+    assert time.perf_counter() - start < 0.2
+    assert sorted(name for name, _ in calls) == list(range(5))
+    assert len({thread for _, thread in calls}) > 1
+
+
+def test_tiers_run_in_priority_order(executor):
+    dispatcher = ThreadPoolEventDispatcher(executor=executor)
+    order = []
+    dispatcher.add_listener("test", lambda event: order.append("late"), priority=10)
+    dispatcher.add_listener("test", lambda event: (time.sleep(0.02), order.append("early1")), priority=-10)
+    dispatcher.add_listener("test", lambda event: order.append("early2"), priority=-10)
+
+    dispatcher.dispatch("test")
+    assert order[-1] == "late"
+    assert set(order[:2]) == {"early1", "early2"}
+
+
+def test_stop_propagation_prevents_later_tiers(executor):
+    dispatcher = ThreadPoolEventDispatcher(executor=executor)
+    calls, late = [], Mock()
+    dispatcher.add_listener("test", sleeper(calls, "stopper", 0, stop=True))
+    dispatcher.add_listener("test", sleeper(calls, "sibling", 0.01))
+    dispatcher.add_listener("test", late, priority=1)
+
+    event = dispatcher.dispatch("test")
+    assert event.propagation_stopped
+    assert {name for name, _ in calls} == {"stopper", "sibling"}
+    assert not late.called
+
+
+def test_failures_raise_dispatch_error(executor):
+    dispatcher = ThreadPoolEventDispatcher(executor=executor)
+    calls, late = [], Mock()
+    dispatcher.add_listener("test", sleeper(calls, "a", 0, fail=True))
+    dispatcher.add_listener("test", sleeper(calls, "b", 0.01, fail=True))
+    dispatcher.add_listener("test", sleeper(calls, "c", 0))
+    dispatcher.add_listener("test", late, priority=1)
+
+    with pytest.raises(DispatchError) as exc_info:
+        dispatcher.dispatch("test")
+
+    assert sorted(str(e) for e in exc_info.value.exceptions) == ["a", "b"]
+    assert not late.called
+
+    # a listener alone in its tier runs on the dispatching thread, its exception is not grouped
+    dispatcher.add_listener("single", sleeper(calls, "single", 0, fail=True))
+    dispatcher.add_listener("single", sleeper(calls, "other", 0), priority=1)
+    with pytest.raises(ValueError, match="single"):
+        dispatcher.dispatch("single")
+
+
+def test_default_shared_executor():
+    a, b = ThreadPoolEventDispatcher(), ThreadPoolEventDispatcher()
+    listeners = [Mock(), Mock()]
+    for listener in listeners:
+        a.add_listener("test", listener)
+        b.add_listener("test", listener)
+
+    a.dispatch("test")
+    b.dispatch("test")
+    assert [listener.call_count for listener in listeners] == [2, 2]
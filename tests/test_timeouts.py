@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from whistle import AsyncEventBus, AsyncEventDispatcher, SlottedEvent
+from whistle.errors import DispatchError, DispatchTimeoutError
+
+
+async def hang(event):
+    await asyncio.sleep(10)
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_listener_timeout_skip(concurrent):
+    dispatcher = AsyncEventDispatcher(concurrent=concurrent)
+    calls = []
+
+    async def after(event):
+        calls.append("after")
+
+    dispatcher.add_listener("test", hang, timeout=0.01)
+    dispatcher.add_listener("test", lambda event: calls.append("inline"), timeout=1)
+    dispatcher.add_listener("test", after, priority=1)
+
+    event = await dispatcher.adispatch("test")
+    assert event.timed_out == (hang,)
+    assert calls == ["inline", "after"]
+
+    # other events are not affected
+    assert (await dispatcher.adispatch("other")).timed_out == ()
+
+
+async def test_listener_timeout_abort():
+    dispatcher = AsyncEventDispatcher(on_timeout="abort")
+    after = []
+    dispatcher.add_listener("test", hang, timeout=0.01)
+    dispatcher.add_listener("test", after.append, priority=1)
+
+    event = SlottedEvent()
+    with pytest.raises(DispatchTimeoutError) as exc_info:
+        await dispatcher.adispatch("test", event)
+    assert exc_info.value.listeners == (hang,)
+    assert event.timed_out == (hang,)
+    assert after == []
+
+    # exceptions of timed listeners are raised as usual
+    dispatcher.add_listener("failing", lambda event: 1 / 0, timeout=1)
+    with pytest.raises(ZeroDivisionError):
+        await dispatcher.adispatch("failing")
+
+    with pytest.raises(ValueError):
+        dispatcher.add_listener("test", hang, timeout=0)
+    with pytest.raises(ValueError):
+        dispatcher.add_listener("test", hang, timeout=1, batch=True)
+    with pytest.raises(ValueError):
+        AsyncEventDispatcher(on_timeout="whatever")
+
+
+@pytest.mark.parametrize("concurrent", [False, True])
+async def test_dispatch_deadline(concurrent):
+    dispatcher = AsyncEventDispatcher(concurrent=concurrent)
+    calls = []
+
+    async def fast(event):
+        calls.append("fast")
+
+    dispatcher.add_listener("test", fast)
+    dispatcher.add_listener("test", hang, priority=1)
+    dispatcher.add_listener("test", fast, priority=2)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    event = await dispatcher.adispatch("test", deadline=start + 0.05)
+    assert loop.time() - start < 1
+    # the dispatch ends with the deadline, the listeners not called are recorded too
+    assert event.timed_out == (hang, fast)
+    assert calls == ["fast"]
+
+    # abort mode, with an already expired deadline
+    dispatcher.on_timeout = "abort"
+    with pytest.raises(DispatchTimeoutError) as exc_info:
+        await dispatcher.adispatch("test", deadline=loop.time())
+    assert exc_info.value.listeners == (fast, hang, fast)
+    assert calls == ["fast"]
+
+    # stages are compiled once, until the listeners change
+    stages = dispatcher._listeners._stages["test"]
+    assert len(stages) == 3
+    dispatcher.on_timeout = "skip"
+    await dispatcher.adispatch("test", deadline=loop.time())
+    assert dispatcher._listeners._stages["test"] is stages
+    dispatcher.remove_listener("test", hang)
+    assert "test" not in dispatcher._listeners._stages
+    await dispatcher.adispatch("test", deadline=loop.time() + 1)
+    assert calls == ["fast", "fast", "fast"]
+
+    # nobody listens, nothing to wait for
+    assert await dispatcher.adispatch("other", deadline=loop.time(), factory=SlottedEvent) is None
+
+
+async def test_dispatch_deadline_concurrent_tier():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    calls = []
+
+    async def fast(event):
+        calls.append("fast")
+
+    async def last(event):
+        calls.append("last")
+
+    dispatcher.add_listener("test", hang)
+    dispatcher.add_listener("test", fast)
+    dispatcher.add_listener("test", last, priority=1)
+
+    event = await dispatcher.adispatch("test", deadline=asyncio.get_running_loop().time() + 0.05)
+    # only the listener of the tier still running is cancelled, the next tier is not called
+    assert calls == ["fast"]
+    assert event.timed_out == (hang, last)
+
+
+async def test_dispatch_deadline_concurrent_errors():
+    dispatcher = AsyncEventDispatcher(concurrent=True)
+    dispatcher.add_listener("test", lambda event: 1 / 0)
+    dispatcher.add_listener("test", lambda event: [][0])
+
+    with pytest.raises(DispatchError):
+        await dispatcher.adispatch("test", deadline=asyncio.get_running_loop().time() + 1)
+
+    # grouped like without deadline, even if only one listener of the tier failed
+    dispatcher.add_listener("other", lambda event: 1 / 0)
+    dispatcher.add_listener("other", lambda event: None)
+    with pytest.raises(DispatchError) as exc_info:
+        await dispatcher.adispatch("other", deadline=asyncio.get_running_loop().time() + 1)
+    assert [type(exc) for exc in exc_info.value.exceptions] == [ZeroDivisionError]
+
+
+async def test_dispatch_deadline_bus():
+    bus = AsyncEventBus(queue_size=1)
+    received = []
+
+    async def slow(event):
+        await asyncio.sleep(0.2)
+        received.append(event)
+
+    bus.add_listener("test", slow)
+    loop = asyncio.get_running_loop()
+    # enqueueing blocks once the queue is full, the deadline bounds the wait
+    for _ in range(3):
+        event = await bus.adispatch("test", deadline=loop.time() + 0.05)
+    assert event.timed_out
+    await bus.aclose()
+
+
+async def test_cancelled_dispatch_is_not_a_timeout():
+    dispatcher = AsyncEventDispatcher()
+    dispatcher.add_listener("test", hang, timeout=5)
+
+    task = asyncio.ensure_future(dispatcher.adispatch("test"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
@@ -0,0 +1,130 @@
+import gc
+from unittest.mock import Mock
+
+import pytest
+
+from whistle import AsyncEventDispatcher, EventDispatcher
+from whistle.weak import AsyncWeakListener, WeakListener
+
+
+class Connection:
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, event):
+        self.events.append(event)
+
+    async def on_async_event(self, event):
+        self.events.append(event)
+
+
+def test_weak_bound_method_is_pruned_when_collected():
+    dispatcher = EventDispatcher()
+    other = Mock()
+    connection = Connection()
+    dispatcher.add_listener("data", connection.on_event, weak=True)
+    dispatcher.add_listener("data", other)
+
+    event = dispatcher.dispatch("data")
+    assert connection.events == [event]
+    assert isinstance(dispatcher.get_listeners("data")[0], WeakListener)
+
+    del connection
+    gc.collect()
+
+    assert dispatcher.get_listeners("data") == (other,)
+    dispatcher.dispatch("data")
+    assert other.call_count == 2
+
+    dispatcher.remove_listener("data", other)
+    assert not dispatcher.has_listeners("data")
+    assert not dispatcher.has_listeners()
+
+
+def test_weak_function_and_pattern():
+    dispatcher = EventDispatcher()
+    calls = []
+
+    def listener(event):
+        calls.append(event.name)
+
+    dispatcher.add_listener("order.*", listener, weak=True)
+    dispatcher.dispatch("order.created")
+    assert calls == ["order.created"]
+
+    del listener
+    gc.collect()
+
+    assert not dispatcher.has_listeners("order.created")
+    assert dispatcher.dispatch("order.created", factory=Mock()) is None
+
+
+def test_weak_listener_can_be_removed_explicitly():
+    dispatcher = EventDispatcher()
+    connection = Connection()
+    dispatcher.add_listener("data", connection.on_event, weak=True)
+    dispatcher.remove_listener("data", connection.on_event)
+    assert not dispatcher.has_listeners("data")
+
+    # re-registered strongly, the collection of the old weak registration must not remove it
+    dispatcher.add_listener("data", connection.on_event)
+    del connection
+    gc.collect()
+    assert len(dispatcher.get_listeners("data")) == 1
+
+
+def test_weak_listener_options():
+    dispatcher = EventDispatcher()
+    connection = Connection()
+    with pytest.raises(ValueError):
+        dispatcher.add_listener("data", connection.on_event, weak=True, batch=True)
+    with pytest.raises(ValueError):
+        dispatcher.add_listener("data", connection.on_event, weak=True, process=True)
+    with pytest.raises(TypeError):
+        dispatcher.add_listener("data", connection.on_async_event, weak=True)
+
+
+async def test_async_weak_listener():
+    dispatcher = AsyncEventDispatcher()
+    connection = Connection()
+    dispatcher.add_listener("data", connection.on_async_event, weak=True)
+    assert isinstance(dispatcher.get_listeners("data")[0], AsyncWeakListener)
+
+    event = await dispatcher.adispatch("data")
+    assert connection.events == [event]
+
+    del connection
+    gc.collect()
+    assert not dispatcher.has_listeners("data")
+
+    # regular functions are accepted too
+    other = Connection()
+    dispatcher.add_listener("data", other.on_event, weak=True)
+    event = await dispatcher.adispatch("data")
+    assert other.events == [event]
+
+    del other
+    gc.collect()
+    assert not dispatcher.has_listeners("data")
+
+
+@pytest.mark.parametrize(
+    "options", [{"where": {"name": "data"}}, {"timeout": 1}, {"where": {"name": "data"}, "timeout": 1}]
+)
+async def test_async_weak_listener_nested_wrappers(options):
+    dispatcher = AsyncEventDispatcher()
+    connection = Connection()
+    # regular function, weak and inline, then timed and/or filtered
+    dispatcher.add_listener("data", connection.on_event, weak=True, **options)
+    event = await dispatcher.adispatch("data")
+    assert connection.events == [event]
+
+    del connection
+    gc.collect()
+    assert not dispatcher.has_listeners("data")
+
+    # removed explicitly, with the original listener
+    for on_event in (Connection().on_async_event, Connection().on_event):
+        dispatcher.add_listener("data", on_event, **options)
+        dispatcher.remove_listener("data", on_event)
+        assert not dispatcher.has_listeners("data")
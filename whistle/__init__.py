@@ -1,13 +1,47 @@
-from whistle._version import __version__
 from whistle.dispatchers import AsyncEventDispatcher, EventDispatcher
-from whistle.event import Event
-from whistle.typing import *
-from whistle.typing import __all__ as _typing_all
+from whistle.event import Event, SlottedEvent
 
 __all__ = [
+    "AsyncEventBus",
     "AsyncEventDispatcher",
+    "AsyncQueuedEventDispatcher",
     "Event",
     "EventDispatcher",
+    "QueuedEventDispatcher",
+    "SlottedEvent",
+    "ThreadPoolEventDispatcher",
     "__version__",
-    *_typing_all,
+    "IAsyncEventDispatcher",
+    "IDispatchedEvent",
+    "IEvent",
+    "IEventDispatcher",
+    "IListener",
 ]
+
+# the version (read with importlib.metadata), the typing protocols and the dispatchers depending on asyncio, threading
+# or concurrent.futures are imported on first access, to keep whistle's import cheap
+_lazy = {
+    "AsyncEventBus": "whistle.dispatchers",
+    "AsyncQueuedEventDispatcher": "whistle.dispatchers",
+    "QueuedEventDispatcher": "whistle.dispatchers",
+    "ThreadPoolEventDispatcher": "whistle.dispatchers",
+    "__version__": "whistle._version",
+    "IAsyncEventDispatcher": "whistle.typing",
+    "IDispatchedEvent": "whistle.typing",
+    "IEvent": "whistle.typing",
+    "IEventDispatcher": "whistle.typing",
+    "IListener": "whistle.typing",
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        from importlib import import_module
+
+        value = globals()[name] = getattr(import_module(_lazy[name]), name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
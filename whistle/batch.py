@@ -0,0 +1,50 @@
+"""
+Batch listeners receive a list of events instead of a single event, so they can process a burst of events at once (for
+example with a single bulk insert) when events are dispatched with ``dispatch_many()`` / ``adispatch_many()``.
+
+"""
+
+from __future__ import annotations
+
+from whistle.listeners import ListenerWrapper
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from whistle.typing import IEvent
+
+
+class BatchListener(ListenerWrapper):
+    """
+    Wraps a listener taking a list of events. When a single event is dispatched, the listener is called with a
+    one-item list.
+
+    You usually don't have to create them yourself, use ``add_listener(..., batch=True)`` instead.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, listener, /):
+        if isinstance(listener, BatchListener):
+            listener = listener.listener
+        super().__init__(listener)
+
+    def __call__(self, event: IEvent, /):
+        return self.listener([event])
+
+
+class AsyncBatchListener(BatchListener):
+    """
+    Same as :class:`BatchListener`, for :class:`whistle.AsyncEventDispatcher` (the wrapped listener is a coroutine
+    function).
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, event: IEvent, /):
+        return await self.listener([event])
@@ -3,5 +3,31 @@ from .synchronous import EventDispatcher
 
 __all__ = [
     "EventDispatcher",
+    "AsyncEventBus",
     "AsyncEventDispatcher",
+    "AsyncQueuedEventDispatcher",
+    "QueuedEventDispatcher",
+    "ThreadPoolEventDispatcher",
 ]
+
+# dispatchers depending on asyncio, threading or concurrent.futures are imported on first access, to keep whistle's
+# import cheap
+_lazy = {
+    "AsyncEventBus": "bus",
+    "AsyncQueuedEventDispatcher": "queued",
+    "QueuedEventDispatcher": "queued",
+    "ThreadPoolEventDispatcher": "threaded",
+}
+
+
+def __getattr__(name):
+    if name in _lazy:
+        from importlib import import_module
+
+        value = globals()[name] = getattr(import_module(f".{_lazy[name]}", __name__), name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted({*globals(), *__all__})
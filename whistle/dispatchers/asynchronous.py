@@ -1,9 +1,32 @@
-import asyncio
-from typing import Optional, cast
+from __future__ import annotations
 
+from functools import partial
+
+from whistle.batch import AsyncBatchListener, BatchListener
 from whistle.dispatchers.base import AbstractEventDispatcher
-from whistle.event import Event
-from whistle.typing import IDispatchedEvent, IEvent, IListener
+from whistle.dispatchers.plans import (
+    MAX_CACHED_UNREGISTERED_PLANS,
+    async_noop_plan,
+    compile_async_plan,
+    compile_concurrent_plan,
+)
+from whistle.listeners import AsyncFilteredListener, InlineListener, ListenerWrapper, is_coroutine_function
+from whistle.instrumentation import AsyncInstrumentation
+from whistle.offload import AsyncProcessListener, ProcessListener
+from whistle.weak import AsyncWeakListener, WeakListener
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Optional
+    from whistle.typing import IDispatchedEvent, IEvent, IListener
+
+SKIP = "skip"
+"""Timeout mode: listeners that timed out are cancelled and recorded on the event, and the dispatch goes on."""
+
+ABORT = "abort"
+"""Timeout mode: listeners that timed out are cancelled and recorded on the event, then the dispatch is aborted."""
+
+TIMEOUT_MODES = (SKIP, ABORT)
 
 
 class AsyncEventDispatcher(AbstractEventDispatcher):
@@ -12,31 +35,265 @@ class AsyncEventDispatcher(AbstractEventDispatcher):
 
     .. versionadded:: 2.0
 
+    In concurrent mode, listeners sharing the same priority ("tier") are run concurrently, while tiers are still run in
+    priority order. Stopping the propagation from any listener of a tier prevents the next tiers to run (the other
+    listeners of the same tier still run to completion). If listeners of a tier fail, the other listeners of the tier
+    still run to completion and a :class:`whistle.errors.DispatchError` exception group is raised (even if only one of
+    them failed), while the exception of a listener alone in its tier is raised as is, like in sequential mode.
+
+    Listeners can be given a ``timeout``, and dispatches a ``deadline`` (see :mod:`whistle.timeouts`). Listeners that
+    timed out are cancelled and recorded in the ``timed_out`` attribute of the event, then in ``"skip"`` timeout mode,
+    the dispatch goes on with the next listeners (unless the dispatch deadline expired), while in ``"abort"`` mode, a
+    :class:`whistle.errors.DispatchTimeoutError` is raised.
+
+    :param concurrent: run listeners sharing the same priority concurrently
+    :param thread_safe: allow listeners to be added or removed from other threads, see
+        :class:`whistle.EventDispatcher`
+    :param on_timeout: behaviour when a listener times out (skip or abort)
+
     """
 
-    def add_listener(self, event_id: str, listener: IListener, /, *, priority: int = 0):
-        # Use asyncio.iscoroutinefunction as it's more lenient and handles mock objects better
-        if not asyncio.iscoroutinefunction(listener):
-            raise TypeError(f"Listener should be a coroutine function, {type(listener)} given")
+    instrumentation_factory = AsyncInstrumentation
+
+    _noop_plan = staticmethod(async_noop_plan)
+
+    def __init__(self, *, concurrent: bool = False, thread_safe: bool = False, on_timeout: str = SKIP):
+        if on_timeout not in TIMEOUT_MODES:
+            raise ValueError(f"Invalid timeout mode {on_timeout!r}, expected one of {', '.join(TIMEOUT_MODES)}.")
+
+        super().__init__(thread_safe=thread_safe)
+        self.concurrent = concurrent
+        self.on_timeout = on_timeout
+
+    def add_listener(
+        self,
+        event_id: str,
+        listener: IListener,
+        /,
+        *,
+        priority: int = 0,
+        process: bool = False,
+        batch: bool = False,
+        weak: bool = False,
+        where: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Add a listener for the given event id, with the given priority.
+
+        :param event_id: string identifier for the event (or pattern)
+        :param listener: coroutine function or regular function to be called when the event is dispatched (regular
+            functions are called directly, and their result is only awaited if it is awaitable)
+        :param priority: integer priority for the listener (-20 (high) to 19 (low))
+        :param process: call the (regular function) listener in a worker process, see :mod:`whistle.offload`
+        :param batch: the listener takes a list of events (see :meth:`adispatch_many`)
+        :param weak: only keep a weak reference to the listener, see :mod:`whistle.weak`
+        :param where: only call the listener for events whose attributes equal the given values (attribute name ->
+            value), see :class:`whistle.listeners.FilteredListener`
+        :param timeout: maximum time (in seconds) the listener may run, see :mod:`whistle.timeouts`
+
+        """
+        if where is not None and (batch or isinstance(listener, BatchListener)):
+            raise ValueError("Batch listeners cannot be filtered.")
+        if timeout is not None and (batch or isinstance(listener, BatchListener)):
+            raise ValueError("Batch listeners cannot have a timeout.")
+        if process or isinstance(listener, ProcessListener):
+            if batch or weak:
+                raise ValueError("Batch and weak listeners cannot be called in a worker process.")
+            listener = AsyncProcessListener(listener)
+        else:
+            if weak and (batch or isinstance(listener, BatchListener)):
+                raise ValueError("Batch listeners cannot be weak.")
+            # the kind of listener is resolved once, regular functions are then called without creating a coroutine
+            inline = not is_coroutine_function(listener.listener if isinstance(listener, ListenerWrapper) else listener)
+            if batch or isinstance(listener, BatchListener):
+                listener = BatchListener(listener) if inline else AsyncBatchListener(listener)
+            if weak:
+                listener = (WeakListener if inline else AsyncWeakListener)(
+                    listener, partial(self._discard_listener, event_id)
+                )
+            if inline:
+                listener = InlineListener(listener)
+        if timeout is not None:
+            from whistle.timeouts import TimeoutListener
+
+            listener = TimeoutListener(listener, timeout)
+        if where is not None:
+            listener = AsyncFilteredListener(listener, where)
         return super().add_listener(event_id, listener, priority=priority)
 
-    def dispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent:
+    def dispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]:
+        raise NotImplementedError("AsyncEventDispatcher does not implement sync dispatch")
+
+    def dispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]:
         raise NotImplementedError("AsyncEventDispatcher does not implement sync dispatch")
 
-    async def adispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent:
+    async def adispatch(
+        self,
+        event_id: str,
+        event: Optional[IEvent] = None,
+        /,
+        *,
+        factory: Optional[Callable[[], IEvent]] = None,
+        deadline: Optional[float] = None,
+    ) -> Optional[IDispatchedEvent]:
         """
-        :param event_id:
-        :param event:
-        :return:
+        Dispatch the given event, with the given event id, awaiting the listeners. See
+        :meth:`whistle.EventDispatcher.dispatch`.
+
+        With a ``deadline`` (in the time of the event loop clock, like :func:`asyncio.timeout_at`, for example
+        ``loop.time() + 0.5``), the listeners still running when it expires are cancelled, and the next ones are not
+        called, both being recorded as timed out (see :mod:`whistle.timeouts`). Listeners are then called one after
+        another (or tier after tier, in concurrent mode) rather than with the compiled dispatch plan, so neither
+        instrumentation nor dispatch policies apply.
+
+        :param event_id: hashable identifier for the event
+        :param event: optional event instance
+        :param factory: optional callable creating the event, only called if there are listeners
+        :param deadline: optional time at which the dispatch is stopped
+        :return: the event instance after it has been dispatched (``None`` if a factory was given but there are no
+            listeners)
+
         """
+        plan = self._listeners._plans.get(event_id)
+        if plan is None:
+            plan = self._get_plan(event_id)
+
         if event is None:
-            event = Event()
+            if factory is None:
+                event = self.event_factory()
+            elif plan is async_noop_plan:
+                return None
+            else:
+                event = factory()
 
         event.name = event_id
         event.dispatcher = self
 
-        await self._adispatch(self.get_listeners(event_id), event)
-        return cast(IDispatchedEvent, event)
+        if deadline is None:
+            await plan(event)
+        elif plan is not async_noop_plan:
+            await self._adispatch_until(event_id, event, deadline)
+
+        return event  # type: ignore[return-value]
+
+    async def adispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]:
+        """
+        Dispatch the given events, all with the given event id, resolving the listeners only once. See
+        :meth:`whistle.EventDispatcher.dispatch_many` for details (including dispatch policies), listeners are awaited
+        one after another.
+
+        :param event_id: hashable identifier for the events
+        :param events: event instances
+        :return: the list of event instances after they have been dispatched
+
+        """
+        if self.get_policy(event_id) is not None:
+            return [await self.adispatch(event_id, event) for event in events]
+
+        events = list(events)
+        for event in events:
+            event.name = event_id
+            event.dispatcher = self
+
+        pending = events
+        for listener in self._listeners.get(event_id):
+            if not pending:
+                break
+            if isinstance(listener, InlineListener) and isinstance(listener.listener, BatchListener):
+                # regular batch function, called with all the events (its result is only awaited if awaitable)
+                await InlineListener(listener.listener.listener)(pending)
+            elif isinstance(listener, BatchListener):
+                await listener.listener(pending)
+            else:
+                for event in pending:
+                    await listener(event)
+            pending = [event for event in pending if not event.propagation_stopped]
+
+        return events  # type: ignore[return-value]
+
+    async def aflush_policies(self) -> None:
+        """
+        Dispatches now the events deferred by the dispatch policies of this dispatcher (see :meth:`set_policy`), for
+        example before shutting down.
+
+        .. versionadded:: 2.2
+
+        """
+        for plan, event in self._flush_policies():
+            await plan(event)
+
+    def _schedule(self, delay: float, callback, /):
+        from asyncio import get_running_loop
+
+        get_running_loop().call_later(delay, callback)
+
+    def _run_deferred(self, plan, event: IEvent, /):
+        from whistle.policies import spawn
+
+        spawn(plan(event))
+
+    def _discard_listener(self, event_id: str, listener: IListener, /):
+        # called once a weak listener has been collected
+        self._listeners._discard(event_id, listener)
+
+    def _compile_plan(self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None):
+        if type(self)._adispatch is not AsyncEventDispatcher._adispatch:
+            # subclasses overriding _adispatch still get called with the listeners tuple
+            return partial(self._adispatch, listeners)
+        if self.concurrent:
+            return compile_concurrent_plan(self._get_tiers(event_id, listeners, tiers=tiers))
+        return compile_async_plan(listeners)
+
+    def _get_stages(self, event_id: str, /) -> tuple:
+        # the stages of a dispatch with a deadline: one per listener (or per tier, in concurrent mode), as a tuple of
+        # the stage listeners and of their plans (compiled once, and cached until the listeners change)
+        stages = self._listeners._stages.get(event_id)
+        if stages is not None:
+            return stages
+
+        with self._listeners._lock:
+            listeners = self._listeners.get(event_id)
+            if self.concurrent:
+                tiers = self._get_tiers(event_id, listeners)
+            else:
+                tiers = tuple((listener,) for listener in listeners)
+            # each listener gets a plan of its own (which respects how subclasses call listeners), so that the
+            # listeners still running when the deadline expires are known
+            stages = tuple(
+                (tier, tuple(self._compile_plan(event_id, (listener,), tiers=((listener,),)) for listener in tier))
+                for tier in tiers
+            )
+            if self._listeners._is_registered(event_id) or len(self._listeners._stages) < MAX_CACHED_UNREGISTERED_PLANS:
+                self._listeners._cache_stages(event_id, stages)
+            return stages
+
+    async def _adispatch_until(self, event_id: str, event: IEvent, deadline: float, /):
+        # the stages run in a single task, cancelled when the deadline expires
+        from asyncio import get_running_loop
+
+        from whistle.timeouts import check_tasks, expire, run_stages, wait_tasks
+
+        stages = self._get_stages(event_id)
+        # index of the current stage, and its listeners not done yet
+        progress = [0, stages[0][0]]
+        remaining = deadline - get_running_loop().time()
+        if remaining > 0:
+            tasks, pending = await wait_tasks([run_stages(stages, event, progress)], remaining)
+            if not (pending and tasks[0].cancelled()):
+                check_tasks(tasks, event)
+                return
+
+        # the current stage listeners not done yet (all of them if the deadline expired before the dispatch started),
+        # and the next stages ones, never called
+        index, running = progress
+        expire(
+            event,
+            [*running, *(listener for tier, _ in stages[index + 1 :] for listener in tier)],
+            f"Dispatch of {event_id!r} exceeded its deadline.",
+        )
 
     async def _adispatch(self, listeners, event):
         for listener in listeners:
@@ -1,13 +1,40 @@
+from __future__ import annotations
+
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from functools import partial
+from itertools import chain, islice
+
+from whistle.dispatchers.plans import MAX_CACHED_UNREGISTERED_PLANS, compile_routed_plan
+from whistle.event import Event
+from whistle.instrumentation import Instrumentation
+from whistle.listeners import ListenersCollection, ThreadSafeListenersCollection, is_pattern, match_pattern
 
-from whistle.listeners import ListenersCollection
-from whistle.typing import IDispatchedEvent, IEvent, IListener
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Optional
+    from whistle.policies import DispatchPolicy
+    from whistle.typing import IDispatchedEvent, IEvent, IListener
 
 
 class AbstractEventDispatcher(metaclass=ABCMeta):
-    def __init__(self):
-        self._listeners = ListenersCollection()
+    event_factory = Event
+    """
+    Callable creating the events to dispatch when no event is given. Can be replaced per instance, for example with
+    :meth:`whistle.event.EventPool.acquire` to reuse event instances.
+    """
+
+    instrumentation_factory = Instrumentation
+    """
+    Class of the metrics recorder used when instrumentation is enabled, see :meth:`enable_instrumentation`.
+    """
+
+    parent = None
+    """Dispatcher this one inherits the listeners from, for child dispatchers (see :meth:`child`)."""
+
+    def __init__(self, *, thread_safe: bool = False):
+        self._listeners = ThreadSafeListenersCollection() if thread_safe else ListenersCollection()
+        self._instrumentation = None
+        self._policies = {}
 
     def get_listeners(self, event_id: Optional[str] = None, /):
         # compatibility with 1.x
@@ -23,33 +50,261 @@ class AbstractEventDispatcher(metaclass=ABCMeta):
 
         return self._listeners.has(event_id)
 
-    def add_listener(self, event_id: str, listener: IListener, /, *, priority: int = 0):
-        return self._listeners.add(event_id, listener, priority=priority)
+    def add_listener(self, event_id: str, listener: IListener, /, *, priority: int = 0, where: Optional[dict] = None):
+        return self._listeners.add(event_id, listener, priority=priority, where=where)
 
     def remove_listener(self, event_id: str, listener: IListener, /):
         # deprecated compatibility method
-        return self._listeners.remove(event_id, listener)
+        result = self._listeners.remove(event_id, listener)
+        if self._instrumentation is not None:
+            # forget the metrics of the removed listener (unless it is still registered for a matching pattern)
+            pattern = is_pattern(event_id)
+            for _event_id in [
+                _event_id
+                for _event_id in self._instrumentation.listeners
+                if _event_id == event_id
+                or (pattern and isinstance(_event_id, str) and match_pattern(event_id, _event_id))
+            ]:
+                self._instrumentation.prune(_event_id, self._listeners.get(_event_id))
+        return result
 
     def listen(self, event_id: str, /, *, priority=0):
         """
-        Decorator that add the decorated functions as one of this instance listeners, for the given event name.
-
-        deperecated ?
+        Decorator that adds the decorated function as one of this instance listeners, for the given event id (see
+        :meth:`add_listener`). The function is returned unchanged.
 
-        :param event_id:
-        :param priority:
-        :return:
+        :param event_id: string identifier for the event (or pattern)
+        :param priority: integer priority for the listener (-20 (high) to 19 (low))
 
         """
 
         def wrapper(listener):
-            self._listeners.add(event_id, listener, priority=priority)
+            self.add_listener(event_id, listener, priority=priority)
             return listener
 
         return wrapper
 
+    def child(self):
+        """
+        Returns a child dispatcher, inheriting the listeners of this one: dispatching an event with the child calls
+        both the listeners added to the child and the ones added to this dispatcher (before or after the child was
+        created), merged in priority order (and registration order, for listeners with the same priority). Listeners
+        added to the child are not seen by this dispatcher, and inherited listeners cannot be removed from the child.
+
+        Creating a child does not copy any listener, which makes it cheap enough to create one per request, for
+        example. The resolved listeners and dispatch plans of the child are cached until the listeners of the child or
+        of one of its ancestors change, and event ids without listeners added to the child use the dispatch plans of
+        this dispatcher.
+
+        The child is a shallow copy of this dispatcher (same class and settings), without instrumentation.
+
+        .. versionadded:: 2.2
+
+        """
+        child = object.__new__(type(self))
+        child.__dict__.update(self.__dict__)
+        child.parent = self
+        child._listeners = self._listeners.child()
+        child._instrumentation = None
+        child._policies = {}
+        return child
+
+    def set_policy(self, event_id: str, policy: Optional[DispatchPolicy], /) -> None:
+        """
+        Applies a dispatch policy (see :mod:`whistle.policies`) to the given event id, limiting how often its listeners
+        run, or removes the current one if ``None`` is given (its pending events are dispatched). Children inherit the
+        policies of their parent, unless they set their own. Events dispatched with ``dispatch_many()`` are submitted to
+        the policy one by one, while dispatches with a ``deadline`` (see :meth:`whistle.AsyncEventDispatcher.adispatch`)
+        bypass it.
+
+        .. versionadded:: 2.2
+
+        :param event_id: string identifier for the event (patterns are not supported)
+        :param policy: the policy instance (each event id needs its own), or ``None``
+
+        """
+        with self._listeners._lock:
+            current = self._policies.get(event_id)
+            if policy is not None:
+                policy.bind(self)
+                self._policies[event_id] = policy
+            elif current is not None:
+                del self._policies[event_id]
+            self._listeners._forget(event_id)
+        if current is not None and current is not policy:
+            for plan, event in current.flush():
+                self._run_deferred(plan, event)
+
+    def get_policy(self, event_id: str, /) -> Optional[DispatchPolicy]:
+        """
+        Returns the dispatch policy applied to the given event id (including inherited ones), if any.
+
+        .. versionadded:: 2.2
+
+        """
+        policy = self._policies.get(event_id)
+        if policy is None and self.parent is not None:
+            return self.parent.get_policy(event_id)
+        return policy
+
+    def enable_instrumentation(self, *, max_samples: int = 1024) -> None:
+        """
+        Starts recording metrics about dispatched events and their listeners (see :meth:`stats`). Dispatch plans are
+        compiled again with instrumented listeners, other dispatch plans are used again once disabled, so
+        instrumentation does not cost anything unless enabled.
+
+        .. versionadded:: 2.2
+
+        :param max_samples: number of most recent durations kept to compute percentiles, per event id and per listener
+
+        """
+        with self._listeners._lock:
+            self._instrumentation = self.instrumentation_factory(max_samples=max_samples)
+            self._listeners._clear_plans()
+
+    def disable_instrumentation(self) -> None:
+        """
+        Stops recording metrics, and forgets the recorded ones.
+
+        .. versionadded:: 2.2
+
+        """
+        with self._listeners._lock:
+            self._instrumentation = None
+            self._listeners._clear_plans()
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the recorded metrics: ``"events"`` maps event ids to their metrics (number of calls,
+        errors and propagation stops, total and mean time, and 50th, 90th and 99th percentiles and max of the recent
+        durations, in seconds), ``"listeners"`` maps event ids to a list of the same metrics per listener (with the
+        listener under the ``"listener"`` key), ``"cache"`` gives the statistics of the listeners cache (see
+        :meth:`whistle.listeners.ListenersCollection.stats`), and ``"policies"`` maps event ids to the counters of their
+        dispatch policy (see :meth:`whistle.policies.DispatchPolicy.stats`).
+
+        Events and listeners metrics are only recorded while instrumentation is enabled, for ``dispatch()`` and
+        ``adispatch()`` of event ids with listeners. The same goes for the cache hits of dispatches, which only count
+        the lookups of :meth:`get_listeners` otherwise.
+
+        .. versionadded:: 2.2
+
+        """
+        stats = (
+            self._instrumentation.snapshot() if self._instrumentation is not None else {"events": {}, "listeners": {}}
+        )
+        stats["cache"] = self._listeners.stats()
+        stats["policies"] = {event_id: policy.stats() for event_id, policy in self._policies.items()}
+        return stats
+
+    def _get_plan(self, event_id: str, /):
+        # compile and cache the dispatch plan for this event id, until its listeners change (with the collection lock
+        # held, if any, so that listeners cannot change between resolving them and caching the plan)
+        with self._listeners._lock:
+            plan = self._listeners._plans.get(event_id)
+            if plan is not None:
+                # compiled by another thread meanwhile
+                return plan
+
+            listeners = self._listeners.get(event_id)
+            if self._instrumentation is not None:
+                # the listeners removed since the last plan (for example weak ones, once collected) are forgotten
+                self._instrumentation.prune(event_id, listeners)
+            parent = self.parent
+            if (
+                parent is not None
+                and self._instrumentation is None
+                and parent._instrumentation is None
+                and not self._listeners._has_own(event_id)
+                and event_id not in self._policies
+            ):
+                # nothing added to this child for this event id, share the parent's plan
+                plan = parent._listeners._plans.get(event_id) or parent._get_plan(event_id)
+            else:
+                signatures = self._listeners._signatures(event_id) if listeners else None
+                if signatures:
+                    # filtered listeners, each combination of filtered attribute values gets its own plan
+                    plan = compile_routed_plan(
+                        tuple(sorted(set(chain.from_iterable(signatures)))), partial(self._compile_route, event_id)
+                    )
+                    if self._instrumentation is not None:
+                        plan = self._instrumentation.instrument_plan(event_id, plan)
+                elif listeners and self._instrumentation is not None:
+                    self._listeners._compiled += 1
+                    plan = self._instrumentation.instrument_plan(
+                        event_id,
+                        self._compile_plan(event_id, self._instrumentation.instrument_listeners(event_id, listeners)),
+                    )
+                else:
+                    self._listeners._compiled += 1
+                    plan = self._compile_plan(event_id, listeners)
+
+                policy = self.get_policy(event_id) if listeners else None
+                if policy is not None:
+                    plan = policy.wrap(plan)
+            if self._listeners._is_registered(event_id) or len(self._listeners._plans) < MAX_CACHED_UNREGISTERED_PLANS:
+                if listeners and self._instrumentation is not None:
+                    # dispatches read the plans cache directly, so its hits are only counted while instrumented: the
+                    # cached plan counts them, while this dispatch (a miss, already counted by get()) uses it as is
+                    self._listeners._cache_plan(event_id, _count_hits(self._listeners, plan))
+                else:
+                    self._listeners._cache_plan(event_id, plan)
+            return plan
+
+    def _compile_route(self, event_id: str, event: IEvent, /):
+        # compiles the plan of the listeners of the given event id matching the given event (filtered or not), see
+        # whistle.dispatchers.plans.compile_routed_plan()
+        with self._listeners._lock:
+            tiers = self._listeners._tiers(event_id, event)
+            listeners = tuple(chain.from_iterable(tiers))
+            self._listeners._compiled += 1
+            if listeners and self._instrumentation is not None:
+                listeners = self._instrumentation.instrument_listeners(event_id, listeners)
+            return self._compile_plan(event_id, listeners, tiers=tiers)
+
+    def _get_tiers(
+        self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None
+    ) -> tuple[tuple[IListener, ...], ...]:
+        # groups the given listeners (in the order resolved by the collection, but possibly wrapped) by priority tiers
+        listeners = iter(listeners)
+        if tiers is None:
+            tiers = self._listeners._tiers(event_id)
+        return tuple(tuple(islice(listeners, len(tier))) for tier in tiers)
+
+    def _flush_policies(self) -> list:
+        # pending events of the policies of this dispatcher, as (plan, event) tuples
+        return [item for policy in tuple(self._policies.values()) for item in policy.flush()]
+
+    @abstractmethod
+    def _schedule(self, delay: float, callback: Callable[[], None], /):
+        # calls the given callback after the given delay (in seconds), for dispatch policies
+        ...
+
     @abstractmethod
-    def dispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent: ...
+    def _run_deferred(self, plan, event: IEvent, /):
+        # dispatches an event deferred by a dispatch policy, with the given plan
+        ...
 
     @abstractmethod
-    async def adispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent: ...
+    def _compile_plan(self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None):
+        # tiers: listeners grouped by priority, if not the ones of the event id (see _get_tiers())
+        ...
+
+    @abstractmethod
+    def dispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]: ...
+
+    @abstractmethod
+    async def adispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]: ...
+
+
+def _count_hits(collection: ListenersCollection, plan, /):
+    # wraps a dispatch plan to count its calls as hits of the listeners cache (the result is returned as is, so that it
+    # works for synchronous and asynchronous plans)
+    def counted_plan(event, /):
+        collection._hits += 1
+        return plan(event)
+
+    return counted_plan
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+from typing import Callable, Iterable, Optional
+
+from whistle.dispatchers.asynchronous import AsyncEventDispatcher
+from whistle.dispatchers.plans import async_noop_plan
+from whistle.typing import IDispatchedEvent, IEvent, IListener
+
+logger = logging.getLogger(__name__)
+
+BLOCK = "block"
+"""Overflow policy: dispatching waits until there is room in the listener queue (backpressure)."""
+
+DROP_OLDEST = "drop_oldest"
+"""Overflow policy: the oldest pending event of the listener queue is dropped to make room for the new one."""
+
+DROP_NEWEST = "drop_newest"
+"""Overflow policy: the new event is dropped for this listener."""
+
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class ListenerQueue:
+    """
+    Bounded queue of pending events for one listener, consumed by worker tasks (started on first use, so it must be
+    used from within the event loop).
+
+    """
+
+    def __init__(
+        self,
+        listener: IListener,
+        /,
+        *,
+        maxsize: int,
+        workers: int,
+        overflow: str,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ):
+        self.listener = listener
+        self.maxsize = maxsize
+        self.workers = workers
+        self.overflow = overflow
+        self.on_error = on_error
+
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.max_depth = 0
+
+        self._queue = None
+        self._tasks = ()
+
+    async def put(self, event: IEvent, /):
+        queue = self._queue
+        if queue is None:
+            queue = self._start()
+
+        if queue.full():
+            if self.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return
+            if self.overflow == DROP_OLDEST:
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+
+        await queue.put(event)
+        self.enqueued += 1
+        if queue.qsize() > self.max_depth:
+            self.max_depth = queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def join(self):
+        """Waits until all the pending events have been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def aclose(self):
+        """Waits until all the pending events have been processed, then stops the workers."""
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue, self._tasks = None, ()
+
+    def close(self):
+        """Stops the workers now, the pending events are dropped (and counted as such)."""
+        if self._queue is not None:
+            self.dropped += self._queue.qsize()
+        for task in self._tasks:
+            task.cancel()
+        self._queue, self._tasks = None, ()
+
+    def _start(self):
+        self._queue = asyncio.Queue(self.maxsize)
+        self._tasks = tuple(asyncio.ensure_future(self._work()) for _ in range(self.workers))
+        return self._queue
+
+    async def _work(self):
+        queue = self._queue
+        while True:
+            event = await queue.get()
+            try:
+                await self.listener(event)
+                self.processed += 1
+            except Exception as exc:
+                self.failed += 1
+                if self.on_error is None:
+                    logger.exception("Error in listener %r.", self.listener, exc_info=exc)
+                else:
+                    self.on_error(exc)
+            finally:
+                queue.task_done()
+
+
+class AsyncEventBus(AsyncEventDispatcher):
+    """
+    Asynchronous event dispatcher where each listener has its own bounded queue of pending events, consumed by
+    ``workers`` worker tasks. Dispatching only puts the event in the queue of each listener (in priority order) and
+    returns, so a slow listener neither delays the dispatching code nor the other listeners, while the memory used by
+    pending events stays bounded.
+
+    When a listener queue is full, the ``overflow`` policy applies: ``"block"`` makes :meth:`adispatch` wait for some
+    room (backpressure), ``"drop_oldest"`` drops the oldest pending event of the queue and ``"drop_newest"`` drops the
+    new event (for this listener only).
+
+    As listeners run independently, stopping the propagation of an event has no effect on the other listeners, and
+    exceptions raised by listeners are given to ``on_error`` (or logged if no callback is given).
+
+    Once a listener is removed (or collected, for weak listeners) and not registered for any other event id, its queue
+    is dropped and its workers are cancelled, with the events still pending.
+
+    Child buses (see :meth:`child`) use the queues of their ancestors for the listeners they inherit, and queues of
+    their own for the listeners added to them.
+
+    .. versionadded:: 2.2
+
+    :param queue_size: maximum number of pending events per listener
+    :param workers: number of worker tasks per listener
+    :param overflow: policy to apply when a listener queue is full (block, drop_oldest or drop_newest)
+    :param on_error: callback for exceptions raised by listeners
+
+    """
+
+    def __init__(
+        self,
+        *,
+        queue_size: int = 1000,
+        workers: int = 1,
+        overflow: str = BLOCK,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy {overflow!r}, expected one of {', '.join(OVERFLOW_POLICIES)}.")
+        if queue_size < 1 or workers < 1:
+            raise ValueError("Queue size and number of workers must be positive.")
+
+        super().__init__()
+        self.queue_size = queue_size
+        self.workers = workers
+        self.overflow = overflow
+        self.on_error = on_error
+        self._queues = {}
+
+    def queue_stats(self) -> dict:
+        """
+        Returns, for each listener, the current depth of its queue, the maximum depth reached and the number of events
+        enqueued, processed, dropped and failed.
+
+        """
+        return {listener: queue.stats() for listener, queue in self._queues.items()}
+
+    async def join(self):
+        """Waits until all the pending events have been processed by the listeners."""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    async def aclose(self):
+        """Waits until all the pending events have been processed, then stops all the worker tasks."""
+        for queue in list(self._queues.values()):
+            await queue.aclose()
+
+    async def adispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]:
+        # listeners consume their own queues, so events are enqueued one after another (batch listeners get one-item
+        # lists)
+        return [await self.adispatch(event_id, event) for event in events]
+
+    def child(self):
+        child = super().child()
+        child._queues = {}
+        return child
+
+    def remove_listener(self, event_id: str, listener: IListener, /):
+        super().remove_listener(event_id, listener)
+        self._drop_queue(listener)
+
+    def _discard_listener(self, event_id: str, listener: IListener, /):
+        super()._discard_listener(event_id, listener)
+        self._drop_queue(listener)
+
+    def _drop_queue(self, listener: IListener, /):
+        # drops the queue of a listener (and stops its workers) once it is not registered for any event id anymore
+        if self._has_listener(listener):
+            return
+        queue = self._queues.pop(listener, None)
+        if queue is not None:
+            queue.close()
+
+    def _has_listener(self, listener: IListener, /) -> bool:
+        # is the listener registered for some event id, in this bus or one of its ancestors?
+        collection = self._listeners
+        while collection is not None:
+            if any(listener in index.positions for index in collection._items.values()):
+                return True
+            collection = collection.parent
+        return False
+
+    def _get_queue(self, listener: IListener, /) -> ListenerQueue:
+        queue = self._queues.get(listener)
+        if queue is None:
+            if self.parent is not None and self.parent._has_listener(listener):
+                # inherited listener, events go through the queue of the ancestor it was added to
+                return self.parent._get_queue(listener)
+            queue = self._queues[listener] = ListenerQueue(
+                listener, maxsize=self.queue_size, workers=self.workers, overflow=self.overflow, on_error=self.on_error
+            )
+        else:
+            # the listener may have been (un)wrapped since, for example when instrumentation is toggled
+            queue.listener = listener
+        return queue
+
+    def _compile_plan(self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None):
+        if not listeners:
+            return async_noop_plan
+
+        puts = tuple(self._get_queue(listener).put for listener in listeners)
+
+        async def plan(event, /):
+            for put in puts:
+                await put(event)
+
+        return plan
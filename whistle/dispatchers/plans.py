@@ -0,0 +1,269 @@
+"""
+Dispatch plans are specialized callables, compiled once per event id from the sorted listeners tuple, that call each
+listener in turn and stop as soon as the event propagation is stopped.
+
+Compared to the generic ``for listener in listeners`` loop, a plan unrolls the loop into straight-line code where
+listeners are closure variables, which removes the iterator and most of the interpreter overhead per call. Plans are
+cached by the :class:`whistle.listeners.ListenersCollection` next to the sorted listeners, and invalidated with them.
+
+"""
+
+from functools import lru_cache
+
+from whistle.errors import DispatchError
+from whistle.listeners import _MISSING, MAX_CACHED_UNREGISTERED_LISTENERS, InlineListener
+
+#: Above this number of listeners, we do not unroll the dispatch loop anymore (the code object would get huge for no
+#: measurable gain), and fall back to a closure running the generic loop.
+MAX_UNROLLED_LISTENERS = 32
+
+#: Plans of event ids having no listener registered for them as such (so that dispatching an event nobody listens to,
+#: or only listened to by patterns, costs a single dict lookup) are only cached while the plans cache is smaller than
+#: this, same as the sorted listeners (see :data:`whistle.listeners.MAX_CACHED_UNREGISTERED_LISTENERS`).
+MAX_CACHED_UNREGISTERED_PLANS = MAX_CACHED_UNREGISTERED_LISTENERS
+
+#: Maximum number of plans cached by a routed plan (one per combination of filtered attribute values), so that
+#: dispatching events with arbitrary attribute values cannot grow the cache without bounds.
+MAX_CACHED_ROUTES = 4096
+
+
+def noop_plan(event, /):
+    """Synchronous dispatch plan of event ids without listeners."""
+
+
+async def async_noop_plan(event, /):
+    """Asynchronous dispatch plan of event ids without listeners."""
+
+
+@lru_cache(maxsize=1024)
+def _get_plan_factory(size: int, /, *, is_async: bool, inline: tuple = ()):
+    """
+    Generates (once per size, kind and inline positions) a factory that takes ``size`` listeners and returns an
+    unrolled dispatch plan calling them in order. In asynchronous plans, listeners are awaited, except the ones at the
+    ``inline`` positions (regular functions), whose result is only awaited if it is awaitable.
+
+    """
+    names = [f"_{i}" for i in range(size)]
+    call = "await " if is_async else ""
+
+    body = []
+    for i, name in enumerate(names):
+        if i:
+            body.append("        if event.propagation_stopped:")
+            body.append("            return")
+        if i in inline:
+            body.append(f"        result = {name}(event)")
+            body.append("        if result is not None and hasattr(result, '__await__'):")
+            body.append("            await result")
+        else:
+            body.append(f"        {call}{name}(event)")
+
+    source = "\n".join(
+        [
+            f"def factory({', '.join(names)}):",
+            f"    {'async ' if is_async else ''}def plan(event, /):",
+            *body,
+            "    return plan",
+        ]
+    )
+
+    namespace = {}
+    exec(compile(source, f"<whistle plan ({size})>", "exec"), namespace)
+    return namespace["factory"]
+
+
+def compile_plan(listeners: tuple, /):
+    """
+    Compiles a synchronous dispatch plan for the given listeners tuple.
+
+    :param listeners: listeners, in dispatch order
+    :return: callable taking the event as only argument
+
+    """
+    if not listeners:
+        return noop_plan
+
+    if len(listeners) > MAX_UNROLLED_LISTENERS:
+
+        def plan(event, /):
+            for listener in listeners:
+                listener(event)
+                if event.propagation_stopped:
+                    break
+
+        return plan
+
+    return _get_plan_factory(len(listeners), is_async=False)(*listeners)
+
+
+def compile_async_plan(listeners: tuple, /):
+    """
+    Compiles an asynchronous dispatch plan for the given listeners tuple (each listener call is awaited, except for
+    :class:`whistle.listeners.InlineListener` wrapped regular functions, called directly).
+
+    :param listeners: listeners, in dispatch order
+    :return: coroutine function taking the event as only argument
+
+    """
+    if not listeners:
+        return async_noop_plan
+
+    inline = tuple(i for i, listener in enumerate(listeners) if isinstance(listener, InlineListener))
+    if inline:
+        listeners = tuple(
+            listener.listener if isinstance(listener, InlineListener) else listener for listener in listeners
+        )
+
+    if len(listeners) > MAX_UNROLLED_LISTENERS:
+        if not inline:
+
+            async def plan(event, /):
+                for listener in listeners:
+                    await listener(event)
+                    if event.propagation_stopped:
+                        break
+
+            return plan
+
+        # same as unrolled plans, regular functions are called directly and their result only awaited if awaitable
+        calls = tuple((listener, i in inline) for i, listener in enumerate(listeners))
+
+        async def plan(event, /):
+            for listener, is_inline in calls:
+                if is_inline:
+                    result = listener(event)
+                    if result is not None and hasattr(result, "__await__"):
+                        await result
+                else:
+                    await listener(event)
+                if event.propagation_stopped:
+                    break
+
+        return plan
+
+    return _get_plan_factory(len(listeners), is_async=True, inline=inline)(*listeners)
+
+
+def compile_concurrent_plan(tiers: tuple, /):
+    """
+    Compiles an asynchronous dispatch plan running the listeners of each priority tier concurrently, tiers being run in
+    order. Propagation is checked between tiers.
+
+    :param tiers: listeners grouped by priority, in dispatch order
+    :return: coroutine function taking the event as only argument
+
+    """
+    if not tiers:
+        return async_noop_plan
+
+    if all(len(tier) == 1 for tier in tiers):
+        # nothing to run concurrently
+        return compile_async_plan(tuple(tier[0] for tier in tiers))
+
+    from asyncio import gather
+
+    async def plan(event, /):
+        for tier in tiers:
+            if len(tier) == 1:
+                await tier[0](event)
+            else:
+                results = await gather(*(listener(event) for listener in tier), return_exceptions=True)
+                errors = [result for result in results if isinstance(result, BaseException)]
+                for error in errors:
+                    if not isinstance(error, Exception):
+                        # do not swallow KeyboardInterrupt, SystemExit, ... into an exception group
+                        raise error
+                if errors:
+                    raise DispatchError(f"{len(errors)} listener(s) failed while dispatching {event.name!r}.", errors)
+            if event.propagation_stopped:
+                break
+
+    return plan
+
+
+def compile_threaded_plan(tiers: tuple, executor, /):
+    """
+    Compiles a synchronous dispatch plan running the listeners of each priority tier in parallel on the given
+    :class:`concurrent.futures.Executor`, tiers being run in order. The first listener of each tier runs on the calling
+    thread while the others run in the executor. Propagation is checked between tiers.
+
+    :param tiers: listeners grouped by priority, in dispatch order
+    :param executor: executor to submit listeners to
+    :return: callable taking the event as only argument
+
+    """
+    if not tiers:
+        return noop_plan
+
+    if all(len(tier) == 1 for tier in tiers):
+        # nothing to run in parallel
+        return compile_plan(tuple(tier[0] for tier in tiers))
+
+    submit = executor.submit
+
+    def plan(event, /):
+        for tier in tiers:
+            if len(tier) == 1:
+                tier[0](event)
+            else:
+                futures = [submit(listener, event) for listener in tier[1:]]
+                errors = []
+                try:
+                    tier[0](event)
+                except Exception as exc:
+                    errors.append(exc)
+                for future in futures:
+                    exc = future.exception()
+                    if exc is not None:
+                        errors.append(exc)
+                if errors:
+                    raise DispatchError(f"{len(errors)} listener(s) failed while dispatching {event.name!r}.", errors)
+            if event.propagation_stopped:
+                break
+
+    return plan
+
+
+def compile_routed_plan(names: tuple, compile_route, /):
+    """
+    Compiles the plan of an event id having filtered listeners (see :class:`whistle.listeners.FilteredListener`): the
+    values of the filtered event attributes (``names``) select a plan calling only the listeners matching them,
+    compiled by ``compile_route(event)`` on first use, then cached. The plan returns the result of the selected plan,
+    so the same routed plan works for synchronous and asynchronous plans.
+
+    """
+    routes = {}
+
+    def route(key, event, /):
+        # not cached yet (or unhashable key)
+        plan = compile_route(event)
+        if len(routes) < MAX_CACHED_ROUTES:
+            try:
+                routes[key] = plan
+            except TypeError:
+                # unhashable attribute values, compiled for each event
+                pass
+        return plan
+
+    if len(names) == 1:
+        (name,) = names
+
+        def plan(event, /):
+            key = getattr(event, name, _MISSING)
+            try:
+                selected = routes[key]
+            except (KeyError, TypeError):
+                selected = route(key, event)
+            return selected(event)
+
+    else:
+
+        def plan(event, /):
+            key = tuple([getattr(event, name, _MISSING) for name in names])
+            try:
+                selected = routes[key]
+            except (KeyError, TypeError):
+                selected = route(key, event)
+            return selected(event)
+
+    return plan
@@ -0,0 +1,215 @@
+"""
+Deferred dispatching: queued front-ends enqueue events cheaply on the caller side (close to a ``deque.append``), and a
+background worker dispatches them in batches, using the wrapped dispatcher's ``dispatch_many()``.
+
+Events enqueued with a ``key`` are coalesced: while an event with the same event id and key is still pending, enqueuing
+a new one replaces it (keeping its position in the queue), so only the latest one gets dispatched.
+
+"""
+
+import asyncio
+import logging
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import deque
+from itertools import groupby
+from operator import itemgetter
+from typing import Callable, Optional
+
+from whistle.typing import IEvent
+
+logger = logging.getLogger(__name__)
+
+
+class _BaseQueuedEventDispatcher(metaclass=ABCMeta):
+    def __init__(
+        self,
+        dispatcher,
+        /,
+        *,
+        max_batch_size: int = 1000,
+        max_delay: float = 0.05,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ):
+        self.dispatcher = dispatcher
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.on_error = on_error
+
+        self._closed = False
+        self._queue = deque()
+        # (event_id, key) -> pending item, for coalescing
+        self._keys = {}
+        self._keys_lock = threading.Lock()
+
+    def enqueue(self, event_id: str, event: Optional[IEvent] = None, /, *, key=None) -> None:
+        """
+        Enqueues an event to be dispatched later by the background worker.
+
+        :param event_id: string identifier for the event
+        :param event: optional event instance (if none is given, one will be created when dispatching)
+        :param key: optional hashable coalescing key, only the latest pending event with the same event id and key
+            will be dispatched
+
+        """
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed, no more events can be enqueued.")
+
+        if key is None:
+            self._queue.append((event_id, event))
+        else:
+            with self._keys_lock:
+                item = self._keys.get((event_id, key))
+                if item is None:
+                    item = self._keys[(event_id, key)] = [event_id, event, key]
+                    self._queue.append(item)
+                else:
+                    item[1] = event
+
+        if len(self._queue) >= self.max_batch_size:
+            self._wakeup()
+
+    def __len__(self):
+        return len(self._queue)
+
+    @abstractmethod
+    def _wakeup(self):
+        # wakes the background worker up, to dispatch a full batch without waiting for max_delay
+        ...
+
+    def _pop_batch(self) -> list:
+        popleft, batch = self._queue.popleft, []
+        for _ in range(min(len(self._queue), self.max_batch_size)):
+            batch.append(popleft())
+
+        keyed = [item for item in batch if type(item) is list]
+        if keyed:
+            # once forgotten, coalesced items cannot be updated anymore, so reading them afterwards is safe
+            with self._keys_lock:
+                for item in keyed:
+                    del self._keys[(item[0], item[2])]
+
+        # consecutive events with the same event id are dispatched together
+        event_factory = self.dispatcher.event_factory
+        return [
+            (event_id, [event_factory() if item[1] is None else item[1] for item in items])
+            for event_id, items in groupby(batch, key=itemgetter(0))
+        ]
+
+    def _handle_error(self, exc: BaseException, /):
+        if self.on_error is None:
+            logger.exception("Error while dispatching queued events.", exc_info=exc)
+        else:
+            self.on_error(exc)
+
+
+class QueuedEventDispatcher(_BaseQueuedEventDispatcher):
+    """
+    Queued front-end for an :class:`whistle.EventDispatcher`: :meth:`enqueue` only appends to a queue, and a background
+    thread dispatches the queued events in batches, when ``max_batch_size`` events are pending or at most every
+    ``max_delay`` seconds.
+
+    Listener exceptions raised in the background thread are given to ``on_error`` (or logged if no callback is given),
+    and the next batches are still dispatched.
+
+    .. versionadded:: 2.2
+
+    :param dispatcher: the dispatcher to dispatch queued events with
+    :param max_batch_size: maximum number of events dispatched in one batch, reaching it wakes up the worker
+    :param max_delay: maximum delay (in seconds) before a queued event gets dispatched
+    :param on_error: callback for exceptions raised while dispatching in the background
+
+    """
+
+    def __init__(self, dispatcher, /, **kwargs):
+        super().__init__(dispatcher, **kwargs)
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, name="whistle-queue", daemon=True)
+        self._worker.start()
+
+    def flush(self) -> None:
+        """Dispatches all pending events now, in the calling thread."""
+        with self._lock:
+            while self._queue:
+                for event_id, events in self._pop_batch():
+                    try:
+                        self.dispatcher.dispatch_many(event_id, events)
+                    except Exception as exc:
+                        self._handle_error(exc)
+
+    def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops accepting events, dispatches all pending events and stops the background worker. Meant for shutdown.
+
+        :param timeout: maximum time to wait for the worker to stop
+
+        """
+        self._closed = True
+        self._event.set()
+        self._worker.join(timeout)
+        self.flush()
+
+    def _wakeup(self):
+        self._event.set()
+
+    def _run(self):
+        while not self._closed:
+            self._event.wait(self.max_delay)
+            self._event.clear()
+            self.flush()
+
+
+class AsyncQueuedEventDispatcher(_BaseQueuedEventDispatcher):
+    """
+    Queued front-end for an :class:`whistle.AsyncEventDispatcher`, the background worker being an asyncio task (started
+    on first :meth:`enqueue`, which must be called from the event loop). See :class:`QueuedEventDispatcher`.
+
+    .. versionadded:: 2.2
+
+    """
+
+    def __init__(self, dispatcher, /, **kwargs):
+        super().__init__(dispatcher, **kwargs)
+        self._event = None
+        self._lock = None
+        self._worker = None
+
+    def enqueue(self, event_id: str, event: Optional[IEvent] = None, /, *, key=None) -> None:
+        """See :meth:`QueuedEventDispatcher.enqueue`, must be called from the event loop."""
+        if self._worker is None and not self._closed:
+            self._event, self._lock = asyncio.Event(), asyncio.Lock()
+            self._worker = asyncio.ensure_future(self._run())
+        super().enqueue(event_id, event, key=key)
+
+    async def flush(self) -> None:
+        """Dispatches all pending events now."""
+        if self._lock is None:
+            return
+        async with self._lock:
+            while self._queue:
+                for event_id, events in self._pop_batch():
+                    try:
+                        await self.dispatcher.adispatch_many(event_id, events)
+                    except Exception as exc:
+                        self._handle_error(exc)
+
+    async def drain(self) -> None:
+        """Stops accepting events, dispatches all pending events and stops the background worker."""
+        self._closed = True
+        if self._worker is not None:
+            self._event.set()
+            await self._worker
+        await self.flush()
+
+    def _wakeup(self):
+        self._event.set()
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._event.wait(), self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+            await self.flush()
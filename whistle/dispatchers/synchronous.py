@@ -1,9 +1,30 @@
-import asyncio
-from typing import Optional, cast
+from __future__ import annotations
 
+from functools import partial
+
+from whistle.batch import BatchListener
 from whistle.dispatchers.base import AbstractEventDispatcher
-from whistle.event import Event
-from whistle.typing import IDispatchedEvent, IEvent, IListener
+from whistle.dispatchers.plans import compile_plan, noop_plan
+from whistle.listeners import is_coroutine_function
+from whistle.offload import ProcessListener
+from whistle.weak import WeakListener
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Optional
+    from concurrent.futures import Executor
+    from whistle.typing import IDispatchedEvent, IEvent, IListener
+
+INLINE = "inline"
+"""Async mode: ``adispatch()`` dispatches on the event loop thread, blocking it until all the listeners have run."""
+
+OFFLOAD = "offload"
+"""Async mode: ``adispatch()`` dispatches in a worker thread, and awaits the result without blocking the event loop."""
+
+STRICT = "strict"
+"""Async mode: ``adispatch()`` raises, to detect synchronous dispatchers used from asynchronous code."""
+
+ASYNC_MODES = (INLINE, OFFLOAD, STRICT)
 
 
 class EventDispatcher(AbstractEventDispatcher):
@@ -12,43 +33,211 @@ class EventDispatcher(AbstractEventDispatcher):
     them. All listeners are scoped to the event dispatcher instance, so you can have multiple event dispatchers with
     different sets of listeners.
 
+    A dispatcher shared between threads that add or remove listeners while others dispatch events should be created
+    with ``thread_safe=True`` (see :class:`whistle.listeners.ThreadSafeListenersCollection`): changes are then
+    serialized by a lock, while dispatching does not lock.
+
+    The asynchronous interface (:meth:`adispatch` and :meth:`adispatch_many`) is available too, so that a synchronous
+    dispatcher can be used from asynchronous code. By default (``"inline"`` async mode) it just dispatches on the event
+    loop thread, blocking the loop while listeners run. In ``"offload"`` mode, the dispatch runs in ``async_executor``
+    (or in the default executor of :func:`asyncio.to_thread`) and is awaited without blocking the loop, and in
+    ``"strict"`` mode the asynchronous interface raises a :class:`NotImplementedError`.
+
+    :param thread_safe: allow listeners to be added or removed while other threads dispatch events
+    :param async_mode: behaviour of the asynchronous interface (inline, offload or strict)
+    :param async_executor: executor to dispatch in, in offload async mode
+
     """
 
-    def add_listener(self, event_id: str, listener: IListener, /, *, priority: int = 0):
-        # Use asyncio.iscoroutinefunction as it's more lenient and handles mock objects better
-        if asyncio.iscoroutinefunction(listener):
-            raise TypeError(f"Listener should not be a coroutine function, {type(listener)} given")
-        return super().add_listener(event_id, listener, priority=priority)
+    _noop_plan = staticmethod(noop_plan)
+
+    def __init__(
+        self, *, thread_safe: bool = False, async_mode: str = INLINE, async_executor: Optional[Executor] = None
+    ):
+        if async_mode not in ASYNC_MODES:
+            raise ValueError(f"Invalid async mode {async_mode!r}, expected one of {', '.join(ASYNC_MODES)}.")
+
+        super().__init__(thread_safe=thread_safe)
+        self.async_mode = async_mode
+        self.async_executor = async_executor
 
-    def dispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent:
+    def add_listener(
+        self,
+        event_id: str,
+        listener: IListener,
+        /,
+        *,
+        priority: int = 0,
+        process: bool = False,
+        batch: bool = False,
+        weak: bool = False,
+        where: Optional[dict] = None,
+    ):
+        """
+        Add a listener for the given event id, with the given priority.
+
+        :param event_id: string identifier for the event (or pattern)
+        :param listener: callable to be called when the event is dispatched
+        :param priority: integer priority for the listener (-20 (high) to 19 (low))
+        :param process: call the listener in a worker process (see :mod:`whistle.offload`)
+        :param batch: the listener takes a list of events (see :meth:`dispatch_many`)
+        :param weak: only keep a weak reference to the listener, see :mod:`whistle.weak`
+        :param where: only call the listener for events whose attributes equal the given values (attribute name ->
+            value), see :class:`whistle.listeners.FilteredListener`
+
+        """
+        if where is not None and (batch or isinstance(listener, BatchListener)):
+            raise ValueError("Batch listeners cannot be filtered.")
+        if process or isinstance(listener, ProcessListener):
+            if batch or weak:
+                raise ValueError("Batch and weak listeners cannot be called in a worker process.")
+            listener = ProcessListener(listener)
+        else:
+            if weak and (batch or isinstance(listener, BatchListener)):
+                raise ValueError("Batch listeners cannot be weak.")
+            if batch or isinstance(listener, BatchListener):
+                listener = BatchListener(listener)
+            if is_coroutine_function(listener.listener if isinstance(listener, BatchListener) else listener):
+                raise TypeError(f"Listener should not be a coroutine function, {type(listener)} given")
+            if weak:
+                listener = WeakListener(listener, partial(self._listeners._discard, event_id))
+        return super().add_listener(event_id, listener, priority=priority, where=where)
+
+    def dispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]:
         """
         Dispatch the given event, with the given event id.
 
         An optional event can be given, and should respect the :class:`whistle.protocols.IEvent` protocol.
         If no event is given, a new :class:`whistle.event.Event` instance is created and used.
 
+        Instead of an event, a factory can be given: it will be called to create the event only if there is at least
+        one listener for this event id. If there is none, nothing is created nor dispatched and ``None`` is returned,
+        which makes dispatching expensive events nobody listens to nearly free.
+
         Returns the event instance after it has been dispatched, whether it has been created or provided by the caller.
 
         :param event_id: hashable identifier for the event
         :param event: optional event instance
+        :param factory: optional callable creating the event, only called if there are listeners
         :return: the event instance after it has been dispatched
 
         """
+        plan = self._listeners._plans.get(event_id)
+        if plan is None:
+            plan = self._get_plan(event_id)
+
         if event is None:
-            event = Event()
+            if factory is None:
+                event = self.event_factory()
+            elif plan is noop_plan:
+                return None
+            else:
+                event = factory()
 
         # todo should name be part of dispatched event ?
         event.name = event_id
         event.dispatcher = self
 
-        self.do_dispatch(self._listeners.get(event_id), event)
+        plan(event)
+
+        return event  # type: ignore[return-value]
+
+    async def adispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]:
+        # allows to use the async interface with a sync dispatcher, see the async modes
+        self._check_async_mode()
+        if self.async_mode == INLINE or (self._listeners._plans.get(event_id) or self._get_plan(event_id)) is noop_plan:
+            # inline mode, or nobody listens and nothing can block (the plan is resolved here, so that the first
+            # dispatch of an event id nobody listens to is not offloaded either)
+            return self.dispatch(event_id, event, factory=factory)
+        return await self._run_async(partial(self.dispatch, event_id, event, factory=factory))
+
+    def dispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]:
+        """
+        Dispatch the given events, all with the given event id, resolving the listeners only once.
+
+        Listeners are called in priority order, each one with all the events (batch listeners, registered with
+        ``batch=True``, are called once with the list of events, others are called once per event). An event whose
+        propagation was stopped is not given to the next listeners, while the other events of the batch still are.
+
+        If a dispatch policy applies to the event id (see :meth:`set_policy`), each event is submitted to it, then
+        dispatched on its own (batch listeners are then called with one event lists).
+
+        :param event_id: hashable identifier for the events
+        :param events: event instances
+        :return: the list of event instances after they have been dispatched
+
+        """
+        if self.get_policy(event_id) is not None:
+            return [self.dispatch(event_id, event) for event in events]
+
+        events = list(events)
+        for event in events:
+            event.name = event_id
+            event.dispatcher = self
+
+        pending = events
+        for listener in self._listeners.get(event_id):
+            if not pending:
+                break
+            if isinstance(listener, BatchListener):
+                listener.listener(pending)
+            else:
+                for event in pending:
+                    listener(event)
+            pending = [event for event in pending if not event.propagation_stopped]
+
+        return events  # type: ignore[return-value]
+
+    async def adispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]:
+        # allows to use the async interface with a sync dispatcher, see the async modes
+        self._check_async_mode()
+        if self.async_mode == INLINE:
+            return self.dispatch_many(event_id, events)
+        return await self._run_async(partial(self.dispatch_many, event_id, events))
+
+    def _check_async_mode(self):
+        # in strict mode, the async interface always raises, whether the event id has listeners or not
+        if self.async_mode == STRICT:
+            raise NotImplementedError(
+                f"{type(self).__name__} does not implement async dispatch in strict mode, use dispatch() or an "
+                "AsyncEventDispatcher."
+            )
+
+    async def _run_async(self, func, /):
+        from asyncio import get_running_loop
+        from contextvars import copy_context
+
+        # like asyncio.to_thread(), with the given executor (if any), listeners see the caller context variables
+        return await get_running_loop().run_in_executor(self.async_executor, partial(copy_context().run, func))
+
+    def flush_policies(self) -> None:
+        """
+        Dispatches now the events deferred by the dispatch policies of this dispatcher (see :meth:`set_policy`), for
+        example before shutting down.
+
+        .. versionadded:: 2.2
+
+        """
+        for plan, event in self._flush_policies():
+            plan(event)
+
+    def _schedule(self, delay: float, callback, /):
+        from whistle.policies import schedule
+
+        schedule(delay, callback)
 
-        return cast(IDispatchedEvent, event)
+    def _run_deferred(self, plan, event: IEvent, /):
+        plan(event)
 
-    async def adispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent:
-        # allows to use the async interface with a sync dispatcher, although this is not recommended
-        # todo add a strict mode that raises an error when trying to use async interface with a sync dispatcher
-        return self.dispatch(event_id, event)
+    def _compile_plan(self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None):
+        if type(self).do_dispatch is not EventDispatcher.do_dispatch:
+            # subclasses overriding do_dispatch still get called with the listeners tuple
+            return partial(self.do_dispatch, listeners)
+        return compile_plan(listeners)
 
     def do_dispatch(self, listeners, event: IEvent, /):
         for listener in listeners:
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional
+
+from whistle.dispatchers.plans import compile_threaded_plan
+from whistle.dispatchers.synchronous import EventDispatcher
+
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_executor() -> Executor:
+    """
+    Returns the thread pool shared by all the :class:`ThreadPoolEventDispatcher` instances created without an explicit
+    executor (created on first use).
+
+    """
+    global _default_executor
+    if _default_executor is None:
+        with _default_executor_lock:
+            if _default_executor is None:
+                _default_executor = ThreadPoolExecutor(thread_name_prefix="whistle")
+    return _default_executor
+
+
+class ThreadPoolEventDispatcher(EventDispatcher):
+    """
+    Synchronous event dispatcher running the listeners sharing the same priority ("tier") in parallel, using a
+    :mod:`concurrent.futures` executor. Tiers are still run in priority order, and :meth:`dispatch` returns once all
+    the listeners have completed, so the synchronous API is kept while blocking listeners (I/O, C extensions releasing
+    the GIL...) run in parallel.
+
+    Stopping the propagation from any listener of a tier prevents the next tiers to run (the other listeners of the
+    same tier still run to completion). If listeners of a tier fail, the other listeners of the tier still run to
+    completion and a :class:`whistle.errors.DispatchError` exception group is raised (even if only one of them failed),
+    while the exception of a listener alone in its tier is raised as is, like with :class:`whistle.EventDispatcher`.
+
+    The first listener of each tier runs on the dispatching thread. Listeners dispatching other events on the same
+    dispatcher should be avoided with small pools, as waiting for a tier to complete from a pool thread can exhaust it.
+
+    Other keyword arguments (``thread_safe``, ``async_mode`` and ``async_executor``) are the ones of
+    :class:`whistle.EventDispatcher`.
+
+    .. versionadded:: 2.2
+
+    :param executor: executor to run listeners in (defaults to a thread pool shared by all instances)
+
+    """
+
+    def __init__(self, *, executor: Optional[Executor] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.executor = executor
+
+    def _compile_plan(self, event_id: str, listeners: tuple, /, *, tiers: Optional[tuple] = None):
+        if type(self).do_dispatch is not EventDispatcher.do_dispatch:
+            return super()._compile_plan(event_id, listeners)
+        return compile_threaded_plan(
+            self._get_tiers(event_id, listeners, tiers=tiers), self.executor or get_default_executor()
+        )
@@ -1,2 +1,39 @@
 class RemovedInWhistle2Error(Exception):
     pass
+
+
+try:
+    _ExceptionGroup = ExceptionGroup
+except NameError:  # python < 3.11
+
+    class _ExceptionGroup(Exception):
+        def __init__(self, message, exceptions, /):
+            super().__init__(message, tuple(exceptions))
+            self.message = message
+            self.exceptions = tuple(exceptions)
+
+
+class DispatchError(_ExceptionGroup):
+    """
+    Raised when one or more listeners called concurrently failed. All listeners of the failing priority tier were run
+    to completion, and the listener exceptions are available in the ``exceptions`` attribute (on python 3.11+, this is
+    an :class:`ExceptionGroup` and can be handled with ``except*``).
+
+    Listeners alone in their priority tier are not called concurrently, and the exception they raise is not grouped.
+
+    """
+
+
+class DispatchTimeoutError(TimeoutError):
+    """
+    Raised by asynchronous dispatchers in ``"abort"`` timeout mode, when a listener exceeds its timeout or a dispatch
+    exceeds its deadline. The listeners that timed out are available in the ``listeners`` attribute (and recorded in
+    the ``timed_out`` attribute of the event).
+
+    .. versionadded:: 2.2
+
+    """
+
+    def __init__(self, message, /, *, listeners=()):
+        super().__init__(message)
+        self.listeners = tuple(listeners)
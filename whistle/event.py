@@ -16,6 +16,114 @@ class Event(object):
     propagation_stopped = False
     """Has the event propagation ended?"""
 
+    timed_out = ()
+    """
+    Listeners cancelled because they timed out while dispatching this event, then the ones not called because the
+    dispatch deadline expired (see :mod:`whistle.timeouts`).
+    """
+
     def stop_propagation(self):
         """Stop event propagation, meaning that the remaining handlers won't be called after this one."""
         self.propagation_stopped = True
+
+
+class SlottedEvent:
+    """
+    Lightweight alternative to :class:`Event`, using ``__slots__`` instead of an instance ``__dict__``, which makes
+    instances smaller and cheaper to create. Subclasses must declare their own ``__slots__`` (or use
+    :func:`event_dataclass`) to keep these benefits.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ("dispatcher", "name", "propagation_stopped", "timed_out")
+
+    def __init__(self):
+        self.name = None
+        self.dispatcher = None
+        self.propagation_stopped = False
+        self.timed_out = ()
+
+    # dataclasses generated __init__ do not call the parent __init__, but they do call __post_init__
+    __post_init__ = __init__
+
+    def stop_propagation(self):
+        """Stop event propagation, meaning that the remaining handlers won't be called after this one."""
+        self.propagation_stopped = True
+
+
+def event_dataclass(cls=None, /, **kwargs):
+    """
+    Class decorator turning a :class:`SlottedEvent` subclass into a slotted dataclass, to define custom payload events
+    with no instance ``__dict__``::
+
+        @event_dataclass
+        class OrderPlaced(SlottedEvent):
+            order_id: int
+            total: float = 0.0
+
+    Keyword arguments are passed to :func:`dataclasses.dataclass`. If the event class defines a ``__post_init__``
+    method, it must call ``super().__post_init__()``.
+
+    .. versionadded:: 2.2
+
+    """
+
+    def wrap(cls):
+        if not issubclass(cls, SlottedEvent):
+            raise TypeError(f"Event dataclasses must inherit from SlottedEvent, {cls.__name__} does not.")
+        from dataclasses import dataclass
+
+        return dataclass(cls, slots=True, **kwargs)
+
+    return wrap if cls is None else wrap(cls)
+
+
+class EventPool:
+    """
+    Free list of reusable event instances, to avoid allocating a new event on each dispatch. To use it for the events
+    created by a dispatcher (when no event is given to ``dispatch()``), set the dispatcher's ``event_factory``::
+
+        pool = EventPool()
+        dispatcher.event_factory = pool.acquire
+
+        event = dispatcher.dispatch("tick")
+        ...
+        pool.release(event)  # only once neither the caller nor any listener references the event anymore
+
+    Releasing events is optional (events not released are simply garbage collected), but a released event must not be
+    used anymore, as it will be reset and handed to another dispatch.
+
+    .. versionadded:: 2.2
+
+    :param factory: callable creating new events when the pool is empty
+    :param maxsize: maximum number of free events kept in the pool
+
+    """
+
+    __slots__ = ("_free", "factory", "maxsize")
+
+    def __init__(self, factory=SlottedEvent, /, *, maxsize: int = 1024):
+        self.factory = factory
+        self.maxsize = maxsize
+        self._free = []
+
+    def acquire(self):
+        """Returns a pristine event, reused from the pool if possible."""
+        try:
+            return self._free.pop()
+        except IndexError:
+            return self.factory()
+
+    def release(self, event, /):
+        """Resets the given event and gives it back to the pool."""
+        if len(self._free) < self.maxsize:
+            event.name = None
+            event.dispatcher = None
+            event.propagation_stopped = False
+            event.timed_out = ()
+            self._free.append(event)
+
+    def __len__(self):
+        return len(self._free)
@@ -0,0 +1,215 @@
+"""
+Opt-in instrumentation of dispatchers: once enabled with ``enable_instrumentation()``, dispatch plans are compiled
+with instrumented listeners that record, per event id and per listener, the number of calls, the time spent (total
+and percentiles over the most recent calls), the exceptions raised and the propagation stops. Use ``stats()`` to get a
+snapshot of the recorded metrics.
+
+When instrumentation is disabled (the default), the regular dispatch plans are used, so it does not cost anything.
+The metrics of a listener are forgotten once it is removed.
+
+Counters are not synchronized, so they may be slightly off when listeners run in parallel threads.
+
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from time import perf_counter
+
+from whistle.listeners import ListenerWrapper
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from whistle.typing import IEvent, IListener
+
+
+class Timings:
+    """
+    Metrics recorded for one event id, or one listener of an event id. Only the last ``max_samples`` durations are
+    kept to compute the percentiles.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ("calls", "errors", "propagation_stopped", "samples", "total_time")
+
+    def __init__(self, *, max_samples: int = 1024):
+        self.calls = 0
+        self.errors = 0
+        self.propagation_stopped = 0
+        self.samples = deque(maxlen=max_samples)
+        self.total_time = 0.0
+
+    def record(self, duration: float, /):
+        self.calls += 1
+        self.total_time += duration
+        self.samples.append(duration)
+
+    def snapshot(self) -> dict:
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            return samples[min(len(samples) - 1, int(len(samples) * p))] if samples else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "propagation_stopped": self.propagation_stopped,
+            "total_time": self.total_time,
+            "mean": self.total_time / self.calls if self.calls else 0.0,
+            "p50": percentile(0.5),
+            "p90": percentile(0.9),
+            "p99": percentile(0.99),
+            "max": samples[-1] if samples else 0.0,
+        }
+
+
+class InstrumentedListener(ListenerWrapper):
+    """
+    Wraps a listener to record its metrics in the given :class:`Timings`. Compares equal to the wrapped listener.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ("timings",)
+
+    def __init__(self, listener: IListener, timings: Timings, /):
+        super().__init__(listener)
+        self.timings = timings
+
+    def __call__(self, event: IEvent, /):
+        timings = self.timings
+        start = perf_counter()
+        try:
+            result = self.listener(event)
+        except Exception:
+            timings.errors += 1
+            raise
+        finally:
+            timings.record(perf_counter() - start)
+        if event.propagation_stopped:
+            timings.propagation_stopped += 1
+        return result
+
+
+class AsyncInstrumentedListener(InstrumentedListener):
+    """
+    Same as :class:`InstrumentedListener`, for :class:`whistle.AsyncEventDispatcher`.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, event: IEvent, /):
+        timings = self.timings
+        start = perf_counter()
+        try:
+            result = await self.listener(event)
+        except Exception:
+            timings.errors += 1
+            raise
+        finally:
+            timings.record(perf_counter() - start)
+        if event.propagation_stopped:
+            timings.propagation_stopped += 1
+        return result
+
+
+class Instrumentation:
+    """
+    Metrics recorded by a synchronous dispatcher, see :meth:`whistle.dispatchers.base.AbstractEventDispatcher.stats`.
+
+    .. versionadded:: 2.2
+
+    :param max_samples: number of most recent durations kept to compute percentiles, per event id and per listener
+
+    """
+
+    listener_factory = InstrumentedListener
+
+    def __init__(self, *, max_samples: int = 1024):
+        self.max_samples = max_samples
+        # event id -> timings
+        self.events = {}
+        # event id -> {listener identity -> (listener, timings)}, listeners may not be hashable
+        self.listeners = {}
+
+    def instrument_listeners(self, event_id: str, listeners: tuple, /) -> tuple:
+        entries = self.listeners.setdefault(event_id, {})
+        instrumented = []
+        for listener in listeners:
+            entry = entries.get(id(listener))
+            if entry is None:
+                entry = entries[id(listener)] = (listener, Timings(max_samples=self.max_samples))
+            instrumented.append(self.listener_factory(listener, entry[1]))
+        return tuple(instrumented)
+
+    def prune(self, event_id: str, listeners: tuple, /) -> None:
+        """Forgets the metrics of the listeners of the given event id that are not among the given (current) ones."""
+        entries = self.listeners.get(event_id)
+        if entries:
+            current = set(map(id, listeners))
+            for key in [key for key in entries if key not in current]:
+                del entries[key]
+
+    def instrument_plan(self, event_id: str, plan, /):
+        timings = self.events.get(event_id)
+        if timings is None:
+            timings = self.events[event_id] = Timings(max_samples=self.max_samples)
+
+        def instrumented_plan(event, /):
+            start = perf_counter()
+            try:
+                plan(event)
+            except Exception:
+                timings.errors += 1
+                raise
+            finally:
+                timings.record(perf_counter() - start)
+            if event.propagation_stopped:
+                timings.propagation_stopped += 1
+
+        return instrumented_plan
+
+    def snapshot(self) -> dict:
+        return {
+            "events": {event_id: timings.snapshot() for event_id, timings in self.events.items()},
+            "listeners": {
+                event_id: [{"listener": listener, **timings.snapshot()} for listener, timings in entries.values()]
+                for event_id, entries in self.listeners.items()
+            },
+        }
+
+
+class AsyncInstrumentation(Instrumentation):
+    """
+    Same as :class:`Instrumentation`, for :class:`whistle.AsyncEventDispatcher`.
+
+    .. versionadded:: 2.2
+
+    """
+
+    listener_factory = AsyncInstrumentedListener
+
+    def instrument_plan(self, event_id: str, plan, /):
+        timings = self.events.get(event_id)
+        if timings is None:
+            timings = self.events[event_id] = Timings(max_samples=self.max_samples)
+
+        async def instrumented_plan(event, /):
+            start = perf_counter()
+            try:
+                await plan(event)
+            except Exception:
+                timings.errors += 1
+                raise
+            finally:
+                timings.record(perf_counter() - start)
+            if event.propagation_stopped:
+                timings.propagation_stopped += 1
+
+        return instrumented_plan
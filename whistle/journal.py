@@ -0,0 +1,427 @@
+"""
+Append-only event journal, to record the events dispatched with some event ids (for audit or crash recovery) and
+replay them later.
+
+The journal is a listener: register it on a dispatcher (synchronous or asynchronous) with :meth:`EventJournal.attach`,
+and each dispatched event is appended as a compact binary record to the current segment of the journal, a
+memory-mapped file (appending is a memory copy, no system call is involved). Once a segment is full, a new one is
+started.
+
+Appended records are made durable by a background thread, every ``sync_interval`` seconds, with one ``msync`` for all
+the records appended meanwhile (group commit). With ``durable=True``, the journal listener waits until the record it
+appended is durable, while concurrent dispatches still share the same commits (asynchronous dispatchers await the
+commit, without blocking the event loop).
+
+Each record is an 8 bytes header (record length and CRC32 checksum), the timestamp and event id length, the event id
+and the encoded event state (see :func:`whistle.offload.dumps_event`). Records are identified by their offset in the
+journal, and :meth:`EventJournal.replay` dispatches an offset or time range of records again, reading the segments
+sequentially with memory maps instead of loading them.
+
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from itertools import groupby, islice
+from operator import itemgetter
+from zlib import crc32
+
+from whistle.event import Event
+from whistle.offload import dumps_event, loads_event
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Iterator, Optional
+    from whistle.typing import IAsyncEventDispatcher, IEvent, IEventDispatcher
+
+# record header: length of the record body, checksum of the record body
+_HEADER = struct.Struct("<II")
+# start of the record body: timestamp, event id length
+_META = struct.Struct("<dH")
+
+_SUFFIX = ".journal"
+
+#: Number of events replayed with one ``dispatch_many()`` call.
+REPLAY_BATCH_SIZE = 1000
+
+
+def _segment_name(base: int, /) -> str:
+    return f"{base:020d}{_SUFFIX}"
+
+
+def _iter_records(buf, base: int, position: int, limit: int, /) -> Iterator[tuple]:
+    # stops at the end of the written records: zeroes (never written) or a torn record (bad checksum)
+    size = len(buf)
+    while position + _HEADER.size <= size and base + position < limit:
+        length, checksum = _HEADER.unpack_from(buf, position)
+        end = position + _HEADER.size + length
+        if not length or end > size:
+            return
+        body = buf[position + _HEADER.size : end]
+        if crc32(body) != checksum:
+            return
+        timestamp, name_length = _META.unpack_from(body)
+        name_end = _META.size + name_length
+        yield base + position, timestamp, body[_META.size : name_end].decode(), body[name_end:]
+        position = end
+
+
+def _fsync_directory(path: str, /):
+    if os.name == "nt":
+        # directories cannot be opened (nor synced) on windows, where the file metadata is synced with the file
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _resolve_waiters(waiters: list, /):
+    # wakes up the asynchronous listeners waiting for a commit, in their event loop
+    for _, loop, future in waiters:
+        try:
+            loop.call_soon_threadsafe(_resolve, future)
+        except RuntimeError:
+            # the event loop is closed
+            pass
+
+
+def _resolve(future, /):
+    if not future.done():
+        future.set_result(None)
+
+
+class EventJournal:
+    """
+    Memory-mapped, append-only journal of events, split in segment files of ``segment_size`` bytes stored in
+    ``directory`` (see module documentation). Opening an existing journal resumes appending after its last record.
+
+    .. versionadded:: 2.2
+
+    :param directory: directory of the segment files (created if needed)
+    :param segment_size: size (in bytes) of segment files
+    :param sync_interval: maximum delay (in seconds) before appended records are made durable
+    :param durable: wait until appended records are durable before returning from the listener
+    :param event_factory: type of the events journaled without payload when they have no state, and created when
+        replaying them
+
+    """
+
+    def __init__(
+        self,
+        directory,
+        /,
+        *,
+        segment_size: int = 64 << 20,
+        sync_interval: float = 0.05,
+        durable: bool = False,
+        event_factory=Event,
+    ):
+        self.directory = os.fspath(directory)
+        self.segment_size = segment_size
+        self.sync_interval = sync_interval
+        self.durable = durable
+        self.event_factory = event_factory
+
+        # appends are serialized by the lock, syncing and closing memory maps by the sync lock
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._synced_condition = threading.Condition(self._lock)
+        # ids of the events being replayed, not to journal them again
+        self._replaying = set()
+        # (dispatcher, event id, listener) registrations made by attach(), undone by close()
+        self._attached = []
+        # (offset, loop, future) of the asynchronous listeners waiting for a commit
+        self._waiters = []
+
+        os.makedirs(self.directory, exist_ok=True)
+        segments = self.segments()
+        if segments:
+            base = segments[-1]
+            self._open_segment(base)
+            # resume after the last valid record (a torn record is overwritten)
+            last = None
+            for last, *_ in _iter_records(self._map, base, 0, base + len(self._map)):
+                pass
+            self._written = base if last is None else base + self._record_end(last - base)
+        else:
+            self._open_segment(0)
+            self._written = 0
+        self._synced = self._written
+
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._worker = threading.Thread(target=self._run, name="whistle-journal", daemon=True)
+        self._worker.start()
+
+    @property
+    def offset(self) -> int:
+        """Offset following the last appended record."""
+        return self._written
+
+    def segments(self) -> list:
+        """Returns the base offsets of the segment files, in order."""
+        return sorted(int(name[: -len(_SUFFIX)]) for name in os.listdir(self.directory) if name.endswith(_SUFFIX))
+
+    def attach(self, dispatcher, /, *event_ids: str, priority: int = -20) -> None:
+        """
+        Journals the events dispatched by the given dispatcher with the given event ids (or patterns), until
+        :meth:`detach` or :meth:`close` is called.
+
+        With ``durable=True`` and an asynchronous dispatcher, the listener awaits the commit (the background thread
+        resolves a future once it is done), so that the event loop is not blocked meanwhile.
+
+        :param dispatcher: synchronous or asynchronous dispatcher
+        :param event_ids: event ids (or patterns) to journal
+        :param priority: priority of the journal listener, -20 by default (the top of the conventional -20 to 19
+            range): events are journaled as dispatched, unless listeners with a priority below -20 change them first
+
+        """
+        from whistle.dispatchers.asynchronous import AsyncEventDispatcher
+
+        listener = self._adurable if self.durable and isinstance(dispatcher, AsyncEventDispatcher) else self
+        for event_id in event_ids:
+            dispatcher.add_listener(event_id, listener, priority=priority)
+            self._attached.append((dispatcher, event_id, listener))
+
+    def detach(self, dispatcher, /, *event_ids: str) -> None:
+        """Stops journaling the events dispatched by the given dispatcher with the given event ids (or patterns)."""
+        for event_id in event_ids:
+            for attached in [attached for attached in self._attached if attached[:2] == (dispatcher, event_id)]:
+                self._attached.remove(attached)
+                dispatcher.remove_listener(event_id, attached[2])
+
+    def __call__(self, event: IEvent, /):
+        offset = self._journal(event)
+        if offset is not None and self.durable:
+            self.sync(offset + 1)
+
+    async def _adurable(self, event: IEvent, /):
+        # listener of durable journals attached to asynchronous dispatchers, awaiting a future resolved by the
+        # background thread once the record is durable
+        from asyncio import get_running_loop
+
+        offset = self._journal(event)
+        if offset is None:
+            return
+        loop = get_running_loop()
+        future = loop.create_future()
+        with self._synced_condition:
+            if self._synced > offset or self._closed:
+                return
+            self._waiters.append((offset + 1, loop, future))
+            self._wakeup.set()
+        await future
+
+    def _journal(self, event: IEvent, /) -> Optional[int]:
+        if self._replaying and id(event) in self._replaying:
+            return None
+        return self.append(event.name, dumps_event(event, default_type=self.event_factory))
+
+    def append(self, event_id: str, payload: bytes = b"", /, *, timestamp: Optional[float] = None) -> int:
+        """
+        Appends a record, returns its offset.
+
+        :param event_id: event id
+        :param payload: encoded event state
+        :param timestamp: time of the event (defaults to now)
+
+        """
+        name = event_id.encode()
+        body = b"".join((_META.pack(time.time() if timestamp is None else timestamp, len(name)), name, payload))
+        size = _HEADER.size + len(body)
+        if size > self.segment_size:
+            raise ValueError(f"Event {event_id!r} is too large for the journal segments ({size} bytes encoded).")
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{type(self).__name__} is closed, no more events can be journaled.")
+            position = self._written - self._base
+            if position + size > len(self._map):
+                self._rotate()
+                position = 0
+            self._map[position : position + _HEADER.size] = _HEADER.pack(len(body), crc32(body))
+            self._map[position + _HEADER.size : position + size] = body
+            offset = self._written
+            self._written += size
+        return offset
+
+    def sync(self, offset: Optional[int] = None) -> None:
+        """
+        Waits until the records before the given offset (all the appended records by default) are durable. Concurrent
+        calls share the same commits.
+
+        """
+        with self._synced_condition:
+            target = self._written if offset is None else offset
+            while self._synced < target and not self._closed:
+                self._wakeup.set()
+                self._synced_condition.wait()
+
+    def read(
+        self,
+        *,
+        start: int = 0,
+        end: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[tuple]:
+        """
+        Yields the ``(offset, timestamp, event_id, payload)`` records of the given offset range and time range,
+        reading segments one after the other. Records appended after the call are not read.
+
+        :param start: offset of the first record to read
+        :param end: offset after the last record to read
+        :param since: only read records with a timestamp greater or equal to this one
+        :param until: only read records with a timestamp lower than this one
+
+        """
+        limit = self._written if end is None else min(end, self._written)
+        segments = [base for base in self.segments() if base < limit]
+        for index, base in enumerate(segments):
+            following = segments[index + 1] if index + 1 < len(segments) else None
+            if following is not None and following <= start:
+                continue
+            if since is not None and following is not None:
+                first = self._first_timestamp(following)
+                if first is not None and first < since:
+                    continue
+
+            with open(os.path.join(self.directory, _segment_name(base)), "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    for record in _iter_records(buf, base, 0, limit):
+                        if record[0] < start or (since is not None and record[1] < since):
+                            continue
+                        if until is not None and record[1] >= until:
+                            return
+                        yield record
+
+    def replay(self, dispatcher: IEventDispatcher, /, **kwargs) -> int:
+        """
+        Dispatches the events of the given range again (see :meth:`read` for arguments), consecutive events with the
+        same event id in batches. Returns the number of replayed events. Replayed events are not journaled again.
+
+        """
+        count = 0
+        for event_id, events in self._iter_replay_batches(dispatcher, **kwargs):
+            try:
+                dispatcher.dispatch_many(event_id, events)
+            finally:
+                self._replaying.difference_update(map(id, events))
+            count += len(events)
+        return count
+
+    async def areplay(self, dispatcher: IAsyncEventDispatcher, /, **kwargs) -> int:
+        """Same as :meth:`replay`, for asynchronous dispatchers."""
+        count = 0
+        for event_id, events in self._iter_replay_batches(dispatcher, **kwargs):
+            try:
+                await dispatcher.adispatch_many(event_id, events)
+            finally:
+                self._replaying.difference_update(map(id, events))
+            count += len(events)
+        return count
+
+    def close(self) -> None:
+        """
+        Detaches the journal from the dispatchers it is attached to (see :meth:`attach`), makes all the appended records
+        durable, then closes the journal. Closing a closed journal does nothing.
+
+        """
+        if self._closed:
+            return
+        for dispatcher, event_id, listener in self._attached:
+            try:
+                dispatcher.remove_listener(event_id, listener)
+            except ValueError:
+                # already removed from the dispatcher
+                pass
+        self._attached.clear()
+        self.sync()
+        with self._lock:
+            self._closed = True
+            self._synced_condition.notify_all()
+        self._wakeup.set()
+        self._worker.join()
+        with self._sync_lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+        # everything is durable now
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        _resolve_waiters(waiters)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.directory!r}>"
+
+    def _iter_replay_batches(self, dispatcher, /, **kwargs):
+        factory = dispatcher.event_factory
+        for event_id, records in groupby(self.read(**kwargs), key=itemgetter(2)):
+            while True:
+                events = [loads_event(record[3], factory=factory) for record in islice(records, REPLAY_BATCH_SIZE)]
+                if not events:
+                    break
+                self._replaying.update(map(id, events))
+                yield event_id, events
+
+    def _first_timestamp(self, base: int, /) -> Optional[float]:
+        with open(os.path.join(self.directory, _segment_name(base)), "rb") as file:
+            header = file.read(_HEADER.size + _META.size)
+        if len(header) < _HEADER.size + _META.size or not _HEADER.unpack_from(header)[0]:
+            return None
+        return _META.unpack_from(header, _HEADER.size)[0]
+
+    def _record_end(self, position: int, /) -> int:
+        length, _ = _HEADER.unpack_from(self._map, position)
+        return position + _HEADER.size + length
+
+    def _open_segment(self, base: int, /):
+        path = os.path.join(self.directory, _segment_name(base))
+        created = not os.path.exists(path)
+        self._file = open(path, "a+b")
+        if created:
+            # the directory entry of the new segment must be durable too, for its records to be
+            _fsync_directory(self.directory)
+        if os.fstat(self._file.fileno()).st_size < self.segment_size:
+            # files are sparse, the space is only allocated when written
+            self._file.truncate(self.segment_size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._base = base
+
+    def _rotate(self):
+        # called with the lock held, so records cannot be appended meanwhile
+        with self._sync_lock:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+        self._open_segment(self._written)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.sync_interval)
+            self._wakeup.clear()
+            with self._lock:
+                target, buf = self._written, self._map
+            if target > self._synced:
+                with self._sync_lock:
+                    if not buf.closed:
+                        buf.flush()
+            with self._synced_condition:
+                self._synced = max(self._synced, target)
+                self._synced_condition.notify_all()
+                waiters = [waiter for waiter in self._waiters if waiter[0] <= self._synced]
+                if waiters:
+                    self._waiters = [waiter for waiter in self._waiters if waiter[0] > self._synced]
+            _resolve_waiters(waiters)
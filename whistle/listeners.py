@@ -1,15 +1,448 @@
-from collections import defaultdict
+from __future__ import annotations
+
+import sys
+from bisect import bisect_left, insort
+from functools import partial
+from heapq import merge
+from itertools import chain, count, groupby
+from operator import itemgetter
 
 from whistle.errors import RemovedInWhistle2Error
-from whistle.typing import IListener
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Optional
+    from whistle.typing import IListener
+
+SEPARATOR = "."
+"""Separator between the segments of hierarchical event ids (``"order.created"``)."""
+
+WILDCARD = "*"
+"""Pattern segment matching exactly one event id segment (``"order.*"`` matches ``"order.created"``)."""
+
+MULTI_WILDCARD = "#"
+"""Pattern segment matching zero or more event id segments (``"order.#"`` matches ``"order"`` and ``"order.a.b"``)."""
+
+
+#: Sorted listeners of event ids having no listener registered for them as such (no listener at all, or only listeners
+#: of matching patterns) are only cached while the sorted listeners cache is smaller than this: there is no limit to the
+#: number of event ids a ``"#"`` pattern matches, so dispatching arbitrary event ids must not grow the cache without
+#: bounds. Event ids registered as such are always cached, as they are as many as the registrations.
+MAX_CACHED_UNREGISTERED_LISTENERS = 4096
+
+#: Default of attributes missing on an event, when matching it against listener filters.
+_MISSING = object()
+
+#: Code flag of coroutine functions (``inspect.CO_COROUTINE``, not imported to keep whistle's import cheap).
+_CO_COROUTINE = 0x80
+
+
+def is_coroutine_function(listener, /) -> bool:
+    """
+    Is the given listener a coroutine function (including bound methods, :func:`functools.partial` objects and
+    :class:`unittest.mock.AsyncMock` instances)? This is a cheaper version of :func:`asyncio.iscoroutinefunction`,
+    that does not need to import :mod:`asyncio` nor :mod:`inspect`.
+
+    """
+    while isinstance(listener, partial):
+        listener = listener.func
+    listener = getattr(listener, "__func__", listener)  # bound methods
+
+    inspect = sys.modules.get("inspect")
+    if inspect is not None and getattr(listener, "_is_coroutine_marker", None) is getattr(
+        inspect, "_is_coroutine_mark", inspect
+    ):
+        # marked with inspect.markcoroutinefunction() (python 3.12+), which means inspect is already imported
+        return True
+
+    flags = getattr(getattr(listener, "__code__", None), "co_flags", None)
+    return isinstance(flags, int) and bool(flags & _CO_COROUTINE)
+
+
+def is_pattern(event_id, /) -> bool:
+    """
+    Is the given event id a subscription pattern (containing a ``*`` or ``#`` segment) rather than a concrete event id?
+
+    """
+    return (
+        isinstance(event_id, str)
+        and (WILDCARD in event_id or MULTI_WILDCARD in event_id)
+        and any(segment in (WILDCARD, MULTI_WILDCARD) for segment in event_id.split(SEPARATOR))
+    )
+
+
+def match_pattern(pattern: str, event_id: str, /) -> bool:
+    """
+    Does the given pattern match the given concrete event id?
+
+    """
+    return _match_segments(pattern.split(SEPARATOR), 0, event_id.split(SEPARATOR), 0)
+
+
+def _match_segments(pattern, i, segments, j):
+    while i < len(pattern):
+        if pattern[i] == MULTI_WILDCARD:
+            return any(_match_segments(pattern, i + 1, segments, k) for k in range(j, len(segments) + 1))
+        if j == len(segments) or (pattern[i] != WILDCARD and pattern[i] != segments[j]):
+            return False
+        i, j = i + 1, j + 1
+    return j == len(segments)
+
+
+class _PatternsTrie:
+    """
+    Segment trie of the subscription patterns, used to find all the patterns matching a concrete event id without
+    testing each pattern in turn.
+
+    """
+
+    __slots__ = ("children", "pattern")
+
+    def __init__(self):
+        self.children = {}
+        self.pattern = None
+
+    def __bool__(self):
+        return bool(self.children)
+
+    def add(self, pattern: str, /):
+        node = self
+        for segment in pattern.split(SEPARATOR):
+            node = node.children.setdefault(segment, _PatternsTrie())
+        node.pattern = pattern
+
+    def remove(self, pattern: str, /):
+        path, node = [], self
+        for segment in pattern.split(SEPARATOR):
+            if segment not in node.children:
+                return
+            path.append((node, segment))
+            node = node.children[segment]
+        node.pattern = None
+
+        # prune the now useless branches
+        for parent, segment in reversed(path):
+            child = parent.children[segment]
+            if child.pattern is not None or child.children:
+                break
+            del parent.children[segment]
+
+    def match(self, event_id: str, /):
+        """Yields the patterns matching the given concrete event id (once each, even if they match in several ways)."""
+        yield from dict.fromkeys(self._match(event_id.split(SEPARATOR), 0))
+
+    def _match(self, segments, i):
+        if i == len(segments):
+            if self.pattern is not None:
+                yield self.pattern
+        else:
+            if segments[i] in self.children:
+                yield from self.children[segments[i]]._match(segments, i + 1)
+            if WILDCARD in self.children:
+                yield from self.children[WILDCARD]._match(segments, i + 1)
+
+        if MULTI_WILDCARD in self.children:
+            child = self.children[MULTI_WILDCARD]
+            for j in range(i, len(segments) + 1):
+                yield from child._match(segments, j)
+
+
+class ListenerWrapper:
+    """
+    Base class for callables wrapping a listener to alter how it is called. Wrappers compare equal to (and hash like)
+    the wrapped listener (unwrapped through any number of wrappers), so the original listener can still be given to
+    ``remove_listener()``.
+
+    """
+
+    __slots__ = ("listener",)
+
+    def __init__(self, listener: IListener, /):
+        if not callable(listener):
+            raise TypeError(f"Listener should be a callable, {type(listener)} given")
+        self.listener = listener
+
+    def __call__(self, event, /):
+        return self.listener(event)
+
+    def __eq__(self, other):
+        # compares the innermost targets, so that a chain of wrappers equals the given listener, or the given inner
+        # wrapper (for example, a weak listener being discarded)
+        if isinstance(other, ListenerWrapper):
+            other = other._target()
+        return self._target() == other
+
+    def __hash__(self):
+        return hash(self._target())
+
+    def _target(self):
+        # the wrapped listener, unwrapped (wrappers that do not hold the listener itself return themselves)
+        listener = self.listener
+        return listener._target() if isinstance(listener, ListenerWrapper) else listener
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.listener!r}>"
+
+
+class InlineListener(ListenerWrapper):
+    """
+    Wraps a regular (not coroutine) function registered on an asynchronous dispatcher. Compiled dispatch plans call the
+    wrapped function directly, and only await its result if it is awaitable, so no coroutine is created for it. Calling
+    the wrapper itself returns a coroutine, for the other ways of calling listeners (concurrent tiers, queues, ...).
+
+    You usually don't have to create them yourself, :meth:`whistle.AsyncEventDispatcher.add_listener` does.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, listener: IListener, /):
+        if isinstance(listener, InlineListener):
+            listener = listener.listener
+        super().__init__(listener)
+
+    async def __call__(self, event, /):
+        result = self.listener(event)
+        if result is not None and hasattr(result, "__await__"):
+            return await result
+        return result
+
+
+class FilteredListener(ListenerWrapper):
+    """
+    Wraps a listener registered with ``where`` equality filters (event attribute name -> value). Calling the wrapper
+    only calls the listener if all the event attributes equal the filter values.
+
+    Dispatch plans do not call the wrapper: the listeners collection indexes filtered listeners by filter values, and
+    the plan of each event only includes the listeners whose filters match it. The wrapper is used by the other ways of
+    calling listeners (``dispatch_many()``, ...).
+
+    You usually don't have to create them yourself, use ``add_listener(..., where={...})`` instead.
+
+    .. versionadded:: 2.2
+
+    :param listener: the listener to filter events for
+    :param where: event attribute name -> value the attribute must be equal to
+
+    """
+
+    __slots__ = ("where",)
+
+    def __init__(self, listener: IListener, where: dict, /):
+        if not where:
+            raise ValueError("Listener filters cannot be empty.")
+        for name, value in where.items():
+            # filtered listeners are indexed by value, fail before the listener is registered
+            try:
+                hash(value)
+            except TypeError:
+                raise TypeError(f"Listener filter values must be hashable, {type(value)} given for {name!r}.") from None
+        super().__init__(listener)
+        self.where = dict(where)
+
+    def matches(self, event, /) -> bool:
+        """Does the given event match the filters?"""
+        return all(getattr(event, name, _MISSING) == value for name, value in self.where.items())
+
+    def __call__(self, event, /):
+        if self.matches(event):
+            return self.listener(event)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.listener!r} where {self.where!r}>"
+
+
+class AsyncFilteredListener(FilteredListener):
+    """
+    Same as :class:`FilteredListener`, for :class:`whistle.AsyncEventDispatcher`.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, event, /):
+        if self.matches(event):
+            return await self.listener(event)
+
+
+class _PriorityIndex:
+    """
+    Listeners registered for one event id (or pattern), incrementally kept in order: the priorities in use are kept
+    sorted (bisect), each priority bucket keeps its listeners in registration order, and a reverse index gives the
+    positions of a listener so it can be removed without scanning the buckets. Empty buckets are dropped.
+
+    Each listener is registered with a sequence number, used to keep the registration order when merging listeners of
+    different event ids / patterns that share the same priority.
+
+    """
+
+    __slots__ = ("buckets", "count", "positions", "priorities")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.positions = {}
+        self.priorities = []
+
+    def add(self, priority: int, sequence: int, listener: IListener, /):
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = {}
+            insort(self.priorities, priority)
+        bucket[sequence] = listener
+        self.count += 1
+
+        try:
+            self.positions.setdefault(listener, []).append((priority, sequence))
+        except TypeError:
+            # unhashable listeners are looked up by scanning the buckets on removal
+            pass
+
+    def remove(self, listener: IListener, /) -> int:
+        try:
+            positions = self.positions.pop(listener, ())
+        except TypeError:
+            positions = [entry[:2] for entry in self if entry[2] == listener]
+
+        for priority, sequence in positions:
+            bucket = self.buckets[priority]
+            del bucket[sequence]
+            if not bucket:
+                del self.buckets[priority]
+                del self.priorities[bisect_left(self.priorities, priority)]
+
+        self.count -= len(positions)
+        return len(positions)
+
+    def __iter__(self):
+        """Yields (priority, sequence, listener) tuples, in order."""
+        for priority in self.priorities:
+            for sequence, listener in self.buckets[priority].items():
+                yield priority, sequence, listener
+
+    def listeners(self) -> tuple[IListener, ...]:
+        return tuple(chain.from_iterable(self.buckets[priority].values() for priority in self.priorities))
+
+
+class _FiltersIndex:
+    """
+    Filtered listeners of one event id (or pattern), indexed by filter values, next to its unfiltered listeners: for
+    each set of filtered attribute names (a "signature"), the listeners are indexed by the tuple of their filter values,
+    so selecting the listeners matching an event costs one lookup per signature, whatever the number of filtered
+    listeners. Entries keep the priority and sequence of the registration (see :class:`_PriorityIndex`).
+
+    """
+
+    __slots__ = ("buckets", "locations", "unfiltered")
+
+    def __init__(self):
+        # signature (sorted attribute names) -> filter values -> index of the listeners
+        self.buckets = {}
+        # listener -> list of (signature, values) it is registered under
+        self.locations = {}
+        self.unfiltered = _PriorityIndex()
+
+    def add(self, priority: int, sequence: int, listener: IListener, /):
+        if not isinstance(listener, FilteredListener):
+            self.unfiltered.add(priority, sequence, listener)
+            return
+
+        signature = tuple(sorted(listener.where))
+        values = tuple(listener.where[name] for name in signature)
+        bucket = self.buckets.setdefault(signature, {})
+        index = bucket.get(values)
+        if index is None:
+            index = bucket[values] = _PriorityIndex()
+        index.add(priority, sequence, listener.listener)
+        try:
+            self.locations.setdefault(listener.listener, []).append((signature, values))
+        except TypeError:
+            pass
+
+    def remove(self, listener: IListener, /):
+        self.unfiltered.remove(listener)
+        try:
+            locations = self.locations.pop(listener, ())
+        except TypeError:
+            locations = [(signature, values) for signature, bucket in self.buckets.items() for values in tuple(bucket)]
+
+        for signature, values in locations:
+            bucket = self.buckets.get(signature, {})
+            index = bucket.get(values)
+            if index is not None and index.remove(listener) and not index.count:
+                del bucket[values]
+                if not bucket:
+                    del self.buckets[signature]
+
+    def select(self, event, /) -> list:
+        """Returns the indexes of the unfiltered listeners and of the listeners whose filters match the given event."""
+        indexes = [self.unfiltered] if self.unfiltered.count else []
+        for signature, bucket in self.buckets.items():
+            try:
+                index = bucket.get(tuple(getattr(event, name, _MISSING) for name in signature))
+            except TypeError:
+                # unhashable attribute value, cannot be equal to any (hashable) filter value
+                continue
+            if index is not None:
+                indexes.append(index)
+        return indexes
+
+
+class _NoLock:
+    """Lock-like context manager that does not lock anything, for collections that are not shared between threads."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
 
 
 class ListenersCollection:
-    def __init__(self) -> None:
-        self._items = defaultdict(lambda: defaultdict(list))
+    """
+    Listeners registered on a dispatcher, by event id (or pattern), and the caches of their resolved listeners and
+    dispatch plans.
+
+    A collection can have a ``parent`` collection (see :meth:`child`): its listeners are then resolved as its own
+    listeners and its parent ones, merged in priority order.
+
+    :param parent: optional collection to inherit the listeners from
+
+    """
+
+    # held while compiling and caching dispatch plans, see ThreadSafeListenersCollection
+    _lock = _NoLock()
+
+    def __init__(self, parent: Optional[ListenersCollection] = None, /) -> None:
+        # event id (or pattern) -> ordered index of its listeners (event ids without listeners are not kept)
+        self._items = {}
+        self.parent = parent
+        # collections inheriting from this one, whose caches are invalidated along with this one's
+        self._children = None
+        # the sequence is shared with the parent, so that the registration order is kept across collections
+        self._sequence = count() if parent is None else parent._sequence
+        if parent is not None:
+            parent._add_child(self)
+        self._patterns = _PatternsTrie()
+        # event id (or pattern) -> filters index, only for the ones having filtered listeners
+        self._filters = {}
         self._sorted = {}
+        # compiled dispatch plans, owned by the dispatcher but cached (and invalidated) alongside the sorted listeners
+        self._plans = {}
+        # stages of dispatches with a deadline (see whistle.AsyncEventDispatcher.adispatch), cached the same way
+        self._stages = {}
+        # cache statistics (only counted out of the dispatch hot path, which only looks up the plans)
+        self._hits = 0
+        self._misses = 0
+        self._compiled = 0
 
-    def add(self, event_id: str, listener: IListener, /, *, priority: int = 0) -> None:
+    def add(self, event_id: str, listener: IListener, /, *, priority: int = 0, where: Optional[dict] = None) -> None:
         """
         Add a listener for the given event id, with the given priority.
 
@@ -22,23 +455,58 @@ class ListenersCollection:
         could support arbitrary hashable values as event ids (and we encouraged so in whistle 1.x), we now restrict it
         to strings for performance reasons.
 
-        :param event_id: string identifier for the event
+        The event id can also be a pattern, made of dot-separated segments where ``*`` matches exactly one segment and
+        ``#`` matches zero or more segments (for example ``"order.*"``, ``"order.#"`` or ``"#"`` for all events). The
+        listener will then be called for all dispatched events whose id matches the pattern, merged with the other
+        listeners in priority order.
+
+        With ``where`` equality filters (event attribute name -> value), the listener is only called for the events
+        whose attributes equal the given values. Filtered listeners are indexed by filter values, so that dispatch plans
+        only call the matching ones (see :class:`FilteredListener`).
+
+        :param event_id: string identifier for the event (or pattern)
         :param listener: callback to be called when the event is dispatched
         :param priority: integer priority for the listener (-20 (high) to 19 (low))
+        :param where: optional equality filters, event attribute name -> hashable value
 
         """
 
         if not callable(listener):
             raise TypeError(f"Listener should be a callable, {type(listener)} given")
+        if where is not None and not isinstance(listener, FilteredListener):
+            listener = FilteredListener(listener, where)
+
+        index = self._items.get(event_id)
+        if index is None:
+            index = self._items[event_id] = _PriorityIndex()
+        sequence = next(self._sequence)
+        index.add(priority, sequence, listener)
+
+        filters = self._filters.get(event_id)
+        if filters is None and isinstance(listener, FilteredListener):
+            # first filtered listener of this event id, index the unfiltered ones registered before
+            filters = self._filters[event_id] = _FiltersIndex()
+            for entry in index:
+                if entry[1] != sequence:
+                    filters.add(*entry)
+        if filters is not None:
+            filters.add(priority, sequence, listener)
+        self._invalidate(event_id)
+
+    def child(self) -> ListenersCollection:
+        """
+        Returns a new, empty collection of the same type, inheriting the listeners of this one (see
+        :meth:`whistle.dispatchers.base.AbstractEventDispatcher.child`).
 
-        # priority = chr(priority)
-        self._items[event_id][priority].append(listener)
-        if event_id in self._sorted:
-            del self._sorted[event_id]
+        .. versionadded:: 2.2
+
+        """
+        return type(self)(self)
 
     def get(self, event_id: str, /) -> tuple[IListener, ...]:
         """
-        Gets the listeners for the given event id, in order of priority.
+        Gets the listeners for the given event id, in order of priority, including the listeners registered for
+        matching patterns (and the inherited listeners, if the collection has a parent).
 
         :param event_id: string identifier for the event
 
@@ -46,43 +514,307 @@ class ListenersCollection:
         if event_id is None:
             raise RemovedInWhistle2Error("ListenersCollection.get() without event_id is not accepted anymore.")
 
-        if event_id not in self._items:
-            return ()
+        _sorted = self._sorted
+        if event_id in _sorted:
+            self._hits += 1
+            return _sorted[event_id]
 
-        if event_id not in self._sorted:
-            self._sort(event_id)
+        self._misses += 1
+        if self.parent is not None and not self._has_own(event_id):
+            # nothing registered here, use the parent's listeners (and cache)
+            return self.parent.get(event_id)
+        if event_id not in self._items and not (self._patterns and isinstance(event_id, str)):
+            return ()
 
-        return self._sorted[event_id]
+        return self._sort(event_id)
 
     def has(self, event_id: str, /) -> bool:
-        # todo avoid sort for has !!!
-        return bool(len(self.get(event_id)))
+        """
+        Checks whether there is at least one listener for the given event id (including matching patterns), without
+        resolving the sorted listeners.
+
+        :param event_id: string identifier for the event
+
+        """
+        if event_id is None:
+            raise RemovedInWhistle2Error("ListenersCollection.has() without event_id is not accepted anymore.")
+
+        return self._has_own(event_id) or (self.parent is not None and self.parent.has(event_id))
 
     def remove(self, event_id: str, listener: IListener, /) -> None:
-        """ """
-        if event_id not in self._items:
+        """
+        Removes all the registrations of the given listener for the given event id (or pattern).
+
+        :param event_id: string identifier for the event (or pattern)
+        :param listener: the listener to remove, compared by equality
+
+        """
+        index = self._items.get(event_id)
+        if index is None:
             raise ValueError(f"Listener {listener} is not registered for event {event_id}.")
 
-        for priority, listeners in self._items[event_id].items():
-            if listener in listeners:
-                self._items[event_id][priority] = list(filter(lambda _listener: _listener != listener, listeners))
+        index.remove(listener)
+        self._remove_filtered(event_id, listener)
+        if not index.count:
+            del self._items[event_id]
+            self._filters.pop(event_id, None)
 
-        if event_id in self._sorted:
-            del self._sorted[event_id]
+        self._invalidate(event_id)
 
     def keys(self):
+        if self.parent is not None:
+            return dict.fromkeys(chain(self.parent.keys(), self._items)).keys()
         return self._items.keys()
 
     def items(self):
         for event_id in self.keys():
             yield event_id, self.get(event_id)
 
+    def stats(self) -> dict:
+        """
+        Returns the statistics of the caches: ``hits`` and ``misses`` of the sorted listeners cache (used by
+        :meth:`get`, and counting the dispatches using a cached plan too while the instrumentation of the dispatcher is
+        enabled), number of dispatch plans ``compiled``, and the number of event ids currently having their sorted
+        listeners (``sorted``) and dispatch plan (``plans``) cached.
+
+        .. versionadded:: 2.2
+
+        """
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "compiled": self._compiled,
+            "sorted": len(self._sorted),
+            "plans": len(self._plans),
+        }
+
+    def _has_own(self, event_id, /) -> bool:
+        # are there listeners registered in this collection (not inherited) for the given event id?
+        if event_id in self._items:
+            return True
+
+        # patterns without listeners are removed from the trie, so any match means at least one listener
+        return (
+            bool(self._patterns)
+            and isinstance(event_id, str)
+            and next(self._patterns.match(event_id), None) is not None
+        )
+
+    def _add_child(self, child, /):
+        if self._children is None:
+            from weakref import WeakSet
+
+            self._children = WeakSet()
+        self._children.add(child)
+
+    def _discard(self, event_id, listener, /):
+        # removes the given registration if still there (used by weak listeners once collected, which can happen after
+        # they were explicitly removed)
+        index = self._items.get(event_id)
+        if index is None or not index.remove(listener):
+            return
+        self._remove_filtered(event_id, listener)
+        if not index.count:
+            del self._items[event_id]
+            self._filters.pop(event_id, None)
+        self._invalidate(event_id)
+
+    def _remove_filtered(self, event_id, listener, /):
+        filters = self._filters.get(event_id)
+        if filters is not None:
+            filters.remove(listener)
+
+    def _cache_plan(self, event_id, plan, /):
+        self._plans[event_id] = plan
+
+    def _cache_stages(self, event_id, stages, /):
+        self._stages[event_id] = stages
+
+    def _clear_plans(self):
+        self._plans.clear()
+
+    def _invalidate(self, event_id, /):
+        if is_pattern(event_id):
+            if event_id in self._items:
+                self._patterns.add(event_id)
+            else:
+                self._patterns.remove(event_id)
+
+        self._forget(event_id)
+
+    def _forget(self, event_id, /):
+        # drops the cached listeners and plans of the given event id (or of the event ids matching the given pattern),
+        # here and in the collections inheriting from this one
+        caches = _sorted, plans, stages = self._get_writable_caches()
+        if is_pattern(event_id):
+            # only the resolved event ids matching the changed pattern need to be resolved again
+            for cache in caches:
+                for _event_id in [
+                    _event_id
+                    for _event_id in cache
+                    if isinstance(_event_id, str) and match_pattern(event_id, _event_id)
+                ]:
+                    del cache[_event_id]
+
+        for cache in caches:
+            cache.pop(event_id, None)
+        self._sorted, self._plans, self._stages = caches
+
+        if self._children:
+            for child in tuple(self._children):
+                child._forget(event_id)
+
+    def _get_writable_caches(self):
+        return self._sorted, self._plans, self._stages
+
+    def _tiers(self, event_id, /, event=None) -> tuple[tuple[IListener, ...], ...]:
+        """
+        Gets the listeners for the given event id grouped by priority ("tiers"), in order of priority. Not cached, this
+        is meant to be used when compiling dispatch plans (which are).
+
+        If an event is given, only the filtered listeners matching it are included (unwrapped, as their filters do not
+        need to be checked anymore), with the unfiltered ones.
+
+        """
+        return tuple(
+            tuple(map(itemgetter(2), entries))
+            for _, entries in groupby(
+                merge(*self._get_indexes(event_id, event), key=itemgetter(0, 1)), key=itemgetter(0)
+            )
+        )
+
+    def _signatures(self, event_id, /) -> set:
+        """
+        Gets the sets of event attribute names (sorted tuples) the listeners of the given event id (including matching
+        patterns and inherited listeners) filter on. Empty if none of them is filtered.
+
+        """
+        signatures = set()
+        if self._filters:
+            event_ids = [event_id]
+            if self._patterns and isinstance(event_id, str):
+                event_ids += self._patterns.match(event_id)
+            for _event_id in event_ids:
+                if _event_id in self._filters:
+                    signatures.update(self._filters[_event_id].buckets)
+        if self.parent is not None:
+            signatures |= self.parent._signatures(event_id)
+        return signatures
+
+    def _get_indexes(self, event_id, /, event=None):
+        event_ids = [event_id] if event_id in self._items else []
+        if self._patterns and isinstance(event_id, str):
+            event_ids += [pattern for pattern in self._patterns.match(event_id) if pattern != event_id]
+
+        if event is None or not self._filters:
+            indexes = [self._items[_event_id] for _event_id in event_ids]
+        else:
+            indexes = []
+            for _event_id in event_ids:
+                filters = self._filters.get(_event_id)
+                indexes += [self._items[_event_id]] if filters is None else filters.select(event)
+
+        if self.parent is not None:
+            indexes += self.parent._get_indexes(event_id, event)
+        return indexes
+
     def _sort(self, event_id, /):
-        # set to an empty list just in case some concurrent access happens
-        _sorted = ()
-        self._sorted[event_id] = _sorted
+        indexes = self._get_indexes(event_id)
+
+        if len(indexes) == 1:
+            # each index is already ordered, no sort needed
+            _sorted = indexes[0].listeners()
+        else:
+            # merge the already ordered indexes of the event id and matching patterns
+            _sorted = tuple(map(itemgetter(2), merge(*indexes, key=itemgetter(0, 1))))
+
+        if self._is_registered(event_id) or len(self._sorted) < MAX_CACHED_UNREGISTERED_LISTENERS:
+            self._cache_sorted(event_id, _sorted)
+        return _sorted
+
+    def _is_registered(self, event_id, /) -> bool:
+        # are listeners registered for the event id as such (not only for matching patterns), here or in an ancestor?
+        collection = self
+        while collection is not None:
+            if event_id in collection._items:
+                return True
+            collection = collection.parent
+        return False
+
+    def _cache_sorted(self, event_id, listeners, /):
+        self._sorted[event_id] = listeners
+
+
+class ThreadSafeListenersCollection(ListenersCollection):
+    """
+    Listeners collection that can be shared between threads (including on free-threaded python builds).
+
+    Writers (adding or removing listeners, and resolving the listeners or dispatch plan of an event id not cached yet)
+    take a lock, and publish the sorted listeners and dispatch plans caches as new dicts instead of changing them in
+    place (copy-on-write). Readers of cached entries, like :meth:`whistle.EventDispatcher.dispatch`, do not lock: they
+    read the current cache dict reference once, and this dict is never changed afterwards.
+
+    Copying the caches makes changes slower, which suits the usual case of listeners registered once and dispatched
+    many times from many threads.
+
+    .. versionadded:: 2.2
+
+    """
+
+    def __init__(self, parent: Optional[ThreadSafeListenersCollection] = None, /) -> None:
+        from threading import RLock
+
+        super().__init__(parent)
+        # children share the lock of their parent, as their caches depend on the parent listeners
+        self._lock = RLock() if parent is None else parent._lock
+
+    def add(self, event_id: str, listener: IListener, /, *, priority: int = 0, where: Optional[dict] = None) -> None:
+        with self._lock:
+            super().add(event_id, listener, priority=priority, where=where)
+
+    def get(self, event_id: str, /) -> tuple[IListener, ...]:
+        _sorted = self._sorted
+        if event_id in _sorted:
+            self._hits += 1
+            return _sorted[event_id]
+
+        with self._lock:
+            return super().get(event_id)
+
+    def has(self, event_id: str, /) -> bool:
+        with self._lock:
+            return super().has(event_id)
+
+    def remove(self, event_id: str, listener: IListener, /) -> None:
+        with self._lock:
+            super().remove(event_id, listener)
+
+    def keys(self):
+        with self._lock:
+            # a copy, including the parent keys (the lock is shared with the parent)
+            return dict.fromkeys(super().keys()).keys()
+
+    def _discard(self, event_id, listener, /):
+        with self._lock:
+            super()._discard(event_id, listener)
+
+    def _add_child(self, child, /):
+        with self._lock:
+            super()._add_child(child)
+
+    # the methods below are called with the lock held, and publish new caches instead of changing the current ones
+
+    def _cache_sorted(self, event_id, listeners, /):
+        self._sorted = {**self._sorted, event_id: listeners}
+
+    def _cache_plan(self, event_id, plan, /):
+        self._plans = {**self._plans, event_id: plan}
+
+    def _cache_stages(self, event_id, stages, /):
+        self._stages = {**self._stages, event_id: stages}
 
-        for priority in sorted(self._items.get(event_id, {}).keys()):
-            _sorted += tuple(self._items[event_id][priority])
+    def _clear_plans(self):
+        self._plans = {}
 
-        self._sorted[event_id] = _sorted
+    def _get_writable_caches(self):
+        return dict(self._sorted), dict(self._plans), dict(self._stages)
@@ -0,0 +1,245 @@
+"""
+Offloading of CPU-bound listeners to worker processes.
+
+Offloaded listeners are called in a :class:`concurrent.futures.ProcessPoolExecutor` (so they are not serialized by
+the GIL), with a copy of the event: the event state is pickled and sent to the worker, the listener runs there, and the
+attributes it changed are sent back and set on the original event. The ``dispatcher`` attribute is not sent.
+
+Offloaded listeners and the events they receive must be picklable (module-level functions and event classes).
+
+"""
+
+from __future__ import annotations
+
+import threading
+
+from whistle.listeners import ListenerWrapper, is_coroutine_function
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+    from typing import Iterable, Optional
+    from whistle.typing import IEvent, IListener
+
+# pickle, asyncio and concurrent.futures are only imported when a listener is offloaded, to keep whistle's import cheap
+_default_executor = None
+_default_executor_lock = threading.Lock()
+
+
+def get_default_process_executor() -> Executor:
+    """
+    Returns the process pool shared by all offloaded listeners created without an explicit executor (created on first
+    use, worker processes are then kept warm and reused).
+
+    """
+    global _default_executor
+    if _default_executor is None:
+        with _default_executor_lock:
+            if _default_executor is None:
+                import atexit
+                from concurrent.futures import ProcessPoolExecutor
+
+                _default_executor = ProcessPoolExecutor()
+                # shut the pool down before the interpreter starts tearing modules down
+                atexit.register(_default_executor.shutdown)
+    return _default_executor
+
+
+def get_event_state(event: IEvent, /) -> dict:
+    """
+    Returns the attributes of the given event that can be shipped to another process (instance dict and slots), except
+    the dispatcher and the listeners that timed out.
+
+    """
+    state = dict(getattr(event, "__dict__", ()))
+    for cls in type(event).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name not in ("__dict__", "__weakref__") and hasattr(event, name):
+                state[name] = getattr(event, name)
+    state.pop("dispatcher", None)
+    state.pop("timed_out", None)
+    return state
+
+
+def dumps_event(event: IEvent, /, *, default_type=None) -> bytes:
+    """
+    Encodes an event to be sent to another process: its type and its state (see :func:`get_event_state`, without the
+    name and propagation flag, set again when dispatching), pickled. Events of ``default_type`` without any state are
+    encoded as empty bytes.
+
+    .. versionadded:: 2.2
+
+    """
+    state = get_event_state(event)
+    state.pop("name", None)
+    state.pop("propagation_stopped", None)
+    if not state and type(event) is default_type:
+        return b""
+
+    import pickle
+
+    return pickle.dumps((type(event), state), protocol=5)
+
+
+def loads_event(payload: bytes, /, *, factory, types: Optional[Iterable[type]] = None) -> IEvent:
+    """
+    Decodes an event encoded by :func:`dumps_event`, calling ``factory`` for empty payloads.
+
+    Unpickling runs arbitrary code, so only decode trusted payloads, or restrict the classes the payload may reference
+    with ``types``: the event types, and the types of the values of their attributes (builtin containers and scalars
+    never need to be listed, and dates, times, decimals and UUIDs are always allowed). :class:`pickle.UnpicklingError`
+    is raised for any other class.
+
+    .. versionadded:: 2.2
+
+    :param payload: the encoded event
+    :param factory: callable creating the event for empty payloads
+    :param types: the classes the payload may reference (any class if not given)
+
+    """
+    if not payload:
+        return factory()
+
+    if types is None:
+        import pickle
+
+        event_type, state = pickle.loads(payload)
+    else:
+        event_type, state = restricted_loads(payload, types)
+    event = event_type.__new__(event_type)
+    event.propagation_stopped = False
+    for name, value in state.items():
+        setattr(event, name, value)
+    return event
+
+
+# classes payloads decoded with restricted_loads() may always reference
+_SAFE_GLOBALS = frozenset(
+    {
+        ("builtins", "bytearray"),
+        ("builtins", "complex"),
+        ("builtins", "frozenset"),
+        ("builtins", "set"),
+        ("datetime", "date"),
+        ("datetime", "datetime"),
+        ("datetime", "time"),
+        ("datetime", "timedelta"),
+        ("datetime", "timezone"),
+        ("decimal", "Decimal"),
+        ("uuid", "UUID"),
+    }
+)
+_restricted_unpickler = None
+
+
+def restricted_loads(payload: bytes, types: Iterable[type], /):
+    """
+    Unpickles the given payload, allowing it to reference the given classes (and the few safe ones listed in
+    :func:`loads_event`) only, so that decoding cannot call arbitrary functions.
+
+    .. versionadded:: 2.2
+
+    """
+    global _restricted_unpickler
+    import io
+    import pickle
+
+    if _restricted_unpickler is None:
+
+        class RestrictedUnpickler(pickle.Unpickler):
+            def __init__(self, file, allowed, /):
+                super().__init__(file)
+                self.allowed = allowed
+
+            def find_class(self, module, name):
+                cls = self.allowed.get((module, name))
+                if cls is not None:
+                    return cls
+                if (module, name) in _SAFE_GLOBALS:
+                    return super().find_class(module, name)
+                raise pickle.UnpicklingError(f"Forbidden class {module}.{name} in event payload.")
+
+        _restricted_unpickler = RestrictedUnpickler
+
+    allowed = {(cls.__module__, cls.__qualname__): cls for cls in types}
+    return _restricted_unpickler(io.BytesIO(payload), allowed).load()
+
+
+def _call_in_process(listener: IListener, payload: bytes, /) -> dict:
+    import pickle
+
+    event_type, state = pickle.loads(payload)
+    event = event_type.__new__(event_type)
+    for name, value in state.items():
+        setattr(event, name, value)
+
+    listener(event)
+
+    # compare to a pristine copy, to detect in-place changes of mutable attributes too
+    _, before = pickle.loads(payload)
+    missing = object()
+    return {
+        name: value
+        for name, value in get_event_state(event).items()
+        if before.get(name, missing) is missing or before[name] != value
+    }
+
+
+class ProcessListener(ListenerWrapper):
+    """
+    Wraps a listener so that it is called in a worker process (see module documentation). Calling the wrapper blocks
+    until the listener has completed in the worker process, then merges the changed attributes back onto the event.
+
+    You usually don't have to create them yourself, use ``add_listener(..., process=True)`` instead, unless you want
+    to use a specific executor.
+
+    .. versionadded:: 2.2
+
+    :param listener: picklable listener to call in a worker process (not a coroutine function, as the worker process
+        has no event loop to run it)
+    :param executor: process pool to use (defaults to a process pool shared by all offloaded listeners)
+
+    """
+
+    __slots__ = ("executor",)
+
+    def __init__(self, listener: IListener, /, *, executor: Optional[Executor] = None):
+        if isinstance(listener, ProcessListener):
+            listener, executor = listener.listener, executor or listener.executor
+        if is_coroutine_function(listener):
+            raise TypeError(
+                f"Listener called in a worker process should not be a coroutine function, {listener!r} given"
+            )
+        super().__init__(listener)
+        self.executor = executor
+
+    def _submit(self, event: IEvent, /):
+        import pickle
+
+        payload = pickle.dumps((type(event), get_event_state(event)))
+        return (self.executor or get_default_process_executor()).submit(_call_in_process, self.listener, payload)
+
+    def __call__(self, event: IEvent, /):
+        _apply_changes(event, self._submit(event).result())
+
+
+class AsyncProcessListener(ProcessListener):
+    """
+    Same as :class:`ProcessListener`, for :class:`whistle.AsyncEventDispatcher`: calling the wrapper returns a
+    coroutine, awaiting the worker process without blocking the event loop.
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, event: IEvent, /):
+        from asyncio import wrap_future
+
+        _apply_changes(event, await wrap_future(self._submit(event)))
+
+
+def _apply_changes(event: IEvent, changes: dict, /):
+    for name, value in changes.items():
+        setattr(event, name, value)
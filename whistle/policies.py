@@ -0,0 +1,338 @@
+"""
+Dispatch policies limit how often the listeners of an event id run, for event ids dispatched much more often than their
+listeners need to run (configuration changes, dirty caches, progress updates, ...)::
+
+    dispatcher.set_policy("config.changed", Debounce(0.5))
+    dispatcher.set_policy("job.progress", Throttle(10))
+    dispatcher.set_policy("cache.dirty", Coalesce(0.1, key=lambda event: event.key))
+
+A policy is applied to the dispatch plan of its event id, so event ids without policy do not pay anything. Dispatches
+are either run immediately (in the dispatching thread or task), suppressed, or deferred: deferred events are dispatched
+later by the timer thread shared by synchronous dispatchers, or by a task of the event loop for asynchronous
+dispatchers. Exceptions raised by listeners of deferred events are logged.
+
+``dispatch()`` still returns the event when its dispatch is suppressed or deferred, so check the listeners side effects
+rather than the returned event. Each policy counts the dispatches it ran (``dispatched``) and the ones it suppressed
+(``suppressed``), see :meth:`DispatchPolicy.stats`.
+
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+from abc import ABCMeta, abstractmethod
+from functools import partial
+from itertools import count
+from time import monotonic
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Hashable, Optional
+    from whistle.typing import IEvent
+
+logger = logging.getLogger(__name__)
+
+
+class _TimerThread:
+    """
+    Single background thread running the callbacks scheduled by the policies of synchronous dispatchers, in order of
+    due time (started on first use).
+
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._heap = []
+        self._sequence = count()
+        self._thread = None
+
+    def schedule(self, delay: float, callback: Callable[[], None], /) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (monotonic() + delay, next(self._sequence), callback))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="whistle-timer", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > monotonic():
+                    self._condition.wait(self._heap[0][0] - monotonic() if self._heap else None)
+                _, _, callback = heapq.heappop(self._heap)
+            try:
+                callback()
+            except Exception:
+                logger.exception("Error in dispatch policy timer callback %r.", callback)
+
+
+_timer = _TimerThread()
+
+
+# tasks of deferred asynchronous dispatches, referenced until done
+_tasks = set()
+
+
+def schedule(delay: float, callback: Callable[[], None], /) -> None:
+    """Calls the given callback in the policies timer thread, after the given delay (in seconds)."""
+    _timer.schedule(delay, callback)
+
+
+def spawn(awaitable, /) -> None:
+    """Runs the given awaitable in a task of the running event loop, logging the exception it raises (if any)."""
+    from asyncio import ensure_future
+
+    task = ensure_future(awaitable)
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+
+
+def _task_done(task, /):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Error while dispatching deferred event.", exc_info=task.exception())
+
+
+class DispatchPolicy(metaclass=ABCMeta):
+    """
+    Base class of dispatch policies. A policy instance holds the state of one event id of one dispatcher (and of its
+    children), so create one instance per :meth:`set_policy() <whistle.dispatchers.base.AbstractEventDispatcher.
+    set_policy>` call.
+
+    Subclasses implement :meth:`submit`, called for each dispatch with the dispatch plan and the event, keep the
+    events to dispatch later in ``_pending`` and schedule their dispatch with ``_schedule()``.
+
+    .. versionadded:: 2.2
+
+    """
+
+    def __init__(self):
+        self.dispatched = 0
+        self.suppressed = 0
+        self._dispatcher = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        # (plan, event) tuples waiting to be dispatched
+        self._pending = {}
+
+    def bind(self, dispatcher, /) -> None:
+        """Attaches the policy to the given dispatcher, a policy can only be used by one dispatcher."""
+        if self._dispatcher is not None and self._dispatcher is not dispatcher:
+            raise ValueError(f"{self!r} is already used by another dispatcher.")
+        self._dispatcher = dispatcher
+
+    def wrap(self, plan, /):
+        """Returns a dispatch plan applying the policy, then dispatching with the given plan."""
+        return partial(self.submit, plan)
+
+    @abstractmethod
+    def submit(self, plan, event: IEvent, /):
+        """
+        Called for each dispatch: runs the given plan with the event now (returns the plan result), or suppresses or
+        defers the dispatch (returns the result of the dispatcher no-op plan).
+
+        """
+        ...
+
+    def flush(self) -> list:
+        """Forgets the pending events and their timers, and returns them as ``(plan, event)`` tuples, to dispatch now."""
+        with self._lock:
+            pending = self._pop_pending()
+            self._generation += 1
+            self._reset()
+            self.dispatched += len(pending)
+        return pending
+
+    def stats(self) -> dict:
+        """Returns the number of dispatches run (``dispatched``), ``suppressed`` and currently deferred (``pending``)."""
+        return {"dispatched": self.dispatched, "suppressed": self.suppressed, "pending": len(self._pending)}
+
+    def _reset(self):
+        # resets the state of the policy once its pending events are gone (called with the lock held)
+        pass
+
+    def _skip(self, event: IEvent, /):
+        return self._dispatcher._noop_plan(event)
+
+    def _keep(self, key: Hashable, plan, event: IEvent, /):
+        # keeps the event to dispatch later, replacing the pending one with the same key (called with the lock held)
+        if key in self._pending:
+            self.suppressed += 1
+        self._pending[key] = (plan, event)
+
+    def _schedule(self, delay: float, callback, /):
+        # callback is called with the lock held (unless the pending events were flushed meanwhile), and returns the
+        # (plan, event) tuples to dispatch, which are dispatched once the lock is released
+        def expire(generation):
+            with self._lock:
+                if generation != self._generation:
+                    return
+                pending = callback()
+                if not pending:
+                    return
+                self.dispatched += len(pending)
+            for plan, event in pending:
+                try:
+                    self._dispatcher._run_deferred(plan, event)
+                except Exception:
+                    logger.exception("Error while dispatching deferred event %r.", getattr(event, "name", None))
+
+        self._dispatcher._schedule(delay, partial(expire, self._generation))
+
+    def _pop_pending(self) -> list:
+        pending = list(self._pending.values())
+        self._pending.clear()
+        return pending
+
+    def __repr__(self):
+        return f"<{type(self).__name__} dispatched={self.dispatched} suppressed={self.suppressed}>"
+
+
+class Debounce(DispatchPolicy):
+    """
+    Waits until no event was dispatched for ``wait`` seconds, then dispatches the last one (trailing edge). With
+    ``leading=True``, the first event of a burst is dispatched immediately instead, and with both ``leading`` and
+    ``trailing``, the last event of the burst is dispatched too (if there was more than one event).
+
+    .. versionadded:: 2.2
+
+    :param wait: quiet time (in seconds) that ends a burst of events
+    :param leading: dispatch the first event of a burst immediately
+    :param trailing: dispatch the last event of a burst once it ends
+
+    """
+
+    def __init__(self, wait: float, /, *, leading: bool = False, trailing: bool = True):
+        if not (leading or trailing):
+            raise ValueError("Debounce policy needs leading or trailing dispatches.")
+        super().__init__()
+        self.wait = wait
+        self.leading = leading
+        self.trailing = trailing
+        self._deadline = None
+
+    def submit(self, plan, event: IEvent, /):
+        with self._lock:
+            burst = self._deadline is not None
+            # timers are not rescheduled for each event, the timer checks the deadline when it expires
+            self._deadline = monotonic() + self.wait
+            if not burst:
+                self._schedule(self.wait, self._expire)
+            if burst or not self.leading:
+                if self.trailing:
+                    self._keep(None, plan, event)
+                else:
+                    self.suppressed += 1
+                return self._skip(event)
+            self.dispatched += 1
+        return plan(event)
+
+    def _expire(self):
+        remaining = self._deadline - monotonic()
+        if remaining > 0:
+            self._schedule(remaining, self._expire)
+            return None
+        self._deadline = None
+        return self._pop_pending()
+
+    def _reset(self):
+        self._deadline = None
+
+
+class Throttle(DispatchPolicy):
+    """
+    Dispatches at most ``rate`` events per ``per`` seconds (token bucket, allowing bursts of ``burst`` events), and
+    suppresses the others. With ``trailing=True``, the last suppressed event is dispatched as soon as the rate allows
+    it, so the last state is never lost.
+
+    .. versionadded:: 2.2
+
+    :param rate: number of dispatches allowed per ``per`` seconds
+    :param per: period (in seconds) of the rate
+    :param burst: number of dispatches allowed at once, after a quiet period
+    :param trailing: dispatch the last suppressed event once the rate allows it
+
+    """
+
+    def __init__(self, rate: float, /, *, per: float = 1.0, burst: int = 1, trailing: bool = False):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Throttle policy needs a positive rate and burst.")
+        super().__init__()
+        self.interval = per / rate
+        self.burst = burst
+        self.trailing = trailing
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._scheduled = False
+
+    def submit(self, plan, event: IEvent, /):
+        with self._lock:
+            if self._take():
+                if self._pending:
+                    # superseded by this event
+                    self._pending.clear()
+                    self.suppressed += 1
+            elif self.trailing:
+                self._keep(None, plan, event)
+                if not self._scheduled:
+                    self._scheduled = True
+                    self._schedule((1 - self._tokens) * self.interval, self._release)
+                return self._skip(event)
+            else:
+                self.suppressed += 1
+                return self._skip(event)
+            self.dispatched += 1
+        return plan(event)
+
+    def _take(self) -> bool:
+        now = monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _release(self):
+        self._scheduled = False
+        if not self._pending:
+            return None
+        if not self._take():
+            self._scheduled = True
+            self._schedule((1 - self._tokens) * self.interval, self._release)
+            return None
+        return self._pop_pending()
+
+    def _reset(self):
+        self._scheduled = False
+
+
+class Coalesce(DispatchPolicy):
+    """
+    Collects the events dispatched during ``interval`` seconds (starting with the first one), keeping only the latest
+    event for each key, then dispatches the kept events (in order of first occurrence of their key).
+
+    .. versionadded:: 2.2
+
+    :param interval: time (in seconds) events are collected for
+    :param key: callable returning the (hashable) key of an event, all the events share the same key by default
+
+    """
+
+    def __init__(self, interval: float, /, *, key: Optional[Callable[[IEvent], Hashable]] = None):
+        super().__init__()
+        self.interval = interval
+        self.key = key
+
+    def submit(self, plan, event: IEvent, /):
+        key = None if self.key is None else self.key(event)
+        with self._lock:
+            if not self._pending:
+                self._schedule(self.interval, self._expire)
+            self._keep(key, plan, event)
+        return self._skip(event)
+
+    def _expire(self):
+        return self._pop_pending()
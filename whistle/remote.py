@@ -0,0 +1,456 @@
+"""
+Remote dispatching: a :class:`RemoteEventDispatcher` forwards events over a TCP or Unix socket to a
+:class:`RemoteEventServer`, which dispatches them with its own dispatcher, in another process or on another host.
+
+The remote dispatcher is a listener, so remote listeners look local: register it on a local dispatcher for the event
+ids to forward::
+
+    remote = RemoteEventDispatcher(("127.0.0.1", 8600), secret=secret)
+    dispatcher.add_listener("order.*", remote)
+
+    # in the other process
+    server = RemoteEventServer(dispatcher, ("127.0.0.1", 8600), secret=secret, event_types=[OrderEvent])
+    server.serve_forever()
+
+Events are encoded (see :func:`whistle.offload.dumps_event`) when forwarded, then sent by background threads, each
+owning one connection of the pool, many events per frame. A frame is an 8 bytes header (body length and number of
+events), followed by, for each event, a 6 bytes header (event id and payload lengths), the event id and the payload.
+Sending does not wait for the remote listeners, but when the peer does not keep up, up to ``max_pending`` events are
+queued, then forwarding blocks (backpressure).
+
+Events sent on one connection are dispatched in order, so use a single connection (the default) if the order matters.
+
+Security: anyone able to connect to a server can dispatch events with its dispatcher. Servers listen on the loopback
+interface by default, and refuse to listen on other interfaces without a ``secret``: with a secret (shared by both
+ends), each frame is followed by its HMAC-SHA256 signature, and the connections sending frames with a wrong signature
+are closed. Whatever the signature, received payloads are only decoded with a restricted unpickler, which may only
+create instances of the server's ``event_types`` (see :func:`whistle.offload.loads_event`). Frames are signed, not
+encrypted, and may be replayed: use a Unix socket, or a TLS tunnel or private network, to cross untrusted networks.
+
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from itertools import groupby
+from operator import itemgetter
+
+from whistle.event import Event
+from whistle.offload import dumps_event, loads_event
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Iterable, Optional, Union
+    from whistle.typing import IEvent, IEventDispatcher
+
+    Address = Union[tuple, str]
+
+logger = logging.getLogger(__name__)
+
+# frame header: body length, number of events
+_FRAME = struct.Struct("<II")
+# event header: event id length, payload length
+_RECORD = struct.Struct("<HI")
+
+# frame signature, following the body when a secret is used
+_DIGEST = "sha256"
+_SIGNATURE_SIZE = 32
+
+#: Maximum size (in bytes) of a frame body accepted by servers. Remote dispatchers split their batches to stay below
+#: it, and reject the events too large to fit in a frame on their own.
+MAX_FRAME_SIZE = 64 << 20
+
+# maximum length (in bytes) of an encoded event id, given the event header
+_MAX_EVENT_ID_SIZE = 0xFFFF
+
+
+def encode_frame(items: list, /, *, secret: Optional[bytes] = None) -> bytes:
+    """
+    Encodes a list of ``(event_id, payload)`` items as a frame, signed with the given secret (if any).
+
+    :param items: the ``(event_id, payload)`` items
+    :param secret: secret shared with the server, to append the HMAC-SHA256 signature of the frame
+
+    """
+    parts = [b""]
+    for event_id, payload in items:
+        name = event_id.encode()
+        parts += (_RECORD.pack(len(name), len(payload)), name, payload)
+    body = b"".join(parts)
+    frame = _FRAME.pack(len(body), len(items)) + body
+    if secret is not None:
+        frame += hmac.digest(secret, frame, _DIGEST)
+    return frame
+
+
+def _split_frames(items: list, max_batch_size: int, /):
+    # yields the items in batches of at most max_batch_size items, whose encoded frame body fits in MAX_FRAME_SIZE
+    batch, size = [], 0
+    for item in items:
+        item_size = _RECORD.size + len(item[0].encode()) + len(item[1])
+        if batch and (len(batch) == max_batch_size or size + item_size > MAX_FRAME_SIZE):
+            yield batch
+            batch, size = [], 0
+        batch.append(item)
+        size += item_size
+    if batch:
+        yield batch
+
+
+def decode_frame(body: bytes, count: int, /) -> list:
+    """Decodes the body of a frame holding ``count`` events, returns a list of ``(event_id, payload)`` items."""
+    items, offset = [], 0
+    for _ in range(count):
+        name_length, payload_length = _RECORD.unpack_from(body, offset)
+        offset += _RECORD.size
+        event_id = body[offset : offset + name_length].decode()
+        offset += name_length
+        items.append((event_id, body[offset : offset + payload_length]))
+        offset += payload_length
+    return items
+
+
+def is_loopback(address: Address, /) -> bool:
+    """Returns whether the given address is a Unix socket path, or a TCP address of the loopback interface."""
+    if isinstance(address, str):
+        return True
+    host = address[0]
+    if host == "localhost":
+        return True
+    import ipaddress
+
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _connect(address: Address, timeout: Optional[float], /) -> socket.socket:
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout)
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            raise
+    else:
+        sock = socket.create_connection(address, timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    # sending blocks while the peer is not reading, this is what applies backpressure
+    sock.settimeout(None)
+    return sock
+
+
+class RemoteEventDispatcher:
+    """
+    Forwards events to a :class:`RemoteEventServer` (see module documentation). Use it as a listener of a local
+    dispatcher, or call :meth:`dispatch` directly. Events are sent by background threads, exceptions raised while
+    connecting or sending are given to ``on_error`` (or logged if no callback is given), and the events of the failed
+    frame are dropped (and counted in the ``dropped`` attribute). Events too large to be sent (see
+    :data:`MAX_FRAME_SIZE`) are rejected when forwarded, with a :class:`ValueError`, and counted as dropped too.
+
+    .. versionadded:: 2.2
+
+    :param address: ``(host, port)`` tuple for TCP, or path of a Unix socket
+    :param max_connections: number of connections (and sending threads) of the pool
+    :param max_batch_size: maximum number of events sent in one frame
+    :param max_pending: maximum number of events waiting to be sent, forwarding more blocks until some are sent
+    :param timeout: maximum time (in seconds) forwarding an event may block, :class:`TimeoutError` is raised after it
+    :param connect_timeout: timeout (in seconds) for opening a connection
+    :param event_factory: type of the events created by :meth:`dispatch`, sent without payload if they have no state
+    :param on_error: callback for exceptions raised while sending
+    :param secret: secret shared with the server, to sign the frames (required by servers not on the loopback interface)
+
+    """
+
+    def __init__(
+        self,
+        address: Address,
+        /,
+        *,
+        max_connections: int = 1,
+        max_batch_size: int = 1000,
+        max_pending: int = 10000,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = 5.0,
+        event_factory=Event,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        secret: Optional[bytes] = None,
+    ):
+        self.address = address
+        self.secret = secret
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.event_factory = event_factory
+        self.on_error = on_error
+
+        self.sent = 0
+        self.dropped = 0
+
+        self._closed = False
+        self._queue = queue.Queue(max_pending)
+        self._workers = [
+            threading.Thread(target=self._run, name="whistle-remote", daemon=True) for _ in range(max_connections)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __call__(self, event: IEvent, /):
+        self._put((event.name, dumps_event(event, default_type=self.event_factory)))
+
+    def dispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> IEvent:
+        """
+        Forwards an event to the remote dispatcher. Returns once the event is queued for sending.
+
+        :param event_id: string identifier for the event
+        :param event: optional event instance (if none is given, one will be created)
+        :param factory: optional callable creating the event, if none is given
+
+        """
+        if event is None:
+            event = (factory or self.event_factory)()
+        event.name = event_id
+        self._put((event_id, dumps_event(event, default_type=self.event_factory)))
+        return event
+
+    def dispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list:
+        """Forwards many events with the same event id, see :meth:`dispatch`."""
+        return [self.dispatch(event_id, event) for event in events]
+
+    def flush(self) -> None:
+        """Waits until all forwarded events have been sent (or dropped)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Sends the pending events, then stops the background threads and closes the connections."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.address!r}>"
+
+    def _put(self, item: tuple, /):
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} is closed, no more events can be forwarded.")
+        event_id, payload = item
+        name_size = len(event_id.encode())
+        if name_size > _MAX_EVENT_ID_SIZE or _RECORD.size + name_size + len(payload) > MAX_FRAME_SIZE:
+            self.dropped += 1
+            raise ValueError(f"Event {event_id[:100]!r} is too large to be forwarded to {self.address!r}.")
+        try:
+            self._queue.put(item, timeout=self.timeout)
+        except queue.Full:
+            raise TimeoutError(f"Remote dispatcher {self.address!r} is not keeping up.") from None
+
+    def _handle_error(self, exc: BaseException, /):
+        if self.on_error is None:
+            logger.exception("Error while sending events to %r.", self.address, exc_info=exc)
+        else:
+            self.on_error(exc)
+
+    def _run(self):
+        get, get_nowait, task_done = self._queue.get, self._queue.get_nowait, self._queue.task_done
+        sock, stopping = None, False
+        while not stopping:
+            batch = [get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                items = [item for item in batch if item is not None]
+                # one stop marker per worker, give back the ones meant for the other workers
+                for _ in range(len(batch) - len(items) - 1):
+                    self._queue.put(None)
+            else:
+                items = batch
+
+            try:
+                for frame_items in _split_frames(items, self.max_batch_size):
+                    try:
+                        frame = encode_frame(frame_items, secret=self.secret)
+                        if sock is None:
+                            sock = _connect(self.address, self.connect_timeout)
+                        sock.sendall(frame)
+                    except Exception as exc:
+                        # the connection state is unknown after a failed send, start over with a new one
+                        if sock is not None:
+                            sock.close()
+                            sock = None
+                        self.dropped += len(frame_items)
+                        self._handle_error(exc)
+                    else:
+                        self.sent += len(frame_items)
+            finally:
+                for _ in batch:
+                    task_done()
+
+        if sock is not None:
+            sock.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        read, server = self.rfile.read, self.server.event_server
+        while True:
+            header = read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return
+            length, count = _FRAME.unpack(header)
+            if length > MAX_FRAME_SIZE:
+                logger.error(
+                    "Frame of %d bytes received from %r exceeds the maximum size.", length, self.client_address
+                )
+                return
+            body = read(length)
+            if len(body) < length:
+                return
+            if server.secret is not None:
+                signature = read(_SIGNATURE_SIZE)
+                if not hmac.compare_digest(signature, hmac.digest(server.secret, header + body, _DIGEST)):
+                    logger.error("Frame with an invalid signature received from %r.", self.client_address)
+                    return
+            server.dispatch_frame(body, count)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class RemoteEventServer:
+    """
+    Receives the events forwarded by :class:`RemoteEventDispatcher` instances, and dispatches them with the given
+    dispatcher (each connection in its own thread). Exceptions raised by listeners are given to ``on_error`` (or logged
+    if no callback is given).
+
+    Received events may only be instances of the given ``event_types`` (and of the dispatcher's ``event_factory``), the
+    events of other types are dropped (as errors). Listening on another interface than the loopback one requires a
+    ``secret``, see the security notes of the module documentation.
+
+    By default, it listens on a free port of the loopback interface, which is convenient for tests: use
+    :attr:`address` to connect to it, and use it as a context manager to serve in a background thread::
+
+        with RemoteEventServer(dispatcher) as server:
+            remote = RemoteEventDispatcher(server.address)
+
+    .. versionadded:: 2.2
+
+    :param dispatcher: the dispatcher to dispatch received events with
+    :param address: ``(host, port)`` tuple for TCP, or path of a Unix socket
+    :param on_error: callback for exceptions raised while dispatching received events
+    :param secret: secret shared with the remote dispatchers, to check the signature of the frames
+    :param event_types: the event classes (and the classes of their attributes values) received events may use
+
+    """
+
+    def __init__(
+        self,
+        dispatcher: IEventDispatcher,
+        address: Address = ("127.0.0.1", 0),
+        /,
+        *,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        secret: Optional[bytes] = None,
+        event_types: Iterable[type] = (),
+    ):
+        if secret is None and not is_loopback(address):
+            raise ValueError(
+                f"Listening on {address!r} requires a secret, only loopback addresses are allowed without."
+            )
+        self.dispatcher = dispatcher
+        self.on_error = on_error
+        self.secret = secret
+        self.event_types = (Event, dispatcher.event_factory, *event_types)
+        self.received = 0
+        self._server = (_UnixServer if isinstance(address, str) else _TCPServer)(address, _RequestHandler)
+        self._server.event_server = self
+        self._thread = None
+
+    @property
+    def address(self) -> Address:
+        """Address the server listens on (with the actual port, if port 0 was given)."""
+        return self._server.server_address
+
+    def dispatch_frame(self, body: bytes, count: int, /) -> None:
+        """Dispatches the events of a received frame, consecutive events with the same event id together."""
+        event_factory, event_types = self.dispatcher.event_factory, self.event_types
+        for event_id, items in groupby(decode_frame(body, count), key=itemgetter(0)):
+            events = []
+            for _, payload in items:
+                try:
+                    events.append(loads_event(payload, factory=event_factory, types=event_types))
+                except Exception as exc:
+                    self._handle_error(exc)
+            try:
+                self.dispatcher.dispatch_many(event_id, events)
+            except Exception as exc:
+                self._handle_error(exc)
+            self.received += len(events)
+
+    def serve_forever(self) -> None:
+        """Serves until :meth:`shutdown` is called (from another thread)."""
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stops :meth:`serve_forever`, and waits until it returns."""
+        self._server.shutdown()
+
+    def start(self) -> None:
+        """Serves in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, name="whistle-remote-server", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stops serving and closes the listening socket."""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+        if isinstance(self.address, str):
+            import os
+
+            os.unlink(self.address)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _handle_error(self, exc: BaseException, /):
+        if self.on_error is None:
+            logger.exception("Error while dispatching remote events.", exc_info=exc)
+        else:
+            self.on_error(exc)
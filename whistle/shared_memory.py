@@ -0,0 +1,341 @@
+"""
+Cross-process event bus, bridging the dispatchers of processes running on the same host (for example the workers of a
+prefork server) through a ring buffer in shared memory (:mod:`multiprocessing.shared_memory`), without any external
+broker.
+
+Create the :class:`SharedMemoryBus` in the parent process, before forking the workers, then connect each worker's
+dispatcher to it with :meth:`SharedMemoryBus.connect`::
+
+    bus = SharedMemoryBus(size=1 << 20)
+
+    # in each worker
+    bridge = bus.connect(dispatcher, "cache.*")
+
+Events dispatched locally with a matching event id are then published on the bus, and dispatched by the other
+processes' dispatchers, from a background thread of each bridge.
+
+The background thread checks the bus for new events every few hundred microseconds while events keep coming, then
+less and less often when idle, up to every ``poll_interval`` seconds. As the listeners of received events are called
+from this thread, while the other events are still dispatched by the threads of the application, the dispatcher must
+be created with ``thread_safe=True`` if listeners may be added or removed meanwhile (and listeners must support being
+called from several threads). To dispatch received events from a thread of your own instead, connect with
+``background=False`` and call :meth:`SharedMemoryBridge.poll` from it.
+
+Events are encoded in a compact binary form: a 12 bytes record header, the event id, and the event state (see
+:func:`whistle.offload.dumps_event`), pickled, if there is one. Events of the dispatcher's ``event_factory`` type
+without any state (the common "something changed" notification) are sent as their event id only. Event classes must
+be importable by the receiving processes.
+
+The ring buffer is a broadcast one: each bridge keeps its own read position, and publishing never waits for the
+readers. A bridge that falls behind by more than the buffer size misses the overwritten events (counted in its
+``overruns`` attribute), so size the buffer for the bursts you expect.
+
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+
+from whistle.offload import dumps_event, loads_event
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Callable, Optional
+    from whistle.typing import IEvent, IEventDispatcher
+
+logger = logging.getLogger(__name__)
+
+# bus header: reserved position, committed position, next bridge id, capacity
+_HEADER = struct.Struct("<QQQQ")
+_RESERVED, _COMMITTED, _NEXT_ID, _CAPACITY = 0, 8, 16, 24
+
+# record header: length of the record body, sender id, event id length, reserved flags
+_RECORD = struct.Struct("<IIHH")
+_POSITION = struct.Struct("<Q")
+
+# record length marking the end of the buffer, the next record starts at the beginning
+_WRAP = 0xFFFFFFFF
+
+#: Delay (in seconds) between two checks for new events of a bridge background thread, right after receiving events
+#: (doubled on each check finding nothing new, up to the ``poll_interval`` of the bridge).
+MIN_POLL_INTERVAL = 0.0005
+
+
+def _align(size: int, /) -> int:
+    # records are 16 bytes aligned, so that there is always room for a record header before the end of the buffer
+    return (size + 15) & ~15
+
+
+class SharedMemoryBus:
+    """
+    Ring buffer in a shared memory segment, carrying events between processes (see module documentation).
+
+    Without ``name``, a new segment is created (and unlinked by :meth:`close`, or when leaving the ``with`` block).
+    Processes forked afterwards inherit the bus, and it can be given to processes started by :mod:`multiprocessing`.
+    Other processes can attach to an existing segment by name, given the lock the publishers share.
+
+    .. versionadded:: 2.2
+
+    :param name: name of an existing segment to attach to
+    :param size: capacity (in bytes) of the ring buffer, when creating a segment
+    :param lock: lock serializing publishers across processes (defaults to a new :func:`multiprocessing.Lock`, when
+        creating a segment)
+
+    """
+
+    def __init__(self, name: Optional[str] = None, /, *, size: int = 1 << 20, lock=None):
+        from multiprocessing.shared_memory import SharedMemory
+
+        if name is None:
+            if size < 4096:
+                raise ValueError(f"Shared memory bus size must be at least 4096 bytes, {size} given.")
+            if lock is None:
+                from multiprocessing import Lock
+
+                lock = Lock()
+            capacity = _align(size)
+            self._shm = SharedMemory(create=True, size=_HEADER.size + capacity)
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0, 1, capacity)
+            self._owner = os.getpid()
+        else:
+            if lock is None:
+                raise ValueError("A lock shared with the other publishers is required to attach to a bus by name.")
+            self._shm = _attach(name)
+            self._owner = None
+
+        self.lock = lock
+        self.capacity = _POSITION.unpack_from(self._shm.buf, _CAPACITY)[0]
+        self.max_record_size = self.capacity // 2
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory segment."""
+        return self._shm.name
+
+    def __reduce__(self):
+        return _attach_bus, (self.name, self.lock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """Closes the shared memory segment, and unlinks it if it has been created by this process."""
+        self._shm.close()
+        if self._owner == os.getpid():
+            self._owner = None
+            self._shm.unlink()
+
+    def connect(self, dispatcher: IEventDispatcher, /, *event_ids: str, **kwargs) -> SharedMemoryBridge:
+        """
+        Connects a dispatcher to the bus, for the given event ids (or patterns). See :class:`SharedMemoryBridge`.
+
+        """
+        return SharedMemoryBridge(self, dispatcher, *event_ids, **kwargs)
+
+    def allocate_id(self) -> int:
+        """Returns a new sender id, unique among all the processes using the bus."""
+        with self.lock:
+            sender = _POSITION.unpack_from(self._shm.buf, _NEXT_ID)[0]
+            _POSITION.pack_into(self._shm.buf, _NEXT_ID, sender + 1)
+        return sender
+
+    def position(self) -> int:
+        """Returns the position following the last published record."""
+        return _POSITION.unpack_from(self._shm.buf, _COMMITTED)[0]
+
+    def publish(self, sender: int, event_id: str, payload: bytes = b"", /) -> None:
+        """
+        Appends a record to the ring buffer. Readers lagging behind by more than the capacity miss the records it
+        overwrites.
+
+        :param sender: id of the publishing bridge (readers ignore their own records)
+        :param event_id: event id
+        :param payload: encoded event state
+
+        """
+        name = event_id.encode()
+        length = len(name) + len(payload)
+        size = _align(_RECORD.size + length)
+        if size > self.max_record_size:
+            raise ValueError(f"Event {event_id!r} is too large for the shared memory bus ({size} bytes encoded).")
+
+        buf, capacity = self._shm.buf, self.capacity
+        with self.lock:
+            position = _POSITION.unpack_from(buf, _COMMITTED)[0]
+            offset = position % capacity
+            if offset + size > capacity:
+                # not enough room before the end of the buffer, mark the end and start over at the beginning
+                _POSITION.pack_into(buf, _RESERVED, position + capacity - offset + size)
+                _RECORD.pack_into(buf, _HEADER.size + offset, _WRAP, 0, 0, 0)
+                position, offset = position + capacity - offset, 0
+            else:
+                # readers check the reserved position to know whether what they read may have been overwritten
+                _POSITION.pack_into(buf, _RESERVED, position + size)
+
+            start = _HEADER.size + offset + _RECORD.size
+            _RECORD.pack_into(buf, start - _RECORD.size, length, sender, len(name), 0)
+            buf[start : start + len(name)] = name
+            buf[start + len(name) : start + length] = payload
+            _POSITION.pack_into(buf, _COMMITTED, position + size)
+
+    def read(self, position: int, /) -> tuple:
+        """
+        Reads the records published since the given position. Returns the new position, the number of records that
+        were overwritten before they could be read (if the reader lagged behind too much, it then resumes from the
+        latest record) and the list of ``(sender, event_id, payload)`` records.
+
+        """
+        buf, capacity, records = self._shm.buf, self.capacity, []
+        committed = _POSITION.unpack_from(buf, _COMMITTED)[0]
+        if committed - position > capacity:
+            return committed, 1, records
+        while position < committed:
+            offset = position % capacity
+            length, sender, name_length, _flags = _RECORD.unpack_from(buf, _HEADER.size + offset)
+            if length == _WRAP:
+                position += capacity - offset
+                continue
+
+            start = _HEADER.size + offset + _RECORD.size
+            data = bytes(buf[start : start + length])
+            if _POSITION.unpack_from(buf, _RESERVED)[0] - capacity > position:
+                # overwritten (maybe while we were reading it), skip everything published until now
+                return _POSITION.unpack_from(buf, _COMMITTED)[0], 1, records
+
+            records.append((sender, data[:name_length].decode(), data[name_length:]))
+            position += _align(_RECORD.size + length)
+        return position, 0, records
+
+
+def _attach(name: str, /):
+    from multiprocessing.shared_memory import SharedMemory
+
+    try:
+        # the attaching process must not unlink the segment when it exits
+        return SharedMemory(name, track=False)
+    except TypeError:  # python < 3.13
+        return SharedMemory(name)
+
+
+def _attach_bus(name: str, lock, /) -> SharedMemoryBus:
+    return SharedMemoryBus(name, lock=lock)
+
+
+class SharedMemoryBridge:
+    """
+    Bridges a dispatcher to a :class:`SharedMemoryBus`: events dispatched by the dispatcher with one of the given event
+    ids (or patterns) are published on the bus, and events published by other bridges (in this process or others) are
+    dispatched by the dispatcher, from a background thread (or when calling :meth:`poll`, without background thread).
+    With a background thread, create the dispatcher with ``thread_safe=True`` (see module documentation).
+
+    Received events are not published again. Exceptions raised by listeners of received events are given to
+    ``on_error`` (or logged if no callback is given).
+
+    .. versionadded:: 2.2
+
+    :param bus: the bus to connect to
+    :param dispatcher: the local dispatcher
+    :param event_ids: event ids (or patterns) to publish, none to only receive events
+    :param priority: priority of the publishing listener (-20 by default): local listeners registered with the usual
+        priorities (-19 to 19) run after the event is published, so they cannot stop it from reaching the other
+        processes
+    :param background: receive events in a background thread
+    :param poll_interval: maximum delay (in seconds) between two checks for new events, when idle
+    :param on_error: callback for exceptions raised while dispatching received events
+
+    """
+
+    def __init__(
+        self,
+        bus: SharedMemoryBus,
+        dispatcher: IEventDispatcher,
+        /,
+        *event_ids: str,
+        priority: int = -20,
+        background: bool = True,
+        poll_interval: float = 0.02,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+    ):
+        self.bus = bus
+        self.dispatcher = dispatcher
+        self.event_ids = event_ids
+        self.poll_interval = poll_interval
+        self.on_error = on_error
+
+        self.id = bus.allocate_id()
+        self.published = 0
+        self.received = 0
+        self.overruns = 0
+
+        self._position = bus.position()
+        self._receiving = None
+        for event_id in event_ids:
+            dispatcher.add_listener(event_id, self._publish, priority=priority)
+
+        self._closed = threading.Event()
+        self._worker = None
+        if background:
+            self._worker = threading.Thread(target=self._run, name="whistle-shared-memory", daemon=True)
+            self._worker.start()
+
+    def _publish(self, event: IEvent, /):
+        if event is self._receiving:
+            return
+        self.bus.publish(self.id, event.name, dumps_event(event, default_type=self.dispatcher.event_factory))
+        self.published += 1
+
+    def poll(self) -> int:
+        """Dispatches the events published by other bridges since the last poll, returns their number."""
+        self._position, overruns, records = self.bus.read(self._position)
+        if overruns:
+            self.overruns += overruns
+            logger.warning("Shared memory bus reader fell behind, some events were lost.")
+
+        received = 0
+        for sender, event_id, payload in records:
+            if sender == self.id:
+                continue
+            event = loads_event(payload, factory=self.dispatcher.event_factory)
+            self._receiving = event
+            try:
+                self.dispatcher.dispatch(event_id, event)
+            except Exception as exc:
+                self._handle_error(exc)
+            finally:
+                self._receiving = None
+            received += 1
+        self.received += received
+        return received
+
+    def close(self) -> None:
+        """Stops publishing and receiving events."""
+        self._closed.set()
+        if self._worker is not None:
+            self._worker.join()
+        for event_id in self.event_ids:
+            self.dispatcher.remove_listener(event_id, self._publish)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.bus.name} #{self.id} {self.event_ids!r}>"
+
+    def _handle_error(self, exc: BaseException, /):
+        if self.on_error is None:
+            logger.exception("Error while dispatching an event received from the shared memory bus.", exc_info=exc)
+        else:
+            self.on_error(exc)
+
+    def _run(self):
+        # checks often while events keep coming, backing off exponentially when idle, not to burn CPU
+        delay = min(MIN_POLL_INTERVAL, self.poll_interval)
+        while not self._closed.is_set():
+            if self.poll():
+                delay = min(MIN_POLL_INTERVAL, self.poll_interval)
+            else:
+                self._closed.wait(delay)
+                delay = min(delay * 2, self.poll_interval)
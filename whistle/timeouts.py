@@ -0,0 +1,165 @@
+"""
+Timeouts of asynchronous listeners and dispatches: a listener registered with ``timeout=`` (see
+:meth:`whistle.AsyncEventDispatcher.add_listener`) is cancelled if it does not complete in time, and a dispatch given a
+``deadline=`` (see :meth:`whistle.AsyncEventDispatcher.adispatch`) cancels the listeners still running when it expires.
+
+Listeners that timed out are recorded in the ``timed_out`` attribute of the event, then the ``on_timeout`` mode of the
+dispatcher applies: ``"skip"`` goes on with the next listeners (a dispatch that exceeded its deadline ends there), and
+``"abort"`` raises a :class:`whistle.errors.DispatchTimeoutError`. When a deadline expires, the listeners that were not
+called yet are recorded too, after the cancelled ones.
+
+Timed listeners run in their own task. Like with :func:`asyncio.wait_for`, cancelled listeners are waited for until
+they handled the cancellation.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from whistle.dispatchers.asynchronous import ABORT
+from whistle.errors import DispatchError, DispatchTimeoutError
+from whistle.listeners import ListenerWrapper
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from whistle.typing import IEvent, IListener
+
+
+class TimeoutListener(ListenerWrapper):
+    """
+    Wraps an asynchronous listener (or :class:`whistle.listeners.InlineListener`) to cancel it after ``timeout``
+    seconds (see module documentation).
+
+    You usually don't have to create them yourself, use ``add_listener(..., timeout=...)`` instead.
+
+    .. versionadded:: 2.2
+
+    :param listener: the listener to time
+    :param timeout: maximum time (in seconds) the listener may run
+
+    """
+
+    __slots__ = ("timeout",)
+
+    def __init__(self, listener: IListener, timeout: float, /):
+        if timeout <= 0:
+            raise ValueError(f"Listener timeout must be positive, {timeout!r} given.")
+        super().__init__(listener)
+        self.timeout = timeout
+
+    async def __call__(self, event: IEvent, /):
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self.listener(event))
+        expired = []
+
+        def cancel():
+            expired.append(True)
+            task.cancel()
+
+        handle = loop.call_later(self.timeout, cancel)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if not expired:
+                # the dispatch itself was cancelled
+                raise
+        finally:
+            handle.cancel()
+        expire(event, (self.listener,), f"Listener {unwrap(self.listener)!r} timed out after {self.timeout}s.")
+        return None
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.listener!r} timeout={self.timeout!r}>"
+
+
+def unwrap(listener: IListener, /) -> IListener:
+    """Returns the listener wrapped by the given listener wrappers, if any."""
+    while isinstance(listener, ListenerWrapper):
+        listener = listener.listener
+    return listener
+
+
+async def wait_tasks(awaitables, timeout: float, /) -> tuple[list, list]:
+    """
+    Runs the given awaitables in tasks, and waits until they are all done or ``timeout`` seconds passed. Returns the
+    tasks, and the indexes of the ones that were still running (cancelled, and waited for).
+
+    """
+    tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=max(timeout, 0))
+        if pending:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_retrieve)
+            await asyncio.wait(pending)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return tasks, [index for index, task in enumerate(tasks) if task in pending]
+
+
+async def run_stages(stages: tuple, event: IEvent, progress: list, /) -> None:
+    """
+    Runs the stages of a dispatch with a deadline (see :meth:`whistle.AsyncEventDispatcher.adispatch`) one after
+    another, each stage being a tuple of listeners and of their plans (run concurrently, if there are many of them).
+    ``progress`` holds the index of the current stage and its listeners not done yet, to know which listeners were
+    cancelled when the dispatch is.
+
+    """
+    for index, (tier, plans) in enumerate(stages):
+        progress[:] = index, tier
+        if len(plans) == 1:
+            await plans[0](event)
+        else:
+            tasks = [asyncio.ensure_future(plan(event)) for plan in plans]
+            try:
+                await asyncio.wait(tasks)
+            except asyncio.CancelledError:
+                progress[1] = tuple(listener for listener, task in zip(tier, tasks) if not task.done())
+                for task in tasks:
+                    task.cancel()
+                await asyncio.wait(tasks)
+                # listeners that failed meanwhile take precedence
+                check_tasks(tasks, event, group=True)
+                raise
+            check_tasks(tasks, event, group=True)
+        if event.propagation_stopped:
+            return
+
+
+def check_tasks(tasks: list, event: IEvent, /, *, group: bool = False) -> None:
+    """
+    Raises the exception of the failed task among the given ones, or a :class:`DispatchError` if many of them failed
+    (or if any failed, with ``group=True``, for the listeners of a concurrent tier).
+
+    """
+    errors = [task.exception() for task in tasks if not task.cancelled() and task.exception() is not None]
+    if len(errors) == 1 and not group:
+        raise errors[0]
+    if errors:
+        raise DispatchError(f"{len(errors)} listener(s) failed while dispatching {event.name!r}.", errors)
+
+
+def expire(event: IEvent, listeners, message: str, /) -> None:
+    """
+    Records the given listeners as timed out on the event, then raises a :class:`DispatchTimeoutError` if the
+    dispatcher of the event is in ``"abort"`` timeout mode.
+
+    """
+    listeners = tuple(map(unwrap, listeners))
+    try:
+        event.timed_out = (*getattr(event, "timed_out", ()), *listeners)
+    except AttributeError:
+        # custom event without room for the record
+        pass
+    if getattr(getattr(event, "dispatcher", None), "on_timeout", None) == ABORT:
+        raise DispatchTimeoutError(message, listeners=listeners)
+
+
+def _retrieve(task, /):
+    # cancelled listeners may still raise while handling the cancellation, which is ignored
+    if not task.cancelled():
+        task.exception()
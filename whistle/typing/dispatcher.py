@@ -1,4 +1,4 @@
-from typing import Optional, Protocol
+from typing import Callable, Iterable, Optional, Protocol
 
 from .event import IEvent
 from .listener import IListener
@@ -20,8 +20,14 @@ class IDispatchedEvent(IEvent, Protocol):
 
 
 class IEventDispatcher(IAbstractEventDispatcher, Protocol):
-    def dispatch(self, event_id, event=None, /) -> IDispatchedEvent: ...
+    def dispatch(self, event_id, event=None, /, *, factory=None) -> Optional[IDispatchedEvent]: ...
+
+    def dispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]: ...
 
 
 class IAsyncEventDispatcher(IAbstractEventDispatcher, Protocol):
-    async def adispatch(self, event_id: str, event: Optional[IEvent] = None, /) -> IDispatchedEvent: ...
+    async def adispatch(
+        self, event_id: str, event: Optional[IEvent] = None, /, *, factory: Optional[Callable[[], IEvent]] = None
+    ) -> Optional[IDispatchedEvent]: ...
+
+    async def adispatch_many(self, event_id: str, events: Iterable[IEvent], /) -> list[IDispatchedEvent]: ...
@@ -0,0 +1,97 @@
+"""
+Weak listeners only keep a weak reference to the listener (a :class:`weakref.WeakMethod` for bound methods), so
+registering the method of a short-lived object (a request, a connection, ...) does not keep it alive. Once the object
+is garbage collected, its registrations are removed from the dispatcher.
+
+Only weak listeners pay for dereferencing the weak reference when called, other listeners are called directly.
+
+"""
+
+from __future__ import annotations
+
+from types import MethodType
+from weakref import WeakMethod, ref
+
+from whistle.listeners import ListenerWrapper
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from whistle.typing import IEvent, IListener
+
+
+class WeakListener(ListenerWrapper):
+    """
+    Wraps a weak reference to a listener. Calling it does nothing once the listener has been collected, and the
+    optional ``on_collected`` callback is called with the wrapper at this time (dispatchers use it to remove the
+    registration).
+
+    You usually don't have to create them yourself, use ``add_listener(..., weak=True)`` instead.
+
+    .. versionadded:: 2.2
+
+    :param listener: the listener to reference weakly
+    :param on_collected: optional callback, called with this wrapper once the listener has been collected
+
+    """
+
+    __slots__ = ("_hash", "_on_collected", "ref")
+
+    def __init__(self, listener: IListener, on_collected=None, /):
+        if not callable(listener):
+            raise TypeError(f"Listener should be a callable, {type(listener)} given")
+        self._on_collected = on_collected
+        self.ref = (WeakMethod if isinstance(listener, MethodType) else ref)(listener, self._collected)
+        try:
+            self._hash = hash(listener)
+        except TypeError:
+            self._hash = None
+
+    @property
+    def listener(self):
+        """The referenced listener, or ``None`` if it has been collected."""
+        return self.ref()
+
+    def __call__(self, event: IEvent, /):
+        listener = self.ref()
+        if listener is not None:
+            return listener(event)
+
+    def __eq__(self, other):
+        if isinstance(other, WeakListener):
+            # dead references only compare equal to themselves
+            return self.ref == other.ref
+        listener = self.ref()
+        return listener is not None and listener == other
+
+    def __hash__(self):
+        if self._hash is None:
+            raise TypeError(f"unhashable listener {self.ref!r}")
+        return self._hash
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.ref!r}>"
+
+    def _target(self):
+        # compared as a whole (dead references only compare equal to themselves)
+        return self
+
+    def _collected(self, _ref, /):
+        if self._on_collected is not None:
+            self._on_collected(self)
+
+
+class AsyncWeakListener(WeakListener):
+    """
+    Same as :class:`WeakListener`, for :class:`whistle.AsyncEventDispatcher` (the referenced listener is a coroutine
+    function).
+
+    .. versionadded:: 2.2
+
+    """
+
+    __slots__ = ()
+
+    async def __call__(self, event: IEvent, /):
+        listener = self.ref()
+        if listener is not None:
+            return await listener(event)